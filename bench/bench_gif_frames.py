@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# Frames/sec for poclib.gif.GifStreamWriter versus the original
+# grow-one-bytearray loop from make_giftool_poc.py.
+#
+#   python3 bench/bench_gif_frames.py [--frames N] [--out-dir DIR]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from poclib.gif import BW_COLORMAP, MINIMAL_IMAGE_DATA, GifStreamWriter, frame, gce, header
+
+
+def legacy(path: str, frames: int) -> None:
+    out = bytearray()
+    out += b"GIF89a" + b"\x01\x00\x01\x00\x80\x00\x00" + BW_COLORMAP
+    for _ in range(frames):
+        out += b"\x2c" + b"\x00\x00" + b"\x00\x00" + b"\x01\x00" + b"\x01\x00" + b"\x00"
+        out += MINIMAL_IMAGE_DATA
+    out += b"\x3b"
+    Path(path).write_bytes(out)
+
+
+def repeated(path: str, frames: int) -> None:
+    with GifStreamWriter(path, header(1, 1, BW_COLORMAP)) as w:
+        w.write_repeated(frame(), frames)
+
+
+def varying(path: str, frames: int) -> None:
+    # position walks, every 4th frame gets a local table, odd frames a GCE
+    lct = BW_COLORMAP
+    g = gce(delay=1)
+    with GifStreamWriter(path, header(256, 256, BW_COLORMAP)) as w:
+        w.write_frames(((i & 0xFF, (i >> 8) & 0xFF, lct if i % 4 == 0 else None, g if i & 1 else b"")
+                        for i in range(frames)))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--frames", type=int, default=1_000_000)
+    ap.add_argument("--out-dir", default=None)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.out_dir) as d:
+        legacy(os.path.join(d, "a.gif"), 2049)
+        repeated(os.path.join(d, "b.gif"), 2049)
+        assert Path(d, "a.gif").read_bytes() == Path(d, "b.gif").read_bytes()
+        print("[+] streaming writer matches the legacy output")
+
+        for name, fn in (("legacy bytearray", legacy), ("repeated", repeated), ("per-frame varying", varying)):
+            path = os.path.join(d, name.replace(" ", "_") + ".gif")
+            t0 = time.perf_counter()
+            fn(path, args.frames)
+            dt = time.perf_counter() - t0
+            print(f"    {name:<18} {args.frames / dt:14.0f} frames/s  ({os.path.getsize(path) / dt / 1e6:.1f} MB/s)")
+            os.unlink(path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
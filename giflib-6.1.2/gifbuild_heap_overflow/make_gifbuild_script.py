@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# gifbuild text inputs.
+#
+# Default: the GifUnionColorMap PoC (`poc`): an all-zero 2-entry screen map
+# followed by one include. With --images N: a streamed stress script with N
+# images, full colour maps, extension blocks and a chain of includes of
+# generated GIFs, written to a file, stdout ("-") or, with --gifbuild,
+# straight into gifbuild's stdin.
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from poclib.gifbuild import KEY_LETTERS, grey_ramp, include_poc, run_gifbuild, stress_script, write_include_gifs, write_script
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="gifbuild GifUnionColorMap PoC, or large streamed gifbuild scripts.")
+    ap.add_argument("out", nargs="?", default="poc", help='script path, "-" for stdout (ignored with --gifbuild)')
+    ap.add_argument("--include", default="pic/solid2.gif", help="PoC mode: GIF named by the include directive")
+    ap.add_argument("--images", type=int, default=0, help="write a stress script with this many images")
+    ap.add_argument("--size", default="16x16", metavar="WxH", help="raster size of every image")
+    ap.add_argument("--colors", type=int, default=256, help="entries in the screen (and image) maps")
+    ap.add_argument("--local-maps", action="store_true", help="give every image its own image map")
+    ap.add_argument("--keyed", action="store_true", help="pixel-key rasters instead of hex (<= 64 colours)")
+    ap.add_argument("--gce-every", type=int, default=1, help="graphics control block every N images (0: none)")
+    ap.add_argument("--comment-lines", type=int, default=0, help="255-byte comment lines before every image")
+    ap.add_argument("--includes", type=int, default=0, help="distinct GIFs to generate and include")
+    ap.add_argument("--include-every", type=int, default=1, help="one include after every N images")
+    ap.add_argument("--include-dir", default="inc", help="where the included GIFs go, relative to gifbuild's cwd")
+    ap.add_argument("--zero-map", action="store_true",
+                    help="all-zero screen map: the first include reads Colors[-1] in GifUnionColorMap")
+    ap.add_argument("--gifbuild", metavar="PATH", help="pipe the script into this gifbuild instead of writing it")
+    ap.add_argument("--gif-out", default=None, help="--gifbuild: keep its GIF output here (default /dev/null)")
+    args = ap.parse_args()
+    if not 1 <= args.colors <= 256:
+        ap.error("--colors must be 1..256")
+    if args.keyed and args.colors > len(KEY_LETTERS):
+        ap.error(f"--keyed supports at most {len(KEY_LETTERS)} colours")
+
+    if not args.images:
+        chunks = [include_poc(bytes(6), args.include)]
+    else:
+        w, _, h = args.size.lower().partition("x")
+        width, height = int(w), int(h or w)
+        colormap = bytes(3 * args.colors) if args.zero_map else grey_ramp(args.colors)
+        names = []
+        if args.includes:
+            # included GIFs always carry real colours, so the union has work to do
+            paths = write_include_gifs(args.include_dir, args.includes, grey_ramp(args.colors))
+            names = [os.path.relpath(p) for p in paths]
+        chunks = stress_script(args.images, width, height, colormap, args.local_maps, args.gce_every,
+                               args.comment_lines, includes=names, include_every=args.include_every,
+                               keyed=args.keyed)
+
+    t0 = time.perf_counter()
+    if args.gifbuild:
+        status, n = run_gifbuild(args.gifbuild, chunks, args.gif_out)
+        dt = time.perf_counter() - t0
+        print(f"[+] fed {n} bytes to {args.gifbuild} in {dt:.2f}s, exit status {status}", file=sys.stderr)
+        return 0 if status == 0 else 1
+    n = write_script(args.out, chunks)
+    dt = time.perf_counter() - t0
+    print(f"[+] wrote {args.out} ({n} bytes, {dt:.2f}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
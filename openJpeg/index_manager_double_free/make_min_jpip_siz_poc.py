@@ -1,8 +1,19 @@
 #!/usr/bin/env python3
 import argparse
+import csv
+import json
+import os
 import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from poclib.cli import parse_values
+from poclib.j2k import COD, SIZ, index_codestream, load_codestream, synth_codestream
+from poclib.segments import segments_len, write_segments
+
 
 def be16(x: int) -> bytes:
     return struct.pack('>H', x)
@@ -33,137 +44,207 @@ SIG_BOX = be32(12) + b'jP  ' + b'\r\n\x87\n'
 
 
 def parse_main_header_len(cs: bytes) -> int:
-    if cs[:2] != b'\xff\x4f':
-        raise ValueError('codestream does not start with SOC')
-    pos = 2
-    while pos + 2 <= len(cs):
-        code = u16(cs, pos)
-        if code == 0xFF90:  # SOT
-            return pos
-        # Delimiting markers without segment body. Not expected here before SOT,
-        # but keep the parser from looping forever.
-        if code in (0xFF4F, 0xFF93, 0xFFD9, 0xFF92):
-            pos += 2
-            continue
-        if pos + 4 > len(cs):
-            raise ValueError('truncated marker segment while scanning main header')
-        seglen = u16(cs, pos + 2)
-        pos += 2 + seglen
-    return len(cs)
+    return index_codestream(cs).main_header_len
 
 
-def build_patched_codestream(raw: bytes, new_csiz: int) -> tuple[bytes, dict]:
-    if raw[:2] != b'\xff\x4f':
-        raise ValueError('input is not a raw J2K codestream (missing SOC)')
-    if raw[2:4] != b'\xff\x51':
+def patch_siz(index, new_csiz: int) -> tuple[list, dict]:
+    """Codestream with SIZ rebuilt for new_csiz, as a list of segments: only
+    the new SIZ is built, the rest are memoryviews of the indexed input, and
+    every offset is derived from the index instead of re-parsing."""
+    markers = index.markers
+    if len(markers) < 2 or markers[1].code != SIZ or markers[1].offset != 2:
         raise ValueError('expected SIZ marker immediately after SOC')
+    siz = markers[1]
 
-    siz_data_off = 4  # after SOC(2) + SIZ marker code(2)
-    old_lsiz = u16(raw, siz_data_off)
-    old_siz_data = raw[siz_data_off:siz_data_off + old_lsiz]
+    siz_data_off = siz.data_offset  # after SOC(2) + SIZ marker code(2)
+    old_lsiz = siz.length
+    old_siz_data = index.segment(siz)
     old_csiz = u16(old_siz_data, 36)
     if old_csiz <= 0:
         raise ValueError('invalid original Csiz')
 
-    comp_bytes = old_siz_data[38:38 + 3 * old_csiz]
+    comp_bytes = bytes(old_siz_data[38:38 + 3 * old_csiz])
     if len(comp_bytes) != 3 * old_csiz:
         raise ValueError('truncated original component triplets in SIZ')
 
     new_lsiz = 38 + 3 * new_csiz
-    new_siz = bytearray(new_lsiz)
-    new_siz[:38] = old_siz_data[:38]
+    new_siz = bytearray(old_siz_data[:38])
     struct.pack_into('>H', new_siz, 0, new_lsiz)
     struct.pack_into('>H', new_siz, 36, new_csiz)
-    for i in range(new_csiz):
-        triplet = comp_bytes[(i % old_csiz) * 3:(i % old_csiz) * 3 + 3]
-        new_siz[38 + 3 * i:38 + 3 * i + 3] = triplet
+    # component i takes the triplet of original component i % old_csiz
+    new_siz += (comp_bytes * -(-new_csiz // old_csiz))[:3 * new_csiz]
 
-    old_cod_code_off = siz_data_off + old_lsiz
-    if raw[old_cod_code_off:old_cod_code_off + 2] != b'\xff\x52':
-        raise ValueError('expected COD marker right after SIZ in input codestream')
-    old_cod_data_off = old_cod_code_off + 2
-    old_lcod = u16(raw, old_cod_data_off)
+    cod = index.first(COD)
+    if cod is None:
+        raise ValueError('no COD marker in input codestream main header')
 
     delta = new_lsiz - old_lsiz
-    new_raw = raw[:siz_data_off] + bytes(new_siz) + raw[siz_data_off + old_lsiz:]
-    new_cod_code_off = old_cod_code_off + delta
-    new_cod_data_off = old_cod_data_off + delta
-    if new_raw[new_cod_code_off:new_cod_code_off + 2] != b'\xff\x52':
-        raise ValueError('COD marker no longer where expected after patching SIZ')
-
-    main_header_len = parse_main_header_len(new_raw)
+    segments = [index.view[:siz_data_off], new_siz, index.view[siz.end:]]
 
     info = {
         'siz_data_off': siz_data_off,
         'siz_length': new_lsiz,
-        'cod_data_off': new_cod_data_off,
-        'cod_length': old_lcod,
-        'main_header_len': main_header_len,
+        'cod_data_off': cod.data_offset + delta,
+        'cod_length': cod.length,
+        'main_header_len': index.main_header_len + delta,
         'old_csiz': old_csiz,
         'new_csiz': new_csiz,
-        'new_codestream_len': len(new_raw),
+        'new_codestream_len': len(index) + delta,
     }
-    return new_raw, info
+    return segments, info
+
+
+def build_patched_codestream(raw: bytes, new_csiz: int) -> tuple[bytes, dict]:
+    segments, info = patch_siz(index_codestream(raw), new_csiz)
+    return b''.join(segments), info
+
+
+MHIX_LEN = 8 + 8 + 2 * (2 + 2 + 8 + 2)  # box header, TLEN, SIZ and COD entries
+CPTR_LEN = 8 + 20
+PRXY_LEN = 8 + 8 + 8 + 1 + 8 + 8
+IPTR_LEN = 24
+
+
+class JpipLayout:
+    """Box layout of the output file. Every offset is fixed once the manifest
+    shape is known; only mhix, prxy and cptr carry values that depend on the
+    patched codestream, so one layout serves every Csiz variant."""
+
+    def __init__(self, include_manifest_headers: bool):
+        manf_payload = [be32(MHIX_LEN) + b'mhix']
+        if include_manifest_headers:
+            manf_payload += [be32(8) + b'tpix', be32(8) + b'thix', be32(8) + b'ppix']
+        self.manf = box(b'manf', b''.join(manf_payload))
+
+        self.cidx_len = 8 + CPTR_LEN + len(self.manf) + MHIX_LEN
+        self.fidx_len = 8 + PRXY_LEN
+        self.iptr_off = len(SIG_BOX)
+        self.fidx_off = self.iptr_off + IPTR_LEN
+        self.cidx_off = self.fidx_off + self.fidx_len
+        self.jp2c_off = self.cidx_off + self.cidx_len
+        self.head = SIG_BOX + box(b'iptr', be64(self.fidx_off) + be64(self.fidx_len))
+
+    @property
+    def offsets(self) -> dict:
+        return {'iptr_off': self.iptr_off, 'fidx_off': self.fidx_off, 'cidx_off': self.cidx_off,
+                'jp2c_off': self.jp2c_off}
+
+    def prefix(self, cs_len: int, info: dict) -> bytes:
+        """Everything before the codestream bytes: signature, iptr, fidx,
+        cidx and the jp2c box header."""
+        jp2c_len = 8 + cs_len
+        mhix = box(b'mhix', (
+            be64(info['main_header_len']) +
+            be16(0xFF51) + be16(0) + be64(info['siz_data_off']) + be16(info['siz_length']) +
+            be16(0xFF52) + be16(0) + be64(info['cod_data_off']) + be16(info['cod_length'])
+        ))
+        prxy = box(
+            b'prxy',
+            be64(self.jp2c_off) +
+            be32(jp2c_len) + b'jp2c' +
+            b'\x01' +
+            be64(self.cidx_off) +
+            be32(self.cidx_len) + b'cidx'
+        )
+        cptr = box(b'cptr', be16(0) + be16(0) + be64(self.jp2c_off + 8) + be64(cs_len))
+        cidx = box(b'cidx', cptr + self.manf + mhix)
+        return self.head + box(b'fidx', prxy) + cidx + be32(jp2c_len) + b'jp2c'
+
+
+@lru_cache(maxsize=None)
+def jpip_layout(include_manifest_headers: bool) -> JpipLayout:
+    return JpipLayout(include_manifest_headers)
+
+
+def jpip_prefix(cs_len: int, info: dict, include_manifest_headers: bool) -> bytes:
+    return jpip_layout(include_manifest_headers).prefix(cs_len, info)
 
 
 def build_minimal_jp2_with_jpip(cs: bytes, info: dict, include_manifest_headers: bool) -> bytes:
-    # Pre-build cidx children whose sizes do not depend on absolute offsets.
-    cptr_placeholder = box(b'cptr', b'\x00' * 20)
-
-    manf_payload = [be32(44) + b'mhix']
-    if include_manifest_headers:
-        manf_payload += [be32(8) + b'tpix', be32(8) + b'thix', be32(8) + b'ppix']
-    manf = box(b'manf', b''.join(manf_payload))
-
-    mhix_payload = (
-        be64(info['main_header_len']) +
-        be16(0xFF51) + be16(0) + be64(info['siz_data_off']) + be16(info['siz_length']) +
-        be16(0xFF52) + be16(0) + be64(info['cod_data_off']) + be16(info['cod_length'])
-    )
-    mhix = box(b'mhix', mhix_payload)
-
-    cidx_len = 8 + len(cptr_placeholder) + len(manf) + len(mhix)
-    jp2c_len = 8 + len(cs)
-    prxy_len = 8 + 8 + 8 + 1 + 8 + 8
-    fidx_len = 8 + prxy_len
-    iptr_len = 24
-
-    sig_off = 0
-    iptr_off = sig_off + len(SIG_BOX)
-    fidx_off = iptr_off + iptr_len
-    cidx_off = fidx_off + fidx_len
-    jp2c_off = cidx_off + cidx_len
-
-    iptr = box(b'iptr', be64(fidx_off) + be64(fidx_len))
-    prxy = box(
-        b'prxy',
-        be64(jp2c_off) +
-        be32(jp2c_len) + b'jp2c' +
-        b'\x01' +
-        be64(cidx_off) +
-        be32(cidx_len) + b'cidx'
-    )
-    fidx = box(b'fidx', prxy)
-    cptr = box(b'cptr', be16(0) + be16(0) + be64(jp2c_off + 8) + be64(len(cs)))
-    cidx = box(b'cidx', cptr + manf + mhix)
-    jp2c = box(b'jp2c', cs)
-
-    out = SIG_BOX + iptr + fidx + cidx + jp2c
-    return out
+    return jpip_prefix(len(cs), info, include_manifest_headers) + bytes(cs)
+
+
+MANIFEST_FIELDS = ('siz_data_off', 'siz_length', 'cod_data_off', 'cod_length', 'main_header_len',
+                   'new_codestream_len')
+
+
+def write_variant(index, path, csiz: int, include_manifest_headers: bool) -> dict:
+    segments, info = patch_siz(index, csiz)
+    layout = jpip_layout(include_manifest_headers)
+    cs_len = segments_len(segments)
+    write_segments(path, [layout.prefix(cs_len, info), *segments])
+    return {'file': os.path.basename(path), 'csiz': csiz, **{k: info[k] for k in MANIFEST_FIELDS},
+            **layout.offsets, 'file_size': layout.jp2c_off + 8 + cs_len}
+
+
+@lru_cache(maxsize=8)
+def synth_input(dims: str):
+    # stand-in for rgba16x16.j2k: WxH, 4 components, 8 bits, one tile
+    w, _, h = dims.lower().partition('x')
+    return index_codestream(synth_codestream(width=int(w, 0), height=int(h or w, 0), comps=4))
+
+
+def load_input(input_j2k: str, synth: str = None):
+    return synth_input(synth) if synth else load_codestream(input_j2k)
+
+
+def _sweep_one(job) -> dict:
+    input_j2k, synth, out_dir, csiz, include_manifest_headers = job
+    # cached per process: parsed once, in the parent when workers are forked
+    index = load_input(input_j2k, synth)
+    return write_variant(index, os.path.join(out_dir, f'siz{csiz}.jp2'), csiz, include_manifest_headers)
+
+
+def sweep(input_j2k, out_dir, csiz_values, include_manifest_headers=False, workers=None,
+          manifest='manifest.csv', synth=None) -> list:
+    """Write siz<N>.jp2 for every Csiz in csiz_values from a process pool, plus
+    a manifest (CSV, or JSON if the name ends in .json) of the offsets in
+    each variant."""
+    os.makedirs(out_dir, exist_ok=True)
+    load_input(input_j2k, synth)
+    jobs = [(input_j2k, synth, out_dir, c, include_manifest_headers) for c in csiz_values]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        rows = list(ex.map(_sweep_one, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+    with open(os.path.join(out_dir, manifest), 'w', newline='') as f:
+        if manifest.endswith('.json'):
+            json.dump(rows, f, indent=1)
+        else:
+            w = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['file'])
+            w.writeheader()
+            w.writerows(rows)
+    return rows
 
 
 def main() -> None:
     ap = argparse.ArgumentParser(description='Build a minimal JP2/JPIP-like file that reaches openjpip set_SIZmkrdata() from opj_jpip_test.')
-    ap.add_argument('input_j2k', help='raw codestream generated by opj_compress, e.g. rgba16x16.j2k')
-    ap.add_argument('output_jp2', help='output file to feed to opj_jpip_test')
-    ap.add_argument('--csiz', type=int, default=64, help='patched Csiz value to store in SIZ (default: 64). 4 is the clean intra-object case; larger values are more likely to trip ASan on x86.')
+    ap.add_argument('input_j2k', nargs='?', help='raw codestream generated by opj_compress, e.g. rgba16x16.j2k (with --synth: the output file)')
+    ap.add_argument('output_jp2', nargs='?', help='output file to feed to opj_jpip_test')
+    ap.add_argument('--csiz', default='64', help='patched Csiz value to store in SIZ (default: 64). 4 is the clean intra-object case; larger values are more likely to trip ASan on x86. With --sweep: list/range, e.g. 1-16384.')
     ap.add_argument('--include-manifest-headers', action='store_true', help='also list tpix/thix/ppix headers in the manifest, even though this PoC is meant to abort earlier in set_SIZmkrdata().')
+    ap.add_argument('--sweep', metavar='DIR', help='write siz<N>.jp2 for every --csiz value into DIR')
+    ap.add_argument('--workers', type=int, default=None, help='--sweep: writer processes')
+    ap.add_argument('--manifest', default='manifest.csv', help='--sweep: manifest name in DIR (.csv or .json)')
+    ap.add_argument('--synth', metavar='WxH', help='use a synthesized WxH 4-component codestream instead of input_j2k')
     args = ap.parse_args()
-
-    raw = Path(args.input_j2k).read_bytes()
-    patched_cs, info = build_patched_codestream(raw, args.csiz)
-    out = build_minimal_jp2_with_jpip(patched_cs, info, args.include_manifest_headers)
-    Path(args.output_jp2).write_bytes(out)
+    if args.synth:
+        # no input file: the only positional is the output
+        if args.output_jp2:
+            ap.error('with --synth, give only output_jp2')
+        args.input_j2k, args.output_jp2 = None, args.input_j2k
+    elif not args.input_j2k:
+        ap.error('input_j2k is required without --synth')
+
+    if args.sweep:
+        rows = sweep(args.input_j2k, args.sweep, parse_values(args.csiz), args.include_manifest_headers,
+                     args.workers, args.manifest, args.synth)
+        print(f'[+] wrote {len(rows)} variants to {args.sweep} (manifest: {args.manifest})')
+        return
+    if not args.output_jp2:
+        ap.error('output_jp2 is required without --sweep')
+
+    segments, info = patch_siz(load_input(args.input_j2k, args.synth), int(args.csiz, 0))
+    prefix = jpip_prefix(segments_len(segments), info, args.include_manifest_headers)
+    write_segments(args.output_jp2, [prefix, *segments])
 
     print(f'[+] wrote {args.output_jp2}')
     print(f'    original Csiz   : {info["old_csiz"]}')
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# Synthetic raw J2K codestream (SOC/SIZ/COD/QCD + tile-parts of empty
+# packets) streamed to disk, as input for the JPIP PoCs and the OpenJPEG
+# decoder without needing opj_compress.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from poclib.j2k import CPRL, LRCP, PCRL, RLCP, RPCL, write_synth
+
+PROGRESSIONS = {'LRCP': LRCP, 'RLCP': RLCP, 'RPCL': RPCL, 'PCRL': PCRL, 'CPRL': CPRL}
+
+
+def parse_dims(text: str) -> tuple:
+    w, _, h = text.lower().partition('x')
+    return int(w, 0), int(h or w, 0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description='Write a minimal synthetic J2K codestream.')
+    ap.add_argument('output_j2k')
+    ap.add_argument('--size', type=parse_dims, default=(16, 16), help='image WxH (default: 16x16)')
+    ap.add_argument('--tile', type=parse_dims, default=None, help='tile WxH (default: one tile)')
+    ap.add_argument('--comps', type=int, default=4, help='Csiz (default: 4, like rgba16x16.j2k)')
+    ap.add_argument('--precision', type=int, default=8, help='bits per component')
+    ap.add_argument('--layers', type=int, default=1)
+    ap.add_argument('--decomp', type=int, default=None, help='decomposition levels (default: from tile size, at most 5)')
+    ap.add_argument('--prog', choices=PROGRESSIONS, default='LRCP')
+    ap.add_argument('--tile-parts', type=int, default=1, help='tile-parts per tile')
+    ap.add_argument('--sop', action='store_true', help='SOP marker before every packet')
+    ap.add_argument('--plt', action='store_true', help='PLT packet lengths in every tile-part header')
+    args = ap.parse_args()
+
+    width, height = args.size
+    tile_w, tile_h = args.tile or args.size
+    t0 = time.perf_counter()
+    size = write_synth(args.output_j2k, width=width, height=height, tile_w=tile_w, tile_h=tile_h,
+                       comps=args.comps, precision=args.precision, layers=args.layers, decomp=args.decomp,
+                       prog=PROGRESSIONS[args.prog], tile_parts=args.tile_parts, sop=args.sop, plt=args.plt)
+    dt = time.perf_counter() - t0
+    tiles = -(-width // tile_w) * -(-height // tile_h)
+    print(f'[+] wrote {args.output_j2k} ({size} bytes, {tiles} tiles x {args.tile_parts} tile-parts, {dt:.2f}s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+/*
+ * Stand-in for FastCGI's fcgi_stdio.h so query_parser.c also builds with
+ * -DSERVER; the FCGI streams are plain stdio here.
+ */
+#ifndef FCGI_STDIO_H
+#define FCGI_STDIO_H
+
+#include <stdio.h>
+
+#define FCGI_stdout stdout
+#define FCGI_stderr stderr
+
+#endif /* FCGI_STDIO_H */
@@ -0,0 +1,21 @@
+/*
+ * Minimal stand-in for openjp2's opj_includes.h, enough to build the
+ * vendored query_parser.c outside the OpenJPEG tree (see query_harness.py).
+ */
+#ifndef OPJ_INCLUDES_H
+#define OPJ_INCLUDES_H
+
+#include <stddef.h>
+#include <stdlib.h>
+
+typedef int OPJ_BOOL;
+#define OPJ_TRUE 1
+#define OPJ_FALSE 0
+
+typedef size_t OPJ_SIZE_T;
+
+#define opj_malloc(size) malloc(size)
+#define opj_calloc(num, size) calloc(num, size)
+#define opj_free(ptr) free(ptr)
+
+#endif /* OPJ_INCLUDES_H */
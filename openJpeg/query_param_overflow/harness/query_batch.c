@@ -0,0 +1,67 @@
+/*
+ * Batch entry point for query_harness.py: parse many queries per ctypes
+ * call so the per-call overhead of Python is paid once per batch.
+ */
+#include <string.h>
+#include <stdint.h>
+#include "query_parser.h"
+
+/* fields copied out per query, in this order */
+#define QB_NFIELDS 17
+
+static int spilled(int v)
+{
+    /* limit[0] made of four printable bytes: box_type[MAX_NUMOFBOX] landed on it */
+    int i;
+    for (i = 0; i < 4; i++) {
+        unsigned char c = (unsigned char)(v >> (8 * i));
+        if (c < 0x21 || c > 0x7e) {
+            return 0;
+        }
+    }
+    return 1;
+}
+
+/*
+ * buf holds n NUL-terminated queries back to back. When out is not NULL it
+ * receives QB_NFIELDS int32 per query. Returns the number of queries whose
+ * limit[0] looks overwritten by a box type.
+ */
+int parse_query_batch(const char *buf, int n, int32_t *out)
+{
+    int i, nbox, suspects = 0;
+    query_param_t *q;
+
+    for (i = 0; i < n; i++) {
+        q = parse_query(buf);
+        buf += strlen(buf) + 1;
+        if (q == NULL) {
+            continue;
+        }
+        suspects += spilled(q->limit[0]);
+        if (out) {
+            for (nbox = 0; nbox < MAX_NUMOFBOX && q->box_type[nbox][0]; nbox++)
+                ;
+            out[0] = q->fx;
+            out[1] = q->fy;
+            out[2] = q->rx;
+            out[3] = q->ry;
+            out[4] = q->rw;
+            out[5] = q->rh;
+            out[6] = q->layers;
+            out[7] = q->lastcomp;
+            out[8] = q->cnew;
+            out[9] = q->numOfcclose;
+            out[10] = nbox;
+            out[11] = q->limit[0];
+            out[12] = q->root_bin;
+            out[13] = q->max_depth;
+            out[14] = q->metadata_only;
+            out[15] = q->return_type;
+            out[16] = q->len;
+            out += QB_NFIELDS;
+        }
+        delete_query(&q);
+    }
+    return suspects;
+}
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# In-process harness for the vendored openjpip query_parser.c.
+#
+# query_parser.c is compiled with ASan into a shared object together with
+# harness/query_batch.c (a batch entry point) and stub opj_includes.h /
+# fcgi_stdio.h headers, then driven through ctypes: one call parses a whole
+# batch of NUL-separated queries. A grammar-based generator produces the
+# queries (metareq, fsiz, roff, rsiz, comps, cclose, ...); batches are
+# generated and parsed in worker processes from (seed, batch index), so a
+# batch that crashes a worker can be regenerated and saved for replay.
+#
+#   python3 query_harness.py --count 10000000
+#   python3 query_harness.py --max-boxes 11 --count 100000   # reach the overflow
+#   python3 query_harness.py --replay crash-batch-3.txt
+import argparse
+import ctypes
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+SOURCES = [HERE / 'query_parser.c', HERE / 'harness' / 'query_batch.c']
+BUILD_DIR = HERE / 'harness'
+
+# query_parser.h / query_parser.c limits
+MAX_NUMOFBOX = 10
+MAX_LENOFFIELDNAME = 10
+MAX_LENOFFIELDVAL = 128
+
+# per-query fields returned by parse_query_batch(), see harness/query_batch.c
+FIELDS = ('fx', 'fy', 'rx', 'ry', 'rw', 'rh', 'layers', 'lastcomp', 'cnew', 'num_cclose', 'num_boxes',
+          'limit0', 'root_bin', 'max_depth', 'metadata_only', 'return_type', 'len')
+
+
+def build(cc: str = None, asan: bool = True, force: bool = False) -> Path:
+    """Compile query_parser.c and the batch shim into a shared object in
+    harness/ (skipped when it is newer than its sources); returns its path."""
+    lib = BUILD_DIR / ('libquery_parser_asan.so' if asan else 'libquery_parser.so')
+    if not force and lib.exists() and all(lib.stat().st_mtime > s.stat().st_mtime for s in SOURCES):
+        return lib
+    cc = cc or os.environ.get('CC', 'cc')
+    flags = ['-g', '-O1', '-fPIC', '-shared', '-fno-omit-frame-pointer']
+    if asan:
+        flags.append('-fsanitize=address')
+    cmd = [cc, *flags, '-I', str(HERE / 'harness'), '-I', str(HERE), *map(str, SOURCES), '-o', str(lib)]
+    subprocess.run(cmd, check=True)
+    return lib
+
+
+def asan_runtime(cc: str = None) -> str:
+    out = subprocess.run([cc or os.environ.get('CC', 'cc'), '-print-file-name=libasan.so'],
+                         capture_output=True, text=True).stdout.strip()
+    return out if os.path.isabs(out) else ''
+
+
+def ensure_asan_preload(cc: str = None) -> None:
+    """An ASan shared object needs the ASan runtime loaded first; re-exec
+    the interpreter with it preloaded (and leak checking off, since CPython
+    itself never frees everything)."""
+    if 'libasan' in os.environ.get('LD_PRELOAD', ''):
+        return
+    runtime = asan_runtime(cc)
+    if not runtime:
+        sys.exit('[-] cannot locate libasan.so; build with --no-asan or set LD_PRELOAD')
+    env = dict(os.environ, LD_PRELOAD=runtime)
+    env.setdefault('ASAN_OPTIONS', 'detect_leaks=0')
+    os.execve(sys.executable, [sys.executable, *sys.argv], env)
+
+
+_lib = None
+
+
+def load(path=None):
+    global _lib
+    if _lib is None:
+        path = path or build()
+        _lib = ctypes.CDLL(str(path))
+        _lib.parse_query_batch.argtypes = (ctypes.c_char_p, ctypes.c_int, ctypes.c_void_p)
+        _lib.parse_query_batch.restype = ctypes.c_int
+    return _lib
+
+
+def parse_batch(queries, want_fields: bool = False):
+    """Parse every query (bytes, no NUL) in one call. Returns (suspects,
+    fields) where fields is an array('i') of len(FIELDS) values per query,
+    or None."""
+    lib = load()
+    buf = b'\0'.join(queries) + b'\0'
+    out = None
+    if want_fields:
+        out = array('i', bytes(4 * len(FIELDS) * len(queries)))
+        ptr = out.buffer_info()[0]
+    suspects = lib.parse_query_batch(buf, len(queries), ptr if want_fields else None)
+    return suspects, out
+
+
+def parse_one(query) -> dict:
+    if isinstance(query, str):
+        query = query.encode()
+    suspects, out = parse_batch([query], want_fields=True)
+    return dict(zip(FIELDS, out), suspect=bool(suspects))
+
+
+# ---------------------------------------------------------------------------
+# Query grammar
+
+FOURCCS = ('jp2h', 'ihdr', 'colr', 'xml ', 'uuid', 'asoc', 'lbl ', 'nlst', 'ftyp', 'res ', 'jp2c', 'kkkk')
+
+
+class QueryGen:
+    """Random JPIP queries from a small grammar. `max_boxes` bounds the
+    metareq entries (MAX_NUMOFBOX is the last safe count); field values are
+    kept under `max_value` bytes, the size of parse_query()'s stack buffer."""
+
+    def __init__(self, seed: int, max_boxes: int = MAX_NUMOFBOX, max_value: int = MAX_LENOFFIELDVAL - 1,
+                 max_comp: int = 4096):
+        self.r = random.Random(seed)
+        self.max_boxes = max_boxes
+        self.max_value = max_value
+        self.max_comp = max_comp
+        self.fields = (
+            ('target', self.target), ('tid', self.ident), ('fsiz', self.pair), ('roff', self.pair),
+            ('rsiz', self.pair), ('layers', self.number), ('cid', self.ident), ('cnew', self.cnew),
+            ('cclose', self.cclose), ('metareq', self.metareq), ('comps', self.comps), ('type', self.type),
+            ('len', self.number),
+        )
+
+    def number(self) -> str:
+        r = self.r
+        pick = r.random()
+        if pick < 0.6:
+            return str(r.randrange(0, 4096))
+        if pick < 0.8:
+            return str(r.choice((-1, 0, 1, 2000, 2 ** 31 - 1, -2 ** 31, 2 ** 32)))
+        return str(r.randrange(-2 ** 31, 2 ** 31))
+
+    def pair(self) -> str:
+        return f'{self.number()},{self.number()}'
+
+    def ident(self) -> str:
+        return ''.join(self.r.choices('0123456789abcdefJPIP', k=self.r.randrange(1, 17)))
+
+    def target(self) -> str:
+        return self.r.choice(('a.jp2', 'image.jp2', 'x/y.j2k', '')) + self.ident()[:self.r.randrange(0, 8)]
+
+    def cnew(self) -> str:
+        return self.r.choice(('http', 'http-tcp', 'tcp', 'udp', ''))
+
+    def cclose(self) -> str:
+        if self.r.random() < 0.2:
+            return '*'
+        return ','.join(self.ident()[:8] for _ in range(self.r.randrange(1, 6)))
+
+    def type(self) -> str:
+        return self.r.choice(('jpp-stream', 'jpt-stream', 'jpp-stream;ptype=ext', 'raw'))
+
+    def comps(self) -> str:
+        r = self.r
+        a, b, c = sorted(r.randrange(0, self.max_comp) for _ in range(3))
+        return r.choice((f'{c}', f'{a},{c}', f'{a}-{c}', f'{a}-{b},{c}', f'{a},{b}-{c}'))
+
+    def box_prop(self) -> str:
+        r = self.r
+        out = '*' if r.random() < 0.15 else r.choice(FOURCCS)
+        pick = r.random()
+        if pick < 0.3:
+            out += f':{r.randrange(0, 1 << 20)}'
+        elif pick < 0.4:
+            out += ':r'
+        if r.random() < 0.4:
+            out += '/' + ''.join(r.sample('wsga', r.randrange(1, 5)))
+        if r.random() < 0.3:
+            out += '!'
+        return out
+
+    def metareq(self) -> str:
+        r = self.r
+        # bias towards the boundary: 1..max_boxes with the top counts favoured
+        n = max(1, self.max_boxes - int(r.expovariate(0.5))) if r.random() < 0.5 else r.randrange(1, self.max_boxes + 1)
+        suffix = ''
+        if r.random() < 0.3:
+            suffix += f'R{r.randrange(0, 256)}'
+        if r.random() < 0.3:
+            suffix += f'D{r.randrange(0, 16)}'
+        if r.random() < 0.2:
+            suffix += '!!'
+        n = min(n, (self.max_value - len(suffix) - 1) // 5)
+        # the closing ']' must stay inside the value: shorten entries rather
+        # than cut the list (a truncated list reads past fieldval)
+        budget = self.max_value - len(suffix) - 2 - (n - 1)
+        props = []
+        for i in range(n):
+            prop = self.box_prop()
+            left = budget - sum(map(len, props)) - (n - i - 1) * 4
+            props.append(prop if len(prop) <= left else prop[:4])
+        return '[' + ';'.join(props) + ']' + suffix
+
+    def query(self) -> bytes:
+        parts = []
+        for name, gen in self.r.sample(self.fields, self.r.randrange(1, 6)):
+            value = gen()
+            if len(value) > self.max_value:
+                value = value[:self.max_value]
+            parts.append(f'{name}={value}')
+        return '&'.join(parts).encode()
+
+    def batch(self, n: int) -> list:
+        return [self.query() for _ in range(n)]
+
+
+def batch_queries(seed: int, index: int, size: int, max_boxes: int) -> list:
+    # every batch has its own generator so any one can be regenerated alone
+    return QueryGen(seed * 1_000_003 + index, max_boxes).batch(size)
+
+
+def _run_batch(job) -> tuple:
+    seed, index, size, max_boxes = job
+    suspects, _ = parse_batch(batch_queries(seed, index, size, max_boxes))
+    return index, suspects
+
+
+def run(count: int, batch_size: int, seed: int, max_boxes: int, workers: int = None, crash_dir='.') -> tuple:
+    """Parse `count` generated queries; returns (parsed, suspects). A batch
+    that kills its worker (ASan report) is written to crash-batch-<i>.txt."""
+    load()  # loaded before the workers fork
+    nbatches = -(-count // batch_size)
+    jobs = [(seed, i, min(batch_size, count - i * batch_size), max_boxes) for i in range(nbatches)]
+    parsed = suspects = 0
+    pending = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            pending = {ex.submit(_run_batch, job): job for job in jobs}
+            for fut in list(pending):
+                index, s = fut.result()
+                parsed += pending.pop(fut)[2]
+                suspects += s
+    except BrokenProcessPool:
+        for job in pending.values():
+            path = os.path.join(crash_dir, f'crash-batch-{job[1]}.txt')
+            with open(path, 'wb') as f:
+                f.write(b'\n'.join(batch_queries(*job)) + b'\n')
+        print(f'[-] a worker died; {len(pending)} unfinished batches saved as crash-batch-<i>.txt '
+              f'(replay with --replay)', file=sys.stderr)
+    return parsed, suspects
+
+
+def replay(path, stop_on_first: bool = True) -> None:
+    """Parse a saved batch one query at a time (in this process), printing
+    each query before parsing it so an ASan report follows its query."""
+    for line in Path(path).read_bytes().splitlines():
+        print(line.decode(errors='replace'), flush=True)
+        res = parse_one(line)
+        if res['suspect']:
+            print(f'    limit[0] = {res["limit0"] & 0xFFFFFFFF:#x} (box type spilled into limit[0])')
+            if stop_on_first:
+                return
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description='Batch-parse generated JPIP queries with an ASan build of query_parser.c.')
+    ap.add_argument('--count', type=int, default=1_000_000, help='queries to generate and parse')
+    ap.add_argument('--batch', type=int, default=10_000, help='queries per ctypes call')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--max-boxes', type=int, default=MAX_NUMOFBOX,
+                    help=f'max metareq entries (>{MAX_NUMOFBOX} reaches the box_type overflow)')
+    ap.add_argument('--workers', type=int, default=None)
+    ap.add_argument('--replay', metavar='FILE', help='parse the queries in FILE (one per line) one by one')
+    ap.add_argument('--query', help='parse one query and print the resulting fields')
+    ap.add_argument('--no-asan', action='store_true', help='build without AddressSanitizer')
+    ap.add_argument('--rebuild', action='store_true')
+    ap.add_argument('--cc', default=None, help='C compiler (default: $CC or cc)')
+    args = ap.parse_args()
+
+    if shutil.which(args.cc or os.environ.get('CC', 'cc')) is None:
+        sys.exit('[-] no C compiler found')
+    lib = build(args.cc, asan=not args.no_asan, force=args.rebuild)
+    if not args.no_asan:
+        ensure_asan_preload(args.cc)
+    load(lib)
+
+    if args.query is not None:
+        for k, v in parse_one(args.query).items():
+            print(f'    {k:14}: {v}')
+        return
+    if args.replay:
+        replay(args.replay)
+        return
+
+    t0 = time.perf_counter()
+    parsed, suspects = run(args.count, args.batch, args.seed, args.max_boxes, args.workers)
+    dt = time.perf_counter() - t0
+    print(f'[+] parsed {parsed} queries in {dt:.2f}s ({parsed / dt:,.0f} queries/s)')
+    print(f'    limit[0] overwritten by a box type: {suspects}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+# Shared helpers for the PoC generators in this repo.
+#
+# Generators import from here after putting the repo root on sys.path:
+#
+#     sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+#     from poclib.oggcrc import ogg_crc
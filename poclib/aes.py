@@ -0,0 +1,99 @@
+# AES-128-CBC encryption for generators that need to produce encrypted
+# payloads (GSF transport encryption).
+#
+# Uses the `cryptography` package when it is installed and falls back to a
+# small pure-Python AES-128 otherwise (correct, but only ~tens of thousands
+# of blocks/s).
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:  # optional dependency
+    Cipher = None
+
+
+def _xtime(a: int) -> int:
+    a <<= 1
+    return (a ^ 0x11B) if a & 0x100 else a
+
+
+def _make_sbox() -> bytes:
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        # p iterates over the multiplicative group, q is its inverse
+        p = p ^ _xtime(p)
+        q ^= q << 1
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xFF
+        if q & 0x80:
+            q ^= 0x09
+        x = q ^ ((q << 1) | (q >> 7)) ^ ((q << 2) | (q >> 6)) ^ ((q << 3) | (q >> 5)) ^ ((q << 4) | (q >> 4))
+        sbox[p] = (x ^ 0x63) & 0xFF
+        if p == 1:
+            break
+    sbox[0] = 0x63
+    return bytes(sbox)
+
+
+_SBOX = _make_sbox()
+_XT = bytes(_xtime(i) & 0xFF for i in range(256))
+
+
+def _expand_key(key: bytes) -> list:
+    if len(key) != 16:
+        raise ValueError("AES-128 key must be 16 bytes")
+    w = [list(key[i:i + 4]) for i in range(0, 16, 4)]
+    rcon = 1
+    for i in range(4, 44):
+        t = list(w[i - 1])
+        if i % 4 == 0:
+            t = [_SBOX[b] for b in t[1:] + t[:1]]
+            t[0] ^= rcon
+            rcon = _xtime(rcon) & 0xFF
+        w.append([a ^ b for a, b in zip(w[i - 4], t)])
+    return [sum(w[r * 4:r * 4 + 4], []) for r in range(11)]
+
+
+def _encrypt_block(rk: list, block) -> bytes:
+    s = [b ^ k for b, k in zip(block, rk[0])]
+    sb, xt = _SBOX, _XT
+    for r in range(1, 11):
+        s = [sb[b] for b in s]
+        # ShiftRows on the column-major state
+        s = [s[(i + 4 * (i % 4)) % 16] for i in range(16)]
+        if r != 10:
+            m = []
+            for c in range(0, 16, 4):
+                a0, a1, a2, a3 = s[c:c + 4]
+                t = a0 ^ a1 ^ a2 ^ a3
+                m += [a0 ^ t ^ xt[a0 ^ a1], a1 ^ t ^ xt[a1 ^ a2], a2 ^ t ^ xt[a2 ^ a3], a3 ^ t ^ xt[a3 ^ a0]]
+            s = m
+        s = [b ^ k for b, k in zip(s, rk[r])]
+    return bytes(s)
+
+
+class CbcEncryptor:
+    """AES-128-CBC; successive update() calls continue the chain."""
+
+    def __init__(self, key: bytes, iv: bytes):
+        if len(iv) != 16:
+            raise ValueError("IV must be 16 bytes")
+        if Cipher is not None:
+            self._enc = Cipher(algorithms.AES(bytes(key)), modes.CBC(bytes(iv))).encryptor()
+        else:
+            self._enc = None
+            self._rk = _expand_key(bytes(key))
+            self._prev = bytes(iv)
+
+    def update(self, data) -> bytes:
+        if len(data) % 16:
+            raise ValueError("CBC input must be a multiple of 16 bytes")
+        if self._enc is not None:
+            return self._enc.update(bytes(data))
+        out = bytearray()
+        prev = self._prev
+        for i in range(0, len(data), 16):
+            prev = _encrypt_block(self._rk, [a ^ b for a, b in zip(data[i:i + 16], prev)])
+            out += prev
+        self._prev = prev
+        return bytes(out)
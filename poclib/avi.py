@@ -0,0 +1,354 @@
+# AVI 1.0 / OpenDML (AVI 2.0) writer.
+#
+# AviWriter streams chunks straight to a seekable file, in the layout read
+# by avi_parse_input_file() in GPAC's media_tools/avilib.c:
+#
+#   RIFF 'AVI ' { LIST hdrl { avih, LIST strl { strh, strf, indx }..., LIST odml { dmlh } },
+#                 LIST movi { ##dc/##wb ..., ix## ... }, idx1 }
+#   RIFF 'AVIX' { LIST movi { ##dc/##wb ..., ix## ... } }...
+#
+# RIFF/LIST sizes, frame counts and the indx super-indexes (reserved up
+# front with a fixed capacity) are back-patched by seeking once their values
+# are known, so the only tables held in memory are the array-backed entries
+# of the standard index being filled, the super-index and idx1.
+#
+# wLongsPerEntry / nEntriesInUse of both index kinds can be overridden
+# independently of the entries actually written, which is what the
+# malformed variants need: avilib sizes its tables from the header fields
+# but reads fixed-size entries.
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+
+def le16(x): return struct.pack("<H", x & 0xFFFF)
+def le32(x): return struct.pack("<I", x & 0xFFFFFFFF)
+def le64(x): return struct.pack("<Q", x & 0xFFFFFFFFFFFFFFFF)
+
+
+AVI_INDEX_OF_INDEXES = 0x00
+AVI_INDEX_OF_CHUNKS = 0x01
+
+AVIF_HASINDEX = 0x00000010
+AVIF_ISINTERLEAVED = 0x00000100
+AVIIF_KEYFRAME = 0x00000010
+
+STD_KEY_FRAME_BIT = 0x80000000  # set in an ix## dwSize for non-key frames
+
+SUPER_LONGS = 4  # qwOffset, dwSize, dwDuration
+STD_LONGS = 2    # dwOffset, dwSize
+SUPER_CAPACITY = 256
+RIFF_LIMIT = 1 << 30
+# smaller holes are written as zeros: one extent per chunk would bloat the
+# filesystem's extent tree far more than the zeros cost
+HOLE_MIN = 1 << 20
+_ZEROS = memoryview(bytes(HOLE_MIN))
+
+_INDEX_HDR = struct.Struct("<HBBI4s")  # wLongsPerEntry, bIndexSubType, bIndexType, nEntriesInUse, dwChunkId
+_STRH_LENGTH = 32                      # dwLength offset in strh
+_STRH_BUFSIZE = 36                     # dwSuggestedBufferSize offset in strh
+
+
+def _le_array(values) -> bytes:
+    a = values if isinstance(values, array) else array("I", values)
+    if sys.byteorder == "big":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def chunk(fcc: bytes, payload: bytes) -> bytes:
+    assert len(fcc) == 4
+    return fcc + le32(len(payload)) + payload + (b"\x00" if len(payload) & 1 else b"")
+
+
+def list_chunk(typ: bytes, *parts: bytes) -> bytes:
+    body = typ + b"".join(parts)
+    return b"LIST" + le32(len(body)) + body
+
+
+def riff(form: bytes, *parts: bytes) -> bytes:
+    body = form + b"".join(parts)
+    return b"RIFF" + le32(len(body)) + body
+
+
+def strh(typ: bytes = b"vids", handler: bytes = b"XVID", scale: int = 1, rate: int = 25, length: int = 0,
+         buffer_size: int = 0, sample_size: int = 0, flags: int = 0, frame: tuple = (0, 0, 0, 0)) -> bytes:
+    """AVISTREAMHEADER payload (56 bytes)."""
+    return struct.pack("<4s4sIHHIIIIIIII4h", typ, handler, flags, 0, 0, 0, scale, rate, 0, length,
+                       buffer_size, 0, sample_size, *frame)
+
+
+def bitmap_info(width: int, height: int, compression: bytes = b"XVID", bit_count: int = 24) -> bytes:
+    """BITMAPINFOHEADER, the strf payload of a video stream."""
+    return struct.pack("<IiiHH4sIiiII", 40, width, height, 1, bit_count, compression,
+                       width * height * bit_count // 8, 0, 0, 0, 0)
+
+
+def wave_format(channels: int = 2, sample_rate: int = 44100, bits: int = 16, tag: int = 1) -> bytes:
+    """WAVEFORMATEX, the strf payload of an audio stream."""
+    align = channels * bits // 8
+    return struct.pack("<HHIIHHH", tag, channels, sample_rate, sample_rate * align, align, bits, 0)
+
+
+def super_index(chunk_id: bytes, entries=(), longs_per_entry: int = SUPER_LONGS, entries_in_use: int = None,
+                capacity: int = None, sub_type: int = 0, index_type: int = AVI_INDEX_OF_INDEXES) -> bytes:
+    """indx payload. `entries` is an array('I') of 4 longs per entry (or
+    (qwOffset, dwSize, dwDuration) tuples); unused slots up to `capacity`
+    are zero-filled."""
+    if not isinstance(entries, array):
+        flat = array("I")
+        for off, size, dur in entries:
+            flat.extend((off & 0xFFFFFFFF, off >> 32, size, dur))
+        entries = flat
+    n = len(entries) // SUPER_LONGS
+    pad = bytes(16 * (capacity - n)) if capacity and capacity > n else b""
+    return (_INDEX_HDR.pack(longs_per_entry, sub_type, index_type, n if entries_in_use is None else entries_in_use,
+                            chunk_id) + bytes(12) + _le_array(entries) + pad)
+
+
+def std_index(chunk_id: bytes, base: int, entries, longs_per_entry: int = STD_LONGS,
+              entries_in_use: int = None, sub_type: int = 0) -> bytes:
+    """ix## payload. `entries` is an array('I') of (dwOffset, dwSize) pairs,
+    offsets relative to `base` and pointing at chunk data."""
+    n = len(entries) // STD_LONGS
+    return (_INDEX_HDR.pack(longs_per_entry, sub_type, AVI_INDEX_OF_CHUNKS,
+                            n if entries_in_use is None else entries_in_use, chunk_id)
+            + le64(base) + le32(0) + _le_array(entries))
+
+
+class AviStream:
+    """One stream: strh/strf parameters and its chunk ids. For audio with a
+    sample_size, durations count samples instead of chunks."""
+
+    def __init__(self, typ: bytes = b"vids", handler: bytes = b"XVID", scale: int = 1, rate: int = 25,
+                 strf: bytes = None, sample_size: int = 0, width: int = 0, height: int = 0):
+        self.typ = typ
+        self.handler = handler
+        self.scale = scale
+        self.rate = rate
+        self.sample_size = sample_size
+        self.width = width
+        self.height = height
+        if strf is None:
+            strf = bitmap_info(width, height, handler) if typ == b"vids" else wave_format()
+        self.strf = strf
+        self.index = None
+        self.frames = 0
+        self.length = 0
+        self.max_chunk = 0
+        self.super = array("I")
+        self.std = array("I")
+        self.std_duration = 0
+
+    def bind(self, index: int) -> None:
+        self.index = index
+        self.chunk_id = b"%02d" % index + (b"dc" if self.typ == b"vids" else b"wb")
+        self.ix_id = b"ix%02d" % index
+        self.ckid = int.from_bytes(self.chunk_id, "little")
+
+    def duration(self, size: int) -> int:
+        return size // self.sample_size if self.sample_size else 1
+
+
+class AviWriter:
+    """Write an OpenDML AVI frame by frame.
+
+    riff_limit: largest RIFF before continuing in a RIFF 'AVIX'.
+    std_max_entries: entries per ix## chunk (default: one per stream per RIFF).
+    super_capacity: super-index slots reserved in each indx chunk.
+    super_longs_per_entry/super_entries_in_use, std_longs_per_entry/
+    std_entries_in_use: header overrides for malformed indexes.
+    idx1: also write the AVI 1.0 index of the first RIFF.
+    """
+
+    def __init__(self, out, streams, *, riff_limit: int = RIFF_LIMIT, std_max_entries: int = None,
+                 super_capacity: int = SUPER_CAPACITY, super_longs_per_entry: int = SUPER_LONGS,
+                 super_entries_in_use: int = None, std_longs_per_entry: int = STD_LONGS,
+                 std_entries_in_use: int = None, idx1: bool = True, usec_per_frame: int = None):
+        if not streams:
+            raise ValueError("at least one stream is required")
+        if not (0 < riff_limit < 1 << 32):
+            raise ValueError("riff_limit must fit in a 32-bit RIFF size")
+        if isinstance(out, (str, Path)):
+            self._fp = open(out, "w+b")
+            self._owned = True
+        else:
+            self._fp = out
+            self._owned = False
+        self.streams = list(streams)
+        for i, s in enumerate(self.streams):
+            s.bind(i)
+        self.riff_limit = riff_limit
+        self.std_max_entries = std_max_entries
+        self.super_capacity = super_capacity
+        self.super_longs_per_entry = super_longs_per_entry
+        self.super_entries_in_use = super_entries_in_use
+        self.std_longs_per_entry = std_longs_per_entry
+        self.std_entries_in_use = std_entries_in_use
+        self.use_idx1 = idx1
+        self.riffs = 0
+        self.std_chunks = 0
+        self.first_riff_frames = 0
+        self._idx1 = array("I")
+        self._closed = False
+
+        video = next((s for s in self.streams if s.typ == b"vids"), self.streams[0])
+        if usec_per_frame is None:
+            usec_per_frame = 1_000_000 * video.scale // video.rate if video.rate else 0
+        self._write_headers(usec_per_frame, video)
+        self._open_riff(b"AVI ")
+
+    # -- layout ------------------------------------------------------------
+    def _tell(self) -> int:
+        return self._fp.tell()
+
+    def _patch(self, pos: int, data: bytes) -> None:
+        end = self._fp.tell()
+        self._fp.seek(pos)
+        self._fp.write(data)
+        self._fp.seek(end)
+
+    def _write_headers(self, usec_per_frame: int, video: AviStream) -> None:
+        self._riff_pos = self._tell()
+        self._fp.write(b"RIFF" + le32(0) + b"AVI ")
+        hdrl_pos = self._tell()
+        self._fp.write(b"LIST" + le32(0) + b"hdrl")
+        self._avih_pos = self._tell() + 8
+        flags = AVIF_ISINTERLEAVED | (AVIF_HASINDEX if self.use_idx1 else 0)
+        self._fp.write(chunk(b"avih", struct.pack("<10I16x", usec_per_frame, 0, 0, flags, 0, 0, len(self.streams),
+                                                  0, video.width, video.height)))
+        for s in self.streams:
+            strl_pos = self._tell()
+            self._fp.write(b"LIST" + le32(0) + b"strl")
+            s.strh_pos = self._tell() + 8
+            self._fp.write(chunk(b"strh", strh(s.typ, s.handler, s.scale, s.rate, sample_size=s.sample_size,
+                                               frame=(0, 0, s.width, s.height))))
+            self._fp.write(chunk(b"strf", s.strf))
+            s.indx_pos = self._tell()
+            self._fp.write(chunk(b"indx", super_index(s.chunk_id, capacity=self.super_capacity,
+                                                      longs_per_entry=self.super_longs_per_entry)))
+            self._close_list(strl_pos)
+        odml_pos = self._tell()
+        self._fp.write(b"LIST" + le32(0) + b"odml")
+        self._dmlh_pos = self._tell() + 8
+        self._fp.write(chunk(b"dmlh", bytes(248)))
+        self._close_list(odml_pos)
+        self._close_list(hdrl_pos)
+
+    def _close_list(self, pos: int) -> None:
+        self._patch(pos + 4, le32(self._tell() - pos - 8))
+
+    def _open_riff(self, form: bytes) -> None:
+        if form != b"AVI ":
+            self._riff_pos = self._tell()
+            self._fp.write(b"RIFF" + le32(0) + form)
+        self._movi_pos = self._tell()
+        self._fp.write(b"LIST" + le32(0) + b"movi")
+        self._movi_frames = 0
+        self.riffs += 1
+
+    def _close_riff(self) -> None:
+        for s in self.streams:
+            self._flush_std(s)
+        self._close_list(self._movi_pos)
+        if self.riffs == 1:
+            self.first_riff_frames = self.streams[0].frames
+            if self.use_idx1:
+                self._fp.write(b"idx1" + le32(4 * len(self._idx1)) + _le_array(self._idx1))
+                self._idx1 = array("I")
+        self._patch(self._riff_pos + 4, le32(self._tell() - self._riff_pos - 8))
+
+    def _flush_std(self, s: AviStream) -> None:
+        if not s.std:
+            return
+        if len(s.super) // SUPER_LONGS >= self.super_capacity:
+            raise ValueError(f"stream {s.index}: super index full ({self.super_capacity} entries); "
+                             "raise super_capacity or std_max_entries")
+        pos = self._tell()
+        data = chunk(s.ix_id, std_index(s.chunk_id, self._movi_pos, s.std, self.std_longs_per_entry,
+                                        self.std_entries_in_use))
+        self._fp.write(data)
+        s.super.extend((pos & 0xFFFFFFFF, pos >> 32, len(data), s.std_duration))
+        s.std = array("I")
+        s.std_duration = 0
+        self.std_chunks += 1
+
+    # -- frames ------------------------------------------------------------
+    def frame(self, stream: int, data=b"", *, key: bool = True, size: int = None) -> None:
+        """Append one chunk to `stream`. With size= and no data, the payload
+        is zeros, left as a hole when it is at least HOLE_MIN bytes."""
+        if size is not None and len(data):
+            raise ValueError("pass either data or size")
+        s = self.streams[stream]
+        n = len(data) if size is None else size
+        # chunk, its ix## entry and its idx1 entry must still fit in this RIFF
+        grow = 8 + n + (n & 1) + 8 + 16
+        if self._movi_frames and self._tell() + grow + self._index_reserve() - self._riff_pos - 8 > self.riff_limit:
+            self._close_riff()
+            self._open_riff(b"AVIX")
+        elif self.std_max_entries and len(s.std) // STD_LONGS >= self.std_max_entries:
+            self._flush_std(s)
+
+        pos = self._tell()
+        self._fp.write(s.chunk_id + le32(n))
+        if size is None:
+            self._fp.write(data)
+        elif n >= HOLE_MIN:
+            self._fp.seek(n, os.SEEK_CUR)
+        else:
+            self._fp.write(_ZEROS[:n])
+        if n & 1:
+            self._fp.write(b"\x00")
+
+        s.std.extend((pos + 8 - self._movi_pos, n if key else n | STD_KEY_FRAME_BIT))
+        dur = s.duration(n)
+        s.std_duration += dur
+        s.length += dur
+        s.frames += 1
+        self._movi_frames += 1
+        s.max_chunk = max(s.max_chunk, n)
+        if self.riffs == 1 and self.use_idx1:
+            self._idx1.extend((s.ckid, AVIIF_KEYFRAME if key else 0, pos - self._movi_pos - 8, n))
+
+    def _index_reserve(self) -> int:
+        """Bytes the pending ix## chunks (and idx1) will add to this RIFF."""
+        n = sum(8 + 24 + 4 * len(s.std) for s in self.streams if s.std)
+        if self.riffs == 1 and self.use_idx1:
+            n += 8 + 4 * len(self._idx1)
+        return n
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._close_riff()
+        end = self._tell()
+        total = self.first_riff_frames if self.riffs > 1 else self.streams[0].frames
+        max_chunk = max(s.max_chunk for s in self.streams)
+        self._patch(self._avih_pos + 16, le32(total))
+        self._patch(self._avih_pos + 28, le32(max_chunk))
+        self._patch(self._dmlh_pos, le32(self.streams[0].frames))
+        for s in self.streams:
+            self._patch(s.strh_pos + _STRH_LENGTH, le32(s.length))
+            self._patch(s.strh_pos + _STRH_BUFSIZE, le32(s.max_chunk))
+            self._patch(s.indx_pos, chunk(b"indx", super_index(
+                s.chunk_id, s.super, self.super_longs_per_entry, self.super_entries_in_use, self.super_capacity)))
+        self._fp.seek(end)
+        self.size = end
+        if self._owned:
+            self._fp.close()
+        else:
+            self._fp.flush()
+
+    @property
+    def bytes_written(self) -> int:
+        return self.size if self._closed else self._tell()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
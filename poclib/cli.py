@@ -0,0 +1,21 @@
+# Command-line helpers shared by the generators' sweep modes.
+
+
+def parse_values(spec: str) -> list:
+    """Integer list from a value spec: comma-separated single values and
+    inclusive ranges with an optional step, in any base int(x, 0) accepts.
+
+        "64"  "8,16,24"  "1-64"  "1-64/8"  "0x7ffffff0-0x80000010,0x20"
+    """
+    out = []
+    for part in spec.split(","):
+        part, _, step = part.partition("/")
+        step = int(step, 0) if step else 1
+        if step <= 0:
+            raise ValueError(f"step must be positive in {spec!r}")
+        if "-" in part:
+            lo, hi = part.split("-")
+            out.extend(range(int(lo, 0), int(hi, 0) + 1, step))
+        else:
+            out.append(int(part, 0))
+    return out
@@ -0,0 +1,311 @@
+# GPAC GHI (DASH generation helper index) encoder, binary GHID flavour.
+#
+# Layout follows ghi_dmx_init_bin() / ghi_dmx_declare_opid_bin() /
+# ghi_dmx_parse_seg() in gpac_ghi/dmx_ghi.c. Segment tables are built as
+# whole columns (array, or NumPy when installed), byte-swapped in bulk and
+# interleaved with strided memoryview copies, so millions of segments cost
+# a few buffer operations instead of a struct.pack per field.
+import struct
+import sys
+from array import array
+
+from .gpac_props import (PID_PROP_TYPES, PROP_4CC, PROP_4CC_LIST, PROP_BOOL, PROP_CONST_DATA, PROP_DATA,
+                         PROP_DATA_NO_COPY, PROP_DOUBLE, PROP_FIRST_ENUM, PROP_FLOAT, PROP_FRACTION,
+                         PROP_FRACTION64, PROP_LSINT, PROP_LUINT, PROP_NAME, PROP_POINTER, PROP_SINT,
+                         PROP_SINT_LIST, PROP_STRING, PROP_STRING_LIST, PROP_STRING_NO_COPY, PROP_UINT,
+                         PROP_UINT_LIST, PROP_VEC2, PROP_VEC2I, PROP_VEC2I_LIST, PROP_VEC3I, PROP_VEC4I, fourcc)
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+MAGIC = b"GHID"
+VERSION = 1
+PROPS_END = 0xFFFFFFFF
+
+# rep_flags bits, as tested in ghi_dmx_parse_seg()
+REP_TFDT_64 = 1 << 0
+REP_SEQ_64 = 1 << 1
+REP_OFFSET = 1 << 2
+REP_OFFSET_64 = 1 << 3
+REP_FRAG_TFDT = 1 << 4
+REP_FRAG_TFDT_64 = 1 << 5
+REP_SPLIT = 1 << 6
+
+# Two segment record layouts:
+#  LAYOUT_PARSE: fields exactly as ghi_dmx_parse_seg() reads them.
+#  LAYOUT_SKIP: records padded to the stride ghi_dmx_init_bin() uses to skip
+#    to segment `sn` (3 words + 1 per flag bit 0..5 + 2 for bit 6). The two
+#    only differ when REP_OFFSET_64 / REP_FRAG_TFDT_64 are set without
+#    REP_OFFSET / REP_FRAG_TFDT.
+LAYOUT_PARSE = "parse"
+LAYOUT_SKIP = "skip"
+
+U32_MAX = 0xFFFFFFFF
+
+
+def be32(x): return struct.pack(">I", x & 0xFFFFFFFF)
+def be64(x): return struct.pack(">Q", x & 0xFFFFFFFFFFFFFFFF)
+
+
+def utf8z(s) -> bytes:
+    if isinstance(s, str):
+        s = s.encode("utf-8")
+    if b"\0" in s:
+        raise ValueError("GHI strings are NUL-terminated and cannot contain NUL")
+    return s + b"\0"
+
+
+# ---------------------------------------------------------------------------
+# Properties
+
+def _u32_list(values) -> bytes:
+    if np is not None and isinstance(values, np.ndarray):
+        return values.astype(">u4", copy=False).tobytes()
+    a = array("I")
+    if isinstance(values, array) and values.itemsize == 4:
+        a.frombytes(values.tobytes())  # also reinterprets signed 'i' arrays
+    else:
+        a.extend(v & U32_MAX for v in values)
+    if sys.byteorder == "little":
+        a.byteswap()
+    return a.tobytes()
+
+
+def encode_prop_value(ptype: int, value) -> bytes:
+    """Serialize a property value the way ghi_dmx_declare_opid_bin() reads it.
+    Types the demuxer reads no payload for (pointers, enums) encode to b''."""
+    if ptype in (PROP_SINT, PROP_UINT):
+        return be32(value)
+    if ptype == PROP_4CC:
+        return be32(fourcc(value))
+    if ptype in (PROP_LSINT, PROP_LUINT):
+        return be64(value)
+    if ptype == PROP_BOOL:
+        return b"\x01" if value else b"\x00"
+    if ptype == PROP_FRACTION:
+        return be32(value[0]) + be32(value[1])
+    if ptype == PROP_FRACTION64:
+        return be64(value[0]) + be64(value[1])
+    if ptype == PROP_FLOAT:
+        return struct.pack(">f", value)
+    if ptype == PROP_DOUBLE:
+        return struct.pack(">d", value)
+    if ptype == PROP_VEC2:
+        return struct.pack(">dd", *value)
+    if ptype in (PROP_VEC2I, PROP_VEC3I, PROP_VEC4I):
+        n = {PROP_VEC2I: 2, PROP_VEC3I: 3, PROP_VEC4I: 4}[ptype]
+        if len(value) != n:
+            raise ValueError(f"property type {ptype} takes {n} components")
+        return b"".join(be32(v) for v in value)
+    if ptype in (PROP_STRING, PROP_STRING_NO_COPY, PROP_NAME):
+        return utf8z(value)
+    if ptype in (PROP_DATA, PROP_DATA_NO_COPY, PROP_CONST_DATA):
+        return be32(len(value)) + bytes(value)
+    if ptype == PROP_STRING_LIST:
+        return be32(len(value)) + b"".join(utf8z(v) for v in value)
+    if ptype in (PROP_UINT_LIST, PROP_SINT_LIST):
+        return be32(len(value)) + _u32_list(value)
+    if ptype == PROP_4CC_LIST:
+        return be32(len(value)) + _u32_list([fourcc(v) for v in value])
+    if ptype == PROP_VEC2I_LIST:
+        # (x, y) pairs, or an already flat sequence of 2*n words
+        flat = value if not len(value) or not isinstance(value[0], (tuple, list)) else [c for xy in value for c in xy]
+        if len(flat) % 2:
+            raise ValueError("VEC2I_LIST needs an even number of values")
+        return be32(len(flat) // 2) + _u32_list(flat)
+    if ptype == PROP_POINTER or ptype >= PROP_FIRST_ENUM:
+        return b""
+    raise ValueError(f"unknown property type {ptype}")
+
+
+def encode_prop(key, value, ptype: int = None) -> bytes:
+    """One property entry. `key` is a 4CC (int, or 4-byte bytes) of a
+    built-in property, whose type is looked up unless given, or a str name
+    of a dynamic property (written with p4cc=0, its name and type)."""
+    if isinstance(key, str):
+        if ptype is None:
+            raise ValueError(f"dynamic property {key!r} needs an explicit type")
+        return be32(0) + utf8z(key) + be32(ptype) + encode_prop_value(ptype, value)
+    p4cc = fourcc(key)
+    if ptype is None:
+        ptype = PID_PROP_TYPES.get(p4cc)
+        if ptype is None:
+            raise ValueError(f"no known type for property {p4cc:#010x}; pass ptype")
+    return be32(p4cc) + encode_prop_value(ptype, value)
+
+
+def encode_props(props) -> bytes:
+    """Props block: props_size, the entries, then the 0xFFFFFFFF end
+    marker. `props` holds (key, value) or (key, value, ptype) tuples."""
+    body = b"".join(encode_prop(*p) for p in props) + be32(PROPS_END)
+    return be32(4 + len(body)) + body
+
+
+# ---------------------------------------------------------------------------
+# Segment tables
+
+def seg_fields(flags: int):
+    """[(column, words), ...] of one segment record as parsed."""
+    out = [("tfdt", 2 if flags & REP_TFDT_64 else 1), ("seq", 2 if flags & REP_SEQ_64 else 1), ("duration", 1)]
+    if flags & REP_OFFSET:
+        out.append(("offset", 2 if flags & REP_OFFSET_64 else 1))
+    if flags & REP_FRAG_TFDT:
+        out.append(("frag_tfdt", 2 if flags & REP_FRAG_TFDT_64 else 1))
+    if flags & REP_SPLIT:
+        out += [("split_first", 1), ("split_last", 1)]
+    return out
+
+
+def skip_stride_words(flags: int) -> int:
+    """Record size in words as computed by ghi_dmx_init_bin()."""
+    return 3 + sum(1 for b in range(6) if flags & (1 << b)) + (2 if flags & REP_SPLIT else 0)
+
+
+def record_words(flags: int, layout: str = LAYOUT_PARSE) -> int:
+    words = sum(w for _, w in seg_fields(flags))
+    if layout == LAYOUT_SKIP:
+        return max(words, skip_stride_words(flags))
+    if layout != LAYOUT_PARSE:
+        raise ValueError(f"unknown layout {layout!r}")
+    return words
+
+
+def _column(values, n: int, words: int):
+    # big-endian words of one column, as a 'I' memoryview of n*words items
+    if np is not None and isinstance(values, np.ndarray):
+        raw = values.astype(">u8" if words == 2 else ">u4", copy=False).tobytes()
+    else:
+        a = array("Q" if words == 2 else "I", values)  # a copy: byteswap() works in place
+        if sys.byteorder == "little":
+            a.byteswap()
+        raw = a.tobytes()
+    if len(raw) != 4 * words * n:
+        raise ValueError(f"column has {len(raw) // (4 * words)} values, expected {n}")
+    return memoryview(raw).cast("I")
+
+
+def encode_segments(columns: dict, flags: int, layout: str = LAYOUT_PARSE) -> bytes:
+    """Segment table from per-field columns (sequences, array('I'/'Q') or
+    NumPy arrays, all of the same length). Missing optional columns are
+    zero."""
+    n = len(columns["tfdt"])
+    stride = record_words(flags, layout)
+    out = bytearray(4 * stride * n)
+    if not n:
+        return bytes(out)
+    words = memoryview(out).cast("I")
+    pos = 0
+    for name, w in seg_fields(flags):
+        values = columns.get(name)
+        if values is not None:
+            col = _column(values, n, w)
+            for k in range(w):
+                words[pos + k::stride] = col[k::w]
+        pos += w
+    return bytes(out)
+
+
+def flags_for(columns: dict) -> int:
+    """Smallest rep_flags able to hold `columns`."""
+    def wide(name):
+        values = columns.get(name)
+        return values is not None and len(values) and max(values) > U32_MAX
+
+    flags = (REP_TFDT_64 if wide("tfdt") else 0) | (REP_SEQ_64 if wide("seq") else 0)
+    if columns.get("offset") is not None:
+        flags |= REP_OFFSET | (REP_OFFSET_64 if wide("offset") else 0)
+    if columns.get("frag_tfdt") is not None:
+        flags |= REP_FRAG_TFDT | (REP_FRAG_TFDT_64 if wide("frag_tfdt") else 0)
+    if columns.get("split_first") is not None or columns.get("split_last") is not None:
+        flags |= REP_SPLIT
+    return flags
+
+
+# ---------------------------------------------------------------------------
+# Index model
+
+class GhiRep:
+    """One representation: descriptor fields, PID properties and the
+    segment columns (tfdt, seq, duration and optionally offset, frag_tfdt,
+    split_first, split_last)."""
+
+    def __init__(self, rep_id: str, res_url: str = "", track_id: int = 1, first_frag_start_offset: int = 0,
+                 pid_timescale: int = 1000, mpd_timescale: int = 1000, bitrate: int = 0, delay: int = 0,
+                 sample_duration: int = 0, first_cts_offset: int = 0, starts_with_sap: int = 1, props=(),
+                 flags: int = None, layout: str = LAYOUT_PARSE, **columns):
+        self.rep_id = rep_id
+        self.res_url = res_url
+        self.track_id = track_id
+        self.first_frag_start_offset = first_frag_start_offset
+        self.pid_timescale = pid_timescale
+        self.mpd_timescale = mpd_timescale
+        self.bitrate = bitrate
+        self.delay = delay
+        self.sample_duration = sample_duration
+        self.first_cts_offset = first_cts_offset
+        self.starts_with_sap = starts_with_sap
+        self.props = list(props)
+        self.columns = {k: v for k, v in columns.items() if v is not None}
+        self.flags = flags_for(self.columns) if flags is None else flags
+        self.layout = layout
+
+    @property
+    def nb_segs(self) -> int:
+        return len(self.columns.get("tfdt", ()))
+
+    def header(self) -> bytes:
+        return (utf8z(self.rep_id) + utf8z(self.res_url) +
+                struct.pack(">IIIIIIIIIBBH", self.track_id, self.first_frag_start_offset, self.pid_timescale,
+                            self.mpd_timescale, self.bitrate, self.delay, self.sample_duration,
+                            self.first_cts_offset & U32_MAX, self.nb_segs, self.starts_with_sap, self.flags, 0))
+
+    def chunks(self):
+        """rep_size followed by the rep block, as a few large chunks."""
+        head = self.header()
+        props = encode_props(self.props)
+        segs = encode_segments(self.columns, self.flags, self.layout)
+        size = 4 + len(head) + len(props) + len(segs)
+        if size > U32_MAX:
+            raise ValueError(f"representation {self.rep_id!r} is {size} bytes, rep_size is 32-bit")
+        return [be32(size), head, props, segs]
+
+
+class GhiIndex:
+    def __init__(self, reps=(), segment_duration: int = 1, max_segment_duration: int = 1,
+                 media_presentation_duration: int = 0, period_duration: int = 0, segment_template: str = "",
+                 version: int = VERSION):
+        self.reps = list(reps)
+        self.segment_duration = segment_duration
+        self.max_segment_duration = max_segment_duration
+        self.media_presentation_duration = media_presentation_duration
+        self.period_duration = period_duration
+        self.segment_template = segment_template
+        self.version = version
+
+    def header(self) -> bytes:
+        return (MAGIC + be32(self.version) + be32(self.segment_duration) + be32(self.max_segment_duration) +
+                be64(self.media_presentation_duration) + be64(self.period_duration) +
+                utf8z(self.segment_template) + be32(len(self.reps)))
+
+    def chunks(self):
+        """Binary GHID file; each rep is encoded only when reached, so peak
+        memory is one representation."""
+        yield self.header()
+        for rep in self.reps:
+            yield from rep.chunks()
+
+    def to_bytes(self) -> bytes:
+        return b"".join(self.chunks())
+
+    def write(self, out) -> int:
+        """Write to a path or binary file object; returns bytes written."""
+        if not hasattr(out, "write"):
+            with open(out, "wb") as f:
+                return self.write(f)
+        total = 0
+        for chunk in self.chunks():
+            out.write(chunk)
+            total += len(chunk)
+        return total
@@ -0,0 +1,446 @@
+# GIF building blocks and a streaming multi-frame writer.
+#
+# Frames are emitted as pre-encoded byte strings: the invariant parts (image
+# data, colour tables, GCE) are encoded once and only the fields that vary
+# (position, which tables are attached) are packed per frame. lzw_encode()
+# produces real image data for frames of any size.
+#
+# index_gif() walks an existing file's blocks over a memoryview; mutants are
+# lists of segments (views of the original plus the few rebuilt blocks) for
+# poclib.segments.write_segments, so image data is never copied or re-encoded.
+import csv
+import os
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from .segments import segments_len, write_segments
+
+TRAILER = b"\x3b"
+
+# LZW min code size 2, one 2-byte sub-block (clear, 1, eoi), terminator:
+# a 1x1 image of colour index 1; equal to lzw_encode(b"\x01", 2)
+MINIMAL_IMAGE_DATA = b"\x02\x02\x4c\x01\x00"
+
+BW_COLORMAP = b"\x00\x00\x00\xff\xff\xff"
+
+EXTENSION = 0x21
+IMAGE = 0x2C
+
+EXT_PLAIN_TEXT = 0x01
+EXT_GCE = 0xF9
+EXT_COMMENT = 0xFE
+EXT_APPLICATION = 0xFF
+
+LZW_MAX_CODE = 4095     # giflib's LZ_MAX_CODE: a clear is sent once the table holds this many codes
+
+_LSD = struct.Struct("<HHBBB")
+_IMAGE_DESC = struct.Struct("<BHHHHB")
+
+
+def _table_size_code(colormap: bytes) -> int:
+    n = len(colormap) // 3
+    if n < 2 or n > 256 or n & (n - 1) or len(colormap) % 3:
+        raise ValueError("colour table must hold 2, 4, ..., 256 RGB triplets")
+    return n.bit_length() - 2
+
+
+def _index_bytes(indices) -> bytes:
+    # bytes-like objects as is; NumPy (or anything with astype/tobytes) is
+    # narrowed to uint8 without importing numpy here
+    if hasattr(indices, "astype"):
+        return indices.astype("uint8", copy=False).tobytes()
+    return bytes(indices)
+
+
+def sub_blocks(data: bytes) -> bytes:
+    """Split data into <=255-byte sub-blocks followed by a block terminator."""
+    out = bytearray()
+    for i in range(0, len(data), 255):
+        part = data[i:i + 255]
+        out.append(len(part))
+        out += part
+    out.append(0)
+    return bytes(out)
+
+
+def lzw_encode(indices, min_code_size: int = None) -> bytes:
+    """GIF image data (LZW minimum code size byte, sub-blocks, terminator)
+    for a buffer of colour indices in raster order.
+
+    The string table is a trie stored as a flat array: the child of code c
+    for pixel p lives at c << 8 | p, so a lookup is one index operation and
+    a table reset only clears the slots that were filled. Code widths grow
+    and clear codes are sent at the same points as giflib's encoder.
+    """
+    data = _index_bytes(indices)
+    top = max(data) if data else 0
+    if min_code_size is None:
+        min_code_size = max(2, top.bit_length())
+    if not 2 <= min_code_size <= 8:
+        raise ValueError("LZW minimum code size must be 2..8")
+    if top >> min_code_size:
+        raise ValueError(f"colour index {top} does not fit in {min_code_size} bits")
+
+    clear = 1 << min_code_size
+    eoi = clear + 1
+    trie = array("h", [-1]) * ((LZW_MAX_CODE + 1) << 8)
+    filled = []
+
+    out = bytearray()
+    acc = clear
+    nbits = size = min_code_size + 1
+    next_code = eoi + 1
+    limit = 1 << size
+
+    it = iter(data)
+    prefix = next(it, None)
+    if prefix is not None:
+        for p in it:
+            key = prefix << 8 | p
+            child = trie[key]
+            if child >= 0:
+                prefix = child
+                continue
+            acc |= prefix << nbits
+            nbits += size
+            if next_code >= limit and size < 12:
+                size += 1
+                limit <<= 1
+            if next_code >= LZW_MAX_CODE:
+                acc |= clear << nbits
+                nbits += size
+                for k in filled:
+                    trie[k] = -1
+                filled.clear()
+                next_code = eoi + 1
+                size = min_code_size + 1
+                limit = 1 << size
+            else:
+                trie[key] = next_code
+                filled.append(key)
+                next_code += 1
+            if nbits >= 4096:
+                n = nbits >> 3
+                out += (acc & ((1 << (n << 3)) - 1)).to_bytes(n, "little")
+                acc >>= n << 3
+                nbits -= n << 3
+            prefix = p
+        acc |= prefix << nbits
+        nbits += size
+        if next_code >= limit and size < 12:
+            size += 1
+    acc |= eoi << nbits
+    nbits += size
+    out += acc.to_bytes((nbits + 7) >> 3, "little")
+    return bytes([min_code_size]) + sub_blocks(out)
+
+
+def header(width: int, height: int, gct: bytes = None, *, bg: int = 0, aspect: int = 0,
+           color_res: int = 0, version: bytes = b"GIF89a") -> bytes:
+    """Signature, Logical Screen Descriptor and optional Global Color Table."""
+    packed = (color_res & 7) << 4
+    if gct is not None:
+        packed |= 0x80 | _table_size_code(gct)
+    return version + _LSD.pack(width, height, packed, bg, aspect) + (gct or b"")
+
+
+def image_descriptor(left: int = 0, top: int = 0, width: int = 1, height: int = 1,
+                     lct: bytes = None, interlace: bool = False) -> bytes:
+    packed = 0x40 if interlace else 0
+    if lct is not None:
+        packed |= 0x80 | _table_size_code(lct)
+    return _IMAGE_DESC.pack(0x2C, left, top, width, height, packed) + (lct or b"")
+
+
+def gce(delay: int = 0, disposal: int = 0, transparent: int = None, user_input: bool = False,
+        block_size: int = 4) -> bytes:
+    """Graphics Control Extension; block_size other than 4 yields a
+    malformed block (data truncated or zero-padded to that length)."""
+    packed = ((disposal & 7) << 2) | (0x02 if user_input else 0) | (0x01 if transparent is not None else 0)
+    data = struct.pack("<BHB", packed, delay, transparent or 0)
+    data = data[:block_size].ljust(block_size, b"\x00")
+    return b"\x21\xf9" + bytes([block_size]) + data + b"\x00"
+
+
+def frame(image_data: bytes = MINIMAL_IMAGE_DATA, left: int = 0, top: int = 0, width: int = 1, height: int = 1,
+          lct: bytes = None, gce_block: bytes = b"", interlace: bool = False) -> bytes:
+    return gce_block + image_descriptor(left, top, width, height, lct, interlace) + image_data
+
+
+class GifStreamWriter:
+    """Write a GIF frame by frame straight to a file.
+
+    write_repeated() emits the same pre-encoded frame N times through
+    writelines() over a batch of copies, so Python work per frame is
+    amortised away; write_frames() takes an iterable of per-frame
+    variations and only packs the image descriptor for each.
+    """
+
+    BATCH_BYTES = 1 << 20
+
+    def __init__(self, out, head: bytes):
+        if isinstance(out, (str, Path)):
+            self._fp = open(out, "wb")
+            self._owned = True
+        else:
+            self._fp = out
+            self._owned = False
+        self._fp.write(head)
+        self.frames = 0
+
+    def write_repeated(self, frame_bytes: bytes, count: int) -> None:
+        per_batch = max(1, self.BATCH_BYTES // max(1, len(frame_bytes)))
+        if count >= per_batch:
+            batch = frame_bytes * per_batch
+            full, rest = divmod(count, per_batch)
+            self._fp.writelines([batch] * full)
+        else:
+            rest = count
+        self._fp.write(frame_bytes * rest)
+        self.frames += count
+
+    def write_frames(self, variations, image_data: bytes = MINIMAL_IMAGE_DATA, width: int = 1, height: int = 1) -> None:
+        """variations: iterable of (left, top, lct, gce_block) tuples; lct and
+        gce_block are reused bytes objects (None/b"" when absent)."""
+        pack = _IMAGE_DESC.pack
+        n = 0
+
+        def gen():
+            nonlocal n
+            for left, top, lct, gce_block in variations:
+                if gce_block:
+                    yield gce_block
+                if lct is None:
+                    yield pack(0x2C, left, top, width, height, 0)
+                else:
+                    yield pack(0x2C, left, top, width, height, 0x80 | _table_size_code(lct))
+                    yield lct
+                yield image_data
+                n += 1
+
+        self._fp.writelines(gen())
+        self.frames += n
+
+    def close(self) -> None:
+        self._fp.write(TRAILER)
+        if self._owned:
+            self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class GifBlock(NamedTuple):
+    kind: int    # EXTENSION or IMAGE (the introducer byte)
+    offset: int  # of the introducer
+    end: int     # past the block terminator
+    label: int   # extension label, or the image descriptor's packed field
+    data: int    # EXTENSION: first sub-block; IMAGE: LZW min code size (after any LCT)
+
+    @property
+    def table_offset(self) -> int:
+        """IMAGE: start of the local colour table (== data when absent)."""
+        return self.offset + _IMAGE_DESC.size
+
+
+def _skip_sub_blocks(data, pos: int, size: int) -> int:
+    # returns the offset past the terminator, or -1 if truncated
+    while pos < size:
+        n = data[pos]
+        pos += n + 1
+        if not n:
+            return pos
+    return -1
+
+
+class GifIndex:
+    """Header fields and top-level blocks of a GIF, in file order.
+
+    Parsing stops at the trailer or at the first malformed/truncated block;
+    `end` is where it stopped and everything from there on is carried over
+    verbatim by splice().
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.view = memoryview(data)
+        if len(data) < 13 or data[:3] != b"GIF":
+            raise ValueError("not a GIF")
+        self.version = bytes(data[:6])
+        self.width, self.height, self.packed, self.bg, self.aspect = _LSD.unpack_from(data, 6)
+        self.gct_end = 13 + (3 << ((self.packed & 7) + 1) if self.packed & 0x80 else 0)
+        self.blocks = []
+        self.trailer = None
+        self.end = self._walk(min(self.gct_end, len(data)))
+
+    def _walk(self, pos: int) -> int:
+        data, size, blocks = self.data, len(self.data), self.blocks
+        while pos < size:
+            kind = data[pos]
+            if kind == EXTENSION:
+                if pos + 2 > size:
+                    break
+                end = _skip_sub_blocks(data, pos + 2, size)
+                if end < 0:
+                    break
+                blocks.append(GifBlock(EXTENSION, pos, end, data[pos + 1], pos + 2))
+            elif kind == IMAGE:
+                if pos + _IMAGE_DESC.size + 1 > size:
+                    break
+                packed = data[pos + 9]
+                lzw = pos + _IMAGE_DESC.size + (3 << ((packed & 7) + 1) if packed & 0x80 else 0)
+                end = _skip_sub_blocks(data, lzw + 1, size)
+                if end < 0:
+                    break
+                blocks.append(GifBlock(IMAGE, pos, end, packed, lzw))
+            else:
+                if kind == TRAILER[0]:
+                    self.trailer = pos
+                break
+            pos = end
+        return pos
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def gct(self) -> memoryview:
+        """Zero-copy view of the global colour table (empty if none)."""
+        return self.view[13:self.gct_end]
+
+    def images(self):
+        return [b for b in self.blocks if b.kind == IMAGE]
+
+    def extensions(self, label: int = None):
+        return [b for b in self.blocks if b.kind == EXTENSION and (label is None or b.label == label)]
+
+    def block(self, b: GifBlock) -> memoryview:
+        return self.view[b.offset:b.end]
+
+    def lct(self, b: GifBlock) -> memoryview:
+        return self.view[b.table_offset:b.data]
+
+    def sub_blocks(self, b: GifBlock):
+        """Zero-copy views of an extension's or image's data sub-blocks."""
+        data, pos = self.data, b.data + (b.kind == IMAGE)
+        out = []
+        while data[pos]:
+            out.append(self.view[pos + 1:pos + 1 + data[pos]])
+            pos += data[pos] + 1
+        return out
+
+    def splice(self, edits):
+        """Segments for a mutant: edits are (start, end, replacement) ranges
+        of the original, non-overlapping; everything else is a view."""
+        segments = []
+        pos = 0
+        for start, end, new in sorted(edits, key=lambda e: (e[0], e[1])):
+            if start < pos:
+                raise ValueError(f"overlapping edit at {start}")
+            if start > pos:
+                segments.append(self.view[pos:start])
+            if len(new):
+                segments.append(new)
+            pos = end
+        segments.append(self.view[pos:])
+        return segments
+
+    def patch(self, buf, edits) -> None:
+        """Apply same-length edits in place to buf (a writable copy of the
+        file: bytearray, mmap, ...)."""
+        for start, end, new in edits:
+            if len(new) != end - start:
+                raise ValueError("in-place edits must keep the block length")
+            buf[start:end] = new
+
+
+def screen_edit(index: GifIndex, gct: bytes = None):
+    """Edit replacing the Logical Screen Descriptor and global colour table;
+    gct=None removes the table (the colour resolution bits are kept)."""
+    packed = index.packed & 0x70
+    if gct is not None:
+        packed |= 0x80 | _table_size_code(gct)
+    lsd = _LSD.pack(index.width, index.height, packed, index.bg, index.aspect)
+    return 6, index.gct_end, lsd + (gct or b"")
+
+
+def gce_size_edits(index: GifIndex, block_size: int, insert: bool = True):
+    """Rewrite every Graphics Control Extension with a block_size byte of
+    block_size, its data truncated or zero-padded to match (see gce()). With
+    insert=True, a GIF without any GCE gets one before its first image."""
+    edits = []
+    for b in index.extensions(EXT_GCE):
+        sub = index.sub_blocks(b)
+        body = bytes(sub[0]) if sub else b""
+        body = body[:block_size].ljust(block_size, b"\x00")
+        edits.append((b.offset, b.end, b"\x21\xf9" + bytes([block_size]) + body + b"\x00"))
+    if not edits and insert:
+        images = index.images()
+        if images:
+            edits.append((images[0].offset, images[0].offset, gce(block_size=block_size)))
+    return edits
+
+
+def local_only_edits(index: GifIndex, fallback: bytes = BW_COLORMAP):
+    """Drop the global colour table and give every image without a local
+    table a copy of it (or `fallback` when the file had none)."""
+    table = bytes(index.gct) or fallback
+    code = _table_size_code(table)
+    edits = [screen_edit(index, None)]
+    for b in index.images():
+        if not b.label & 0x80:
+            desc = bytearray(index.view[b.offset:b.table_offset])
+            desc[9] = (b.label & 0x78) | 0x80 | code
+            edits.append((b.offset, b.data, bytes(desc) + table))
+    return edits
+
+
+def mutate_file(src, dst, mutate) -> dict:
+    """Index src, write mutate(index)'s edits spliced over it to dst."""
+    index = GifIndex(Path(src).read_bytes())
+    edits = mutate(index)
+    segments = index.splice(edits)
+    write_segments(dst, segments)
+    return {
+        "file": os.path.basename(dst),
+        "source": str(src),
+        "size": segments_len(segments),
+        "images": len(index.images()),
+        "extensions": len(index.extensions()),
+        "edits": len(edits),
+        "complete": int(index.trailer is not None),
+    }
+
+
+def _mutate_one(job):
+    src, dst, mutate = job
+    try:
+        return mutate_file(src, dst, mutate)
+    except (ValueError, IndexError, OSError) as e:
+        return {"file": "", "source": str(src), "size": 0, "images": 0, "extensions": 0, "edits": 0,
+                "complete": 0, "error": f"{type(e).__name__}: {e}"}
+
+
+def mutate_corpus(inputs, out_dir, mutate, suffix: str = "", workers: int = None, manifest: str = "manifest.csv"):
+    """Mutate every GIF in `inputs` (files or directories, searched for
+    *.gif) into out_dir from a process pool, with a CSV manifest. `mutate`
+    must be picklable: a module-level function or functools.partial."""
+    paths = []
+    for p in map(Path, inputs):
+        paths.extend(sorted(p.rglob("*.gif")) if p.is_dir() else [p])
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(p, os.path.join(out_dir, f"{i:06d}_{p.stem}{suffix}.gif"), mutate) for i, p in enumerate(paths)]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        rows = list(ex.map(_mutate_one, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+    fields = ["file", "source", "size", "images", "extensions", "edits", "complete", "error"]
+    with open(os.path.join(out_dir, manifest), "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=fields, restval="")
+        w.writeheader()
+        w.writerows(rows)
+    return rows
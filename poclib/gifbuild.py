@@ -0,0 +1,254 @@
+# gifbuild(1) text scripts.
+#
+# Scripts are produced as an iterable of str chunks so they can be streamed
+# to a file, a pipe or straight into gifbuild's stdin (run_gifbuild()) with
+# no intermediate copy. Invariant parts (256-entry colour maps, raster text,
+# extension blocks) are rendered once and the same string is yielded for
+# every image that uses them.
+import os
+import subprocess
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+from .gif import TRAILER, frame, header, lzw_encode
+
+# gifbuild.c KeyLetters: pixel keys of non-hex rasters. Only the 64 keys
+# before '#' are usable: gifbuild strips a lone '#' and the rest of the
+# line as a comment, so `rgb ... is #` loses its key and every later key
+# sits behind a NUL in KeyTable.
+KEY_LETTERS = ("0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNO"
+               "PQRSTUVWXYZ!\"")
+
+# include %63s
+MAX_INCLUDE_NAME = 63
+# extension lines become one sub-block each
+MAX_EXT_LINE = 255
+
+WRITE_BATCH = 1 << 20
+
+
+def screen(width: int, height: int, colors: int, background: int = 0, aspect: int = 0) -> str:
+    return (f"screen width {width}\n"
+            f"screen height {height}\n"
+            f"screen colors {colors}\n"
+            f"screen background {background}\n"
+            f"pixel aspect byte {aspect}\n")
+
+
+@lru_cache(maxsize=64)
+def color_map(colormap: bytes, target: str = "screen", sort: bool = False, keyed: bool = False) -> str:
+    """`screen map` / `image map` block for an RGB triplet table; keyed=True
+    adds `is <key>` so the map can be used by non-hex rasters."""
+    n = len(colormap) // 3
+    if not 0 < n <= 256 or len(colormap) % 3:
+        raise ValueError("colour map must hold 1..256 RGB triplets")
+    if keyed and n > len(KEY_LETTERS):
+        raise ValueError(f"keyed colour maps hold at most {len(KEY_LETTERS)} entries")
+    lines = [f"{target} map\n", f"\tsort flag {'on' if sort else 'off'}\n"]
+    for i in range(n):
+        r, g, b = colormap[3 * i:3 * i + 3]
+        lines.append(f"\trgb {r:03d} {g:03d} {b:03d} is {KEY_LETTERS[i]}\n" if keyed else
+                     f"\trgb {r:03d} {g:03d} {b:03d}\n")
+    lines.append("end\n")
+    return "".join(lines)
+
+
+def _text_block(opener: str, lines) -> str:
+    out = [opener]
+    for line in lines:
+        if len(line) > MAX_EXT_LINE or "\n" in line or "\\" in line:
+            raise ValueError("extension lines are single lines of <= 255 bytes without backslashes")
+        out.append(line + "\n")
+    out.append("end\n")
+    return "".join(out)
+
+
+def comment(lines) -> str:
+    return _text_block("comment\n", lines)
+
+
+def plaintext(lines) -> str:
+    return _text_block("plaintext\n", lines)
+
+
+def extension(code: int, lines) -> str:
+    return _text_block(f"extension {code:02x}\n", lines)
+
+
+def graphics_control(delay: int = 0, disposal: int = 0, transparent: int = None, user_input: bool = False) -> str:
+    out = ["graphics control\n", f"\tdisposal mode {disposal}\n",
+           f"\tuser input flag {'on' if user_input else 'off'}\n", f"\tdelay {delay}\n"]
+    if transparent is not None:
+        out.append(f"\ttransparent index {transparent}\n")
+    out.append("end\n")
+    return "".join(out)
+
+
+def netscape_loop(count: int = 0) -> str:
+    return f"netscape loop {count}\n"
+
+
+def include(name) -> str:
+    name = str(name)
+    if len(name) > MAX_INCLUDE_NAME or any(c.isspace() for c in name):
+        raise ValueError(f"include names are read with %63s: {name!r}")
+    return f"include {name}\n"
+
+
+def raster(indices: bytes, width: int, height: int, keyed: bool = False) -> str:
+    """`image bits W by H` plus one text row per image row: two hex digits
+    per pixel, or one KEY_LETTERS key per pixel with keyed=True."""
+    if len(indices) != width * height:
+        raise ValueError("raster size does not match width x height")
+    if keyed:
+        if max(indices, default=0) >= len(KEY_LETTERS):
+            raise ValueError("colour index has no pixel key")
+        text = indices.translate(KEY_LETTERS.encode().ljust(256, b"?")).decode()
+        step = width
+        head = f"image bits {width} by {height}\n"
+    else:
+        text = indices.hex()
+        step = 2 * width
+        head = f"image bits {width} by {height} hex\n"
+    return head + "".join(text[i:i + step] + "\n" for i in range(0, len(text), step))
+
+
+def image(bits: str, left: int = 0, top: int = 0, interlaced: bool = False, local_map: str = None) -> str:
+    """`image` declaration; bits is a raster() block, local_map a
+    color_map(..., "image") block."""
+    out = ["image\n"]
+    if left:
+        out.append(f"image left {left}\n")
+    if top:
+        out.append(f"image top {top}\n")
+    if interlaced:
+        out.append("image interlaced\n")
+    if local_map:
+        out.append(local_map)
+    out.append(bits)
+    return "".join(out)
+
+
+def include_poc(colormap: bytes, include_name: str, width: int = 1, height: int = 1) -> str:
+    """Screen declaration, global map and a single include: the shape of
+    both gifbuild include PoCs."""
+    n = len(colormap) // 3
+    return screen(width, height, n) + "\n" + color_map(colormap) + "\n" + include(include_name)
+
+
+def grey_ramp(colors: int = 256) -> bytes:
+    # distinct entries, last one non-zero: GifUnionColorMap keeps them all
+    return b"".join(bytes([i * 255 // max(1, colors - 1)] * 3) for i in range(colors))
+
+
+def write_include_gifs(directory, count: int, colormap: bytes, width: int = 16, height: int = 16,
+                       prefix: str = "inc") -> list:
+    """count single-image GIFs whose global tables are permutations of
+    colormap (rotated by i entries), so every include unions back to the
+    same set of colours through a non-identity translation table. Tables
+    are padded to the next GIF table size (2, 4, ..., 256) by repeating
+    the rotated map."""
+    os.makedirs(directory, exist_ok=True)
+    n = len(colormap) // 3
+    if not 0 < n <= 256 or len(colormap) % 3:
+        raise ValueError("colour map must hold 1..256 RGB triplets")
+    size = 1 << max(1, (n - 1).bit_length())
+    data = lzw_encode(bytes(i % n for i in range(width * height)), max(2, (n - 1).bit_length()))
+    names = []
+    for i in range(count):
+        k = 3 * (i % n)
+        gct = ((colormap[k:] + colormap[:k]) * (size // n + 1))[:3 * size]
+        name = os.path.join(directory, f"{prefix}{i}.gif")
+        Path(name).write_bytes(header(width, height, gct) + frame(data, 0, 0, width, height) + TRAILER)
+        names.append(name)
+    return names
+
+
+def stress_script(images: int, width: int = 16, height: int = 16, colormap: bytes = None, local_maps: bool = False,
+                  gce_every: int = 1, comment_lines: int = 0, loop: bool = True, includes=(), include_every: int = 1,
+                  rasters: int = 4, keyed: bool = False):
+    """Chunks of a gifbuild script with `images` images of width x height.
+
+    After every `include_every`-th image comes one include of the next name
+    in `includes` (cycled), so GifUnionColorMap runs once per include
+    against a full global map. Image parts are yielded separately so the
+    shared raster and map strings are never copied per image.
+    """
+    colormap = colormap or grey_ramp()
+    n = len(colormap) // 3
+    yield screen(width, height, 1 << max(1, (n - 1).bit_length()))
+    yield color_map(colormap, "screen", keyed=keyed)
+    if loop:
+        yield netscape_loop(0)
+    local = color_map(colormap, "image", keyed=keyed) if local_maps else None
+    bits = [raster(bytes((x + y + r) % n for y in range(height) for x in range(width)), width, height, keyed)
+            for r in range(max(1, rasters))]
+    gcb = graphics_control(delay=1, transparent=0)
+    text = comment([("gifbuild stress " * 16)[:MAX_EXT_LINE]] * comment_lines) if comment_lines else None
+    inc = [include(name) for name in includes]
+    for i in range(images):
+        if gce_every and i % gce_every == 0:
+            yield gcb
+        if text:
+            yield text
+        yield "image\n"
+        if local:
+            yield local
+        yield bits[i % len(bits)]
+        if inc and (i + 1) % include_every == 0:
+            yield inc[(i // include_every) % len(inc)]
+
+
+def write_script(out, chunks) -> int:
+    """Write str chunks to a path, "-" (stdout) or a binary file object,
+    encoded in ~1 MiB batches. Returns the number of bytes written."""
+    if isinstance(out, (str, Path)) and str(out) != "-":
+        with open(out, "wb") as f:
+            return write_script(f, chunks)
+    fp = sys.stdout.buffer if out == "-" else out
+    total = 0
+    batch, size = [], 0
+    for c in chunks:
+        batch.append(c)
+        size += len(c)
+        if size >= WRITE_BATCH:
+            data = "".join(batch).encode()
+            fp.write(data)
+            total += len(data)
+            batch, size = [], 0
+    data = "".join(batch).encode()
+    fp.write(data)
+    fp.flush()
+    return total + len(data)
+
+
+def run_gifbuild(gifbuild, chunks, gif_out=None, cwd=None, args=()):
+    """Stream a script into `gifbuild [args]` over a pipe. The GIF goes to
+    gif_out (path; default /dev/null), stderr is inherited. Returns
+    (exit status, script bytes generated); a gifbuild that exits early
+    (parse error, crash) ends the write instead of raising BrokenPipeError."""
+    sent = 0
+
+    def counted():
+        nonlocal sent
+        for c in chunks:
+            sent += len(c)
+            yield c
+
+    out = open(gif_out, "wb") if gif_out else subprocess.DEVNULL
+    try:
+        proc = subprocess.Popen([str(gifbuild), *args], stdin=subprocess.PIPE, stdout=out, cwd=cwd)
+        try:
+            write_script(proc.stdin, counted())
+        except BrokenPipeError:
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        return proc.wait(), sent
+    finally:
+        if gif_out:
+            out.close()
@@ -0,0 +1,77 @@
+# GPAC filter property type codes and a few PID property 4CCs.
+#
+# Values follow enum GF_PropType and the GF_PROP_PID_* definitions in
+# gpac/filters.h; only what the generators in this repo need is listed.
+
+
+def fourcc(code) -> int:
+    if isinstance(code, int):
+        return code
+    if isinstance(code, str):
+        code = code.encode("ascii")
+    if len(code) != 4:
+        raise ValueError(f"not a 4CC: {code!r}")
+    return int.from_bytes(code, "big")
+
+
+# enum GF_PropType
+PROP_FORBIDDEN = 0
+PROP_SINT = 1
+PROP_UINT = 2
+PROP_LSINT = 3
+PROP_LUINT = 4
+PROP_BOOL = 5
+PROP_FRACTION = 6
+PROP_FRACTION64 = 7
+PROP_FLOAT = 8
+PROP_DOUBLE = 9
+PROP_VEC2I = 10
+PROP_VEC2 = 11
+PROP_VEC3I = 12
+PROP_VEC4I = 13
+PROP_STRING = 14
+PROP_STRING_NO_COPY = 15
+PROP_DATA = 16
+PROP_NAME = 17
+PROP_DATA_NO_COPY = 18
+PROP_CONST_DATA = 19
+PROP_POINTER = 20
+PROP_STRING_LIST = 21
+PROP_UINT_LIST = 22
+PROP_SINT_LIST = 23
+PROP_VEC2I_LIST = 24
+PROP_4CC = 25
+PROP_4CC_LIST = 26
+PROP_FIRST_ENUM = 40
+
+# GF_PROP_PID_* 4CC -> property type
+PID_ID = fourcc("PIDI")
+PID_ESID = fourcc("ESID")
+PID_STREAM_TYPE = fourcc("PMST")
+PID_CODECID = fourcc("POTI")
+PID_TIMESCALE = fourcc("TIMS")
+PID_DECODER_CONFIG = fourcc("DCFG")
+PID_SAMPLE_RATE = fourcc("AUSR")
+PID_NUM_CHANNELS = fourcc("CHNB")
+PID_WIDTH = fourcc("WIDT")
+PID_HEIGHT = fourcc("HEIG")
+PID_URL = fourcc("FURL")
+
+PID_PROP_TYPES = {
+    PID_ID: PROP_UINT,
+    PID_ESID: PROP_UINT,
+    PID_STREAM_TYPE: PROP_UINT,
+    PID_CODECID: PROP_UINT,
+    PID_TIMESCALE: PROP_UINT,
+    PID_DECODER_CONFIG: PROP_DATA,
+    PID_SAMPLE_RATE: PROP_UINT,
+    PID_NUM_CHANNELS: PROP_UINT,
+    PID_WIDTH: PROP_UINT,
+    PID_HEIGHT: PROP_UINT,
+    PID_URL: PROP_STRING,
+}
+
+# GF_STREAM_* (MPEG-4 Systems stream types)
+STREAM_VISUAL = 0x04
+STREAM_AUDIO = 0x05
+STREAM_TEXT = 0x0D
@@ -0,0 +1,427 @@
+# GPAC Serialized Format (GSF) helpers.
+#
+# Variable-length integers as read by gsfdmx_read_vlen() in
+# gpac_gsf/dmx_gsf.c: a unary length prefix followed by the value, MSB first.
+#
+#   0xxxxxxx                     7 bits
+#   10xxxxxx x8                 14 bits
+#   110xxxxx x16                21 bits
+#   1110xxxx x24                28 bits
+#   1111xxxx x32                36 bits, truncated to u32 by the reader
+#
+# GSFMuxer writes complete streams (tune-in, PID config/info, data packets,
+# EOS/remove) with optional fragmentation, per-stream sequence numbers and
+# AES-128-CBC transport encryption, in the layout gsfdmx_demux() parses.
+import struct
+from array import array
+from pathlib import Path
+
+from .aes import CbcEncryptor
+from .gpac_props import (PID_PROP_TYPES, PROP_4CC, PROP_4CC_LIST, PROP_BOOL, PROP_CONST_DATA, PROP_DATA,
+                         PROP_DATA_NO_COPY, PROP_DOUBLE, PROP_FIRST_ENUM, PROP_FLOAT, PROP_FRACTION,
+                         PROP_FRACTION64, PROP_LSINT, PROP_LUINT, PROP_NAME, PROP_SINT, PROP_SINT_LIST,
+                         PROP_STRING, PROP_STRING_LIST, PROP_STRING_NO_COPY, PROP_UINT, PROP_UINT_LIST,
+                         PROP_VEC2, PROP_VEC2I, PROP_VEC2I_LIST, PROP_VEC3I, PROP_VEC4I, fourcc)
+
+VLEN_BITS = (7, 14, 21, 28, 36)
+VLEN_MAX = 1 << 36  # exclusive
+
+# encoded length in bytes, indexed by the first byte
+_VLEN_SIZE = bytes([1] * 128 + [2] * 64 + [3] * 32 + [4] * 16 + [5] * 16)
+# value mask per encoded length; the 5-byte form is (u32) cast in C
+_VLEN_MASK = (0, 0x7F, 0x3FFF, 0x1FFFFF, 0x0FFFFFFF, 0xFFFFFFFF)
+_VLEN_PREFIX = (0, 0x00, 0x8000, 0xC00000, 0xE0000000, 0xF000000000)
+
+
+def vlen_size(val: int) -> int:
+    if val < (1 << 7):
+        return 1
+    if val < (1 << 14):
+        return 2
+    if val < (1 << 21):
+        return 3
+    if val < (1 << 28):
+        return 4
+    return 5
+
+
+def encode_vlen(val: int) -> bytes:
+    if not 0 <= val < VLEN_MAX:
+        raise ValueError(f"vlen value {val} outside 0..2**36-1")
+    n = vlen_size(val)
+    return (_VLEN_PREFIX[n] | (val & ((1 << VLEN_BITS[n - 1]) - 1))).to_bytes(n, "big")
+
+
+# every value below 2**14 pre-encoded: covers the 1- and 2-byte forms
+_SMALL = [encode_vlen(v) for v in range(1 << 14)]
+
+
+def encode_vlen_many(values) -> bytes:
+    """Concatenated encodings of all `values` (any iterable of ints);
+    ValueError for values outside 0..2**36-1, like encode_vlen()."""
+    small = _SMALL
+    return b"".join([small[v] if 0 <= v < 16384 else encode_vlen(v) for v in values])
+
+
+def decode_vlen(buf, pos: int = 0):
+    """Decode one vlen at buf[pos]; returns (value, new_pos)."""
+    n = _VLEN_SIZE[buf[pos]]
+    if pos + n > len(buf):
+        raise ValueError("truncated vlen")
+    return int.from_bytes(buf[pos:pos + n], "big") & _VLEN_MASK[n], pos + n
+
+
+def decode_vlen_many(buf, count: int = None, pos: int = 0):
+    """Decode `count` consecutive vlens at buf[pos] (all remaining if None).
+
+    Returns (array('Q') of values, new_pos). A run made only of 1-byte
+    encodings is converted in a single array() call.
+    """
+    mv = memoryview(buf).cast("B")
+    limit = len(mv)
+    stop = limit if count is None else pos + count
+    if stop <= limit:
+        run = mv[pos:stop]
+        if run.tobytes().isascii():
+            return array("Q", run), stop  # memoryview: one element per byte
+
+    out = array("Q")
+    append = out.append
+    size = _VLEN_SIZE
+    mask = _VLEN_MASK
+    from_bytes = int.from_bytes
+    want = -1 if count is None else count
+    while len(out) != want and pos < limit:
+        n = size[mv[pos]]
+        if n == 1:
+            append(mv[pos])
+        else:
+            if pos + n > limit:
+                raise ValueError("truncated vlen")
+            append(from_bytes(mv[pos:pos + n], "big") & mask[n])
+        pos += n
+    if count is not None and len(out) != count:
+        raise ValueError("truncated vlen stream")
+    return out, pos
+
+
+SIGNATURE = b"GS5F"
+VERSION = 2
+
+# GFS_PCKTYPE_*
+PCK_HDR = 0
+PCK_PID_CONFIG = 1
+PCK_PID_INFO_UPDATE = 2
+PCK_PID_REMOVE = 3
+PCK_PID_EOS = 4
+PCK_DATA = 5
+
+# frag_flags of the outer packet header
+FRAG_NONE = 0   # full packet
+FRAG_FIRST = 1  # first fragment, carries block_size
+FRAG_NEXT = 2   # later fragment, carries block_size and block_offset
+
+# SAP types that carry a roll distance (GF_FILTER_SAP_4, GF_FILTER_SAP_4_PROL)
+_SAP_ROLL = (4, 5)
+
+
+def _vlen(v: int) -> bytes:
+    return _SMALL[v] if 0 <= v < 16384 else encode_vlen(v)
+
+
+def encode_prop(ptype: int, value) -> bytes:
+    """Serialize a property value the way gsfdmx_read_prop() reads it."""
+    if ptype in (PROP_UINT, PROP_SINT) or ptype >= PROP_FIRST_ENUM:
+        return _vlen(value & 0xFFFFFFFF)
+    if ptype in (PROP_LUINT, PROP_LSINT):
+        return struct.pack(">Q", value & 0xFFFFFFFFFFFFFFFF)
+    if ptype == PROP_4CC:
+        return struct.pack(">I", fourcc(value))
+    if ptype == PROP_BOOL:
+        return b"\x01" if value else b"\x00"
+    if ptype == PROP_FRACTION:
+        return _vlen(value[0] & 0xFFFFFFFF) + _vlen(value[1] & 0xFFFFFFFF)
+    if ptype == PROP_FRACTION64:
+        return struct.pack(">QQ", value[0] & 0xFFFFFFFFFFFFFFFF, value[1] & 0xFFFFFFFFFFFFFFFF)
+    if ptype == PROP_FLOAT:
+        return struct.pack(">f", value)
+    if ptype == PROP_DOUBLE:
+        return struct.pack(">d", value)
+    if ptype == PROP_VEC2:
+        return struct.pack(">dd", *value)
+    if ptype in (PROP_VEC2I, PROP_VEC3I, PROP_VEC4I):
+        return encode_vlen_many(v & 0xFFFFFFFF for v in value)
+    if ptype in (PROP_STRING, PROP_STRING_NO_COPY, PROP_NAME):
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        return _vlen(len(value)) + value
+    if ptype in (PROP_DATA, PROP_DATA_NO_COPY, PROP_CONST_DATA):
+        if not value:
+            raise ValueError("empty data property is rejected by the demuxer")
+        return _vlen(len(value)) + bytes(value)
+    if ptype == PROP_STRING_LIST:
+        items = [v.encode("utf-8") if isinstance(v, str) else v for v in value]
+        return _vlen(len(items)) + b"".join(_vlen(len(v)) + v for v in items)
+    if ptype in (PROP_UINT_LIST, PROP_SINT_LIST):
+        return _vlen(len(value)) + encode_vlen_many(v & 0xFFFFFFFF for v in value)
+    if ptype == PROP_4CC_LIST:
+        return _vlen(len(value)) + b"".join(struct.pack(">I", fourcc(v)) for v in value)
+    if ptype == PROP_VEC2I_LIST:
+        return _vlen(len(value)) + encode_vlen_many(c & 0xFFFFFFFF for xy in value for c in xy)
+    raise ValueError(f"property type {ptype} cannot be serialized in GSF")
+
+
+def pid_config_payload(props=(), str_props=(), version: int = 0) -> bytes:
+    """PID config / info update block.
+
+    props: {4cc: value} for the 4CCs listed in gpac_props.PID_PROP_TYPES, or
+    {4cc: (type, value)} for any other; the demuxer derives the type from
+    the 4CC itself, so it must match GPAC's table.
+    str_props: {name: (type, value)}.
+    """
+    props = dict(props)
+    str_props = dict(str_props)
+    out = [bytes([version & 0xFF]), _vlen(len(props)), _vlen(len(str_props))]
+    for code, value in props.items():
+        code = fourcc(code)
+        if isinstance(value, tuple) and len(value) == 2 and code not in PID_PROP_TYPES:
+            ptype, value = value
+        else:
+            ptype = PID_PROP_TYPES[code]
+        out.append(struct.pack(">I", code))
+        out.append(encode_prop(ptype, value))
+    for name, (ptype, value) in str_props.items():
+        name = name.encode("utf-8")
+        out.append(_vlen(len(name)) + name + bytes([ptype]))
+        out.append(encode_prop(ptype, value))
+    return b"".join(out)
+
+
+def tune_payload(magic: bytes = b"", use_seq_num: bool = False, iv: bytes = None,
+                 crypt_blocks: int = 0, skip_blocks: int = 0) -> bytes:
+    """Clear-text tune-in (HDR) payload; iv given means encrypted stream, in
+    which case everything after the first 25 bytes is to be encrypted."""
+    out = SIGNATURE + bytes([VERSION])
+    if iv is not None:
+        out += bytes(iv) + struct.pack(">HH", crypt_blocks, skip_blocks)
+    return out + bytes([0x80 if use_seq_num else 0x00]) + _vlen(len(magic)) + magic
+
+
+def packet_header(pck_type: int, st_idx: int, pck_len: int, *, frame_sn: int = None, frag: int = FRAG_NONE,
+                  block_size: int = 0, block_offset: int = 0, crypted: bool = False) -> bytes:
+    """Outer packet header; frame_sn is only written when not None."""
+    out = [bytes([(frag & 3) << 5 | (0x10 if crypted else 0) | (pck_type & 0xF)]), _vlen(st_idx)]
+    if frame_sn is not None:
+        out.append(struct.pack(">H", frame_sn))
+    if frag != FRAG_NONE:
+        out.append(_vlen(block_size))
+        if frag >= FRAG_NEXT:
+            out.append(_vlen(block_offset))
+    out.append(_vlen(pck_len))
+    return b"".join(out)
+
+
+def _bits_for(v: int, widths) -> int:
+    for mode, bits in enumerate(widths):
+        if v < (1 << bits):
+            return mode
+    raise ValueError(f"value {v} does not fit in {widths[-1]} bits")
+
+
+def data_header(dts: int = None, cts: int = None, dur: int = None, sap: int = 1, roll: int = 0,
+                dep_flags: int = None) -> bytes:
+    """Flags and timing fields that start a PCK payload (see
+    gsfdmx_read_data_pck()); field widths are picked from the values."""
+    has_dts, has_cts, has_dur = dts is not None, cts is not None, dur is not None
+    diff = 0
+    neg = False
+    if has_dts and has_cts:
+        diff = cts - dts
+        neg = diff < 0
+        diff = abs(diff)
+    ts = max(dts if has_dts else 0, cts if has_cts and not has_dts else 0)
+    tsmode = _bits_for(ts, (16, 24, 32, 64))
+    tsdiffmode = _bits_for(max(diff, dur or 0), (8, 16, 24, 32))
+    tsbytes = (2, 3, 4, 8)[tsmode]
+    diffbytes = tsdiffmode + 1
+
+    out = [bytes([has_dts << 7 | has_cts << 6 | has_dur << 5 | neg << 4 | tsmode << 2 | tsdiffmode,
+                  (sap & 7) << 5 | (dep_flags is not None) << 2])]
+    if has_dts:
+        out.append(dts.to_bytes(tsbytes, "big"))
+    if has_cts:
+        out.append(diff.to_bytes(diffbytes, "big") if has_dts else cts.to_bytes(tsbytes, "big"))
+    if has_dur:
+        out.append(dur.to_bytes(diffbytes, "big"))
+    if sap in _SAP_ROLL:
+        out.append(struct.pack(">h", roll))
+    if dep_flags is not None:
+        out.append(bytes([dep_flags & 0xFF]))
+    return b"".join(out)
+
+
+class RingWriter:
+    """Preallocated write buffer in front of a file: small packets are
+    copied into it and it is flushed in one large write when full; writes
+    larger than the buffer go straight through."""
+
+    def __init__(self, fp, size: int = 4 << 20):
+        self._fp = fp
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._pos = 0
+        self.flushes = 0
+        self.bytes_written = 0
+
+    def write(self, data) -> None:
+        n = len(data)
+        if self._pos + n > len(self._buf):
+            self.flush()
+            if n >= len(self._buf):
+                self._fp.write(data)
+                self.flushes += 1
+                self.bytes_written += n
+                return
+        self._view[self._pos:self._pos + n] = data
+        self._pos += n
+        self.bytes_written += n
+
+    def flush(self) -> None:
+        if self._pos:
+            self._fp.write(self._view[:self._pos])
+            self._pos = 0
+            self.flushes += 1
+
+
+class GSFMuxer:
+    """Write a GSF stream packet by packet.
+
+    max_frag: largest payload per outer packet; bigger PID configs and data
+    packets are split into FRAG_FIRST/FRAG_NEXT fragments.
+    key: 16-byte AES-128 key; enables transport encryption (iv defaults to
+    zeros, crypt_blocks/skip_blocks select pattern encryption).
+    """
+
+    def __init__(self, out, *, magic: bytes = b"", use_seq_num: bool = True, max_frag: int = None,
+                 key: bytes = None, iv: bytes = None, crypt_blocks: int = 0, skip_blocks: int = 0,
+                 buffer_size: int = 4 << 20):
+        if isinstance(out, (str, Path)):
+            self._fp = open(out, "wb")
+            self._owned = True
+        else:
+            self._fp = out
+            self._owned = False
+        self._out = RingWriter(self._fp, buffer_size)
+        self.use_seq_num = use_seq_num
+        self.max_frag = max_frag
+        self._key = key
+        self._iv = bytes(16) if iv is None else bytes(iv)
+        self._pattern = (16 * crypt_blocks, 16 * (crypt_blocks + skip_blocks)) if crypt_blocks and skip_blocks else None
+        self._sn = {}
+        self.packets = 0
+        self.fragments = 0
+
+        head = tune_payload(magic, use_seq_num, self._iv if key else None, crypt_blocks, skip_blocks)
+        if key:
+            head = head[:25] + self._encrypt(head[25:])
+        self._write(PCK_HDR, 0, head, None, crypted=bool(key))
+
+    @property
+    def bytes_written(self) -> int:
+        return self._out.bytes_written
+
+    def _encrypt(self, data) -> bytes:
+        # mirrors gsfdmx_decrypt(): IV reset per call, clear tail of size % 16
+        n = len(data) - len(data) % 16
+        if not n:
+            return bytes(data)
+        enc = CbcEncryptor(self._key, self._iv)
+        if self._pattern is None:
+            return enc.update(data[:n]) + bytes(data[n:])
+        crypt_len, period = self._pattern
+        out = bytearray(data)
+        for pos in range(0, n, period):
+            end = min(pos + crypt_len, n)
+            out[pos:end] = enc.update(data[pos:end])
+        return bytes(out)
+
+    def _next_sn(self, st_idx: int):
+        if not self.use_seq_num:
+            return None
+        sn = self._sn.get(st_idx, 0)
+        self._sn[st_idx] = (sn + 1) & 0xFFFF
+        return sn
+
+    def _write(self, pck_type, st_idx, payload, frame_sn, crypted=False, frag=FRAG_NONE, block_size=0, block_offset=0):
+        self._out.write(packet_header(pck_type, st_idx, len(payload), frame_sn=frame_sn, frag=frag,
+                                      block_size=block_size, block_offset=block_offset, crypted=crypted))
+        self._out.write(payload)
+        self.fragments += 1
+
+    def _check_idx(self, st_idx: int) -> None:
+        if st_idx <= 0:
+            raise ValueError("stream index 0 is reserved for the tune-in packet")
+
+    def config(self, st_idx: int, props=(), str_props=(), version: int = 0, info: bool = False) -> None:
+        """PID config (or info update when info=True); the whole block is
+        encrypted once and then fragmented."""
+        self._check_idx(st_idx)
+        block = pid_config_payload(props, str_props, version)
+        crypted = bool(self._key)
+        if crypted:
+            block = self._encrypt(block)
+        pck_type = PCK_PID_INFO_UPDATE if info else PCK_PID_CONFIG
+        sn = self._next_sn(st_idx)
+        step = self.max_frag
+        if not step or len(block) <= step:
+            self._write(pck_type, st_idx, block, sn, crypted)
+        else:
+            view = memoryview(block)
+            for off in range(0, len(block), step):
+                self._write(pck_type, st_idx, view[off:off + step], sn, crypted,
+                            FRAG_FIRST if not off else FRAG_NEXT, len(block), off)
+        self.packets += 1
+
+    def packet(self, st_idx: int, data, *, dts: int = None, cts: int = None, dur: int = None, sap: int = 1,
+               roll: int = 0, dep_flags: int = None) -> None:
+        """Data packet; every fragment is encrypted on its own, the first one
+        together with the packet header."""
+        self._check_idx(st_idx)
+        head = data_header(dts, cts, dur, sap, roll, dep_flags)
+        sn = self._next_sn(st_idx)
+        crypted = bool(self._key)
+        enc = self._encrypt if crypted else bytes
+        step = self.max_frag
+        size = len(data)
+        if not step or len(head) + size <= step:
+            self._write(PCK_DATA, st_idx, enc(head + bytes(data)), sn, crypted)
+        else:
+            if step <= len(head):
+                raise ValueError(f"max_frag {step} cannot hold the {len(head)}-byte packet header")
+            view = memoryview(data)
+            first = step - len(head)
+            self._write(PCK_DATA, st_idx, enc(head + bytes(view[:first])), sn, crypted, FRAG_FIRST, size)
+            for off in range(first, size, step):
+                self._write(PCK_DATA, st_idx, enc(view[off:off + step]), sn, crypted, FRAG_NEXT, size, off)
+        self.packets += 1
+
+    def eos(self, st_idx: int) -> None:
+        self._check_idx(st_idx)
+        self._write(PCK_PID_EOS, st_idx, b"", self._next_sn(st_idx))
+        self.packets += 1
+
+    def remove(self, st_idx: int) -> None:
+        self._check_idx(st_idx)
+        self._write(PCK_PID_REMOVE, st_idx, b"", self._next_sn(st_idx))
+        self.packets += 1
+
+    def close(self) -> None:
+        self._out.flush()
+        if self._owned:
+            self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,245 @@
+# Lazy ISO-BMFF box tree.
+#
+# Boxes know their size without being serialized, so a whole file can be laid
+# out (every box gets its absolute offset) and then written in one pass.
+# stco/co64 boxes reference the box holding the chunk data and resolve their
+# entries from the layout, which removes the "build, find b'stco', patch" and
+# "build moov twice to learn its length" steps. DeferredBox generalizes this
+# to any box whose payload is computed from the final layout.
+import struct
+from functools import lru_cache
+from pathlib import Path
+
+
+def u8(x):  return struct.pack(">B", x & 0xFF)
+def u16(x): return struct.pack(">H", x & 0xFFFF)
+def u32(x): return struct.pack(">I", x & 0xFFFFFFFF)
+def u64(x): return struct.pack(">Q", x & 0xFFFFFFFFFFFFFFFF)
+
+
+def box(typ: bytes, payload: bytes) -> bytes:
+    assert len(typ) == 4
+    return u32(8 + len(payload)) + typ + payload
+
+
+def fullbox(typ: bytes, version: int, flags24: int, payload: bytes) -> bytes:
+    return box(typ, u8(version) + struct.pack(">I", flags24 & 0xFFFFFF)[1:] + payload)
+
+
+class Box:
+    """Container whose parts are bytes-like objects (already serialized
+    children or raw payload) and/or other Box nodes."""
+
+    def __init__(self, typ: bytes, *parts, header: bytes = b""):
+        assert len(typ) == 4
+        self.typ = typ
+        self.header = header  # e.g. version/flags for a full box
+        self.parts = parts
+        self.offset = None
+        self._size = None
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            self._size = 8 + len(self.header) + sum(p.size if isinstance(p, Box) else len(p) for p in self.parts)
+        return self._size
+
+    @property
+    def data_offset(self) -> int:
+        """Absolute offset of the first byte after the box header."""
+        return self.offset + 8 + len(self.header)
+
+    def layout(self, offset: int) -> int:
+        self.offset = offset
+        pos = self.data_offset
+        for p in self.parts:
+            pos = p.layout(pos) if isinstance(p, Box) else pos + len(p)
+        return offset + self.size
+
+    def chunks(self):
+        yield u32(self.size) + self.typ + self.header
+        for p in self.parts:
+            if isinstance(p, Box):
+                yield from p.chunks()
+            else:
+                yield p
+
+
+class FullBox(Box):
+    def __init__(self, typ: bytes, version: int, flags24: int, *parts):
+        super().__init__(typ, *parts, header=u8(version) + struct.pack(">I", flags24 & 0xFFFFFF)[1:])
+
+
+class ChunkOffsetBox(Box):
+    """stco (or co64 with large=True) whose entries are
+    `target.data_offset + rel` for each rel in `rel_offsets`."""
+
+    def __init__(self, target: Box, rel_offsets=(0,), large: bool = False):
+        super().__init__(b"co64" if large else b"stco", header=b"\x00\x00\x00\x00")
+        self.target = target
+        self.rel_offsets = list(rel_offsets)
+        self.large = large
+        self._size = 16 + (8 if large else 4) * len(self.rel_offsets)
+
+    def chunks(self):
+        base = self.target.data_offset
+        if base is None:
+            raise RuntimeError("chunk offset target has not been laid out")
+        fmt = ">%d%s" % (len(self.rel_offsets), "Q" if self.large else "I")
+        yield u32(self.size) + self.typ + self.header + u32(len(self.rel_offsets))
+        yield struct.pack(fmt, *(base + r for r in self.rel_offsets))
+
+
+class DeferredBox(Box):
+    """Box whose payload depends on the layout (offsets or sizes of other
+    boxes). Its payload length is fixed up front; fill() is called at write
+    time, after layout(), and must return exactly payload_len bytes."""
+
+    def __init__(self, typ: bytes, payload_len: int, fill):
+        super().__init__(typ)
+        self.fill = fill
+        self._size = 8 + payload_len
+
+    def chunks(self):
+        data = self.fill()
+        if 8 + len(data) != self.size:
+            raise RuntimeError(f"{self.typ!r} payload is {len(data)} bytes, expected {self.size - 8}")
+        yield u32(self.size) + self.typ + data
+
+
+def layout(boxes, start: int = 0) -> int:
+    """Assign absolute offsets to every box; returns the end offset."""
+    pos = start
+    for b in boxes:
+        pos = b.layout(pos) if isinstance(b, Box) else pos + len(b)
+    return pos
+
+
+def iter_chunks(boxes):
+    for b in boxes:
+        if isinstance(b, Box):
+            yield from b.chunks()
+        else:
+            yield b
+
+
+def write_boxes(out, *boxes, start: int = 0) -> int:
+    """Lay out `boxes` and write them to a path, a file object or a
+    bytearray in a single pass. `start` is the file offset of the first box
+    (the current length for a bytearray). Returns the end offset."""
+    if isinstance(out, bytearray):
+        start = len(out)
+    total = layout(boxes, start)
+    if isinstance(out, (str, Path)):
+        with open(out, "wb") as f:
+            f.writelines(iter_chunks(boxes))
+    elif isinstance(out, bytearray):
+        for c in iter_chunks(boxes):
+            out += c
+    else:
+        out.writelines(iter_chunks(boxes))
+    return total
+
+
+def serialize(*boxes) -> bytes:
+    layout(boxes)
+    return b"".join(iter_chunks(boxes))
+
+
+# ---------------------------------------------------------------------------
+# Memoized constant boxes.
+#
+# Most of a mutant MP4 is boilerplate that only depends on a handful of
+# parameters. These builders return immutable bytes cached per argument
+# tuple (bounded LRU), and Box nodes hold references to them, so splicing
+# them into a new file costs no copy until the final writelines().
+
+CACHE_SIZE = 256
+
+_UNITY_MATRIX = struct.pack(">9I", 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+
+_cached = lru_cache(maxsize=CACHE_SIZE)
+
+
+@_cached
+def make_ftyp(major: bytes = b"isom", minor: int = 0, brands: tuple = (b"isom", b"mp42")) -> bytes:
+    return box(b"ftyp", major + u32(minor) + b"".join(brands))
+
+
+@_cached
+def make_mvhd(timescale: int = 1000, duration: int = 1000, next_track_id: int = 2, reserved_len: int = 8) -> bytes:
+    # reserved_len is the zero run after volume+reserved(16); the spec says 8,
+    # some of the PoCs in this repo were captured with a longer run
+    payload = (
+        u32(0) + u32(0) + u32(timescale) + u32(duration) +
+        u32(0x00010000) + u16(0x0100) + u16(0) + b"\x00" * reserved_len +
+        _UNITY_MATRIX + b"\x00" * 24 + u32(next_track_id)
+    )
+    return fullbox(b"mvhd", 0, 0, payload)
+
+
+@_cached
+def make_tkhd(track_id: int = 1, duration: int = 1000, width: int = 0, height: int = 0, flags: int = 0x000007) -> bytes:
+    payload = (
+        u32(0) + u32(0) + u32(track_id) + u32(0) + u32(duration) +
+        u32(0) + u32(0) +          # reserved
+        u16(0) + u16(0) +          # layer, alternate_group
+        u16(0) + u16(0) +          # volume, reserved
+        _UNITY_MATRIX + u32(width << 16) + u32(height << 16)
+    )
+    return fullbox(b"tkhd", 0, flags, payload)
+
+
+@_cached
+def make_mdhd(timescale: int = 1000, duration: int = 1000, language: int = 0x55c4) -> bytes:
+    return fullbox(b"mdhd", 0, 0, u32(0) + u32(0) + u32(timescale) + u32(duration) + u16(language) + u16(0))
+
+
+@_cached
+def make_hdlr(handler_type: bytes = b"vide", name: bytes = b"") -> bytes:
+    return fullbox(b"hdlr", 0, 0, u32(0) + handler_type + b"\x00" * 12 + name + b"\x00")
+
+
+@_cached
+def make_vmhd() -> bytes:
+    return fullbox(b"vmhd", 0, 0x000001, u16(0) * 4)
+
+
+@_cached
+def make_nmhd() -> bytes:
+    return fullbox(b"nmhd", 0, 0, b"")
+
+
+@_cached
+def make_dinf() -> bytes:
+    url = fullbox(b"url ", 0, 0x000001, b"")
+    return box(b"dinf", fullbox(b"dref", 0, 0, u32(1) + url))
+
+
+@_cached
+def make_stts(sample_count: int = 1, sample_delta: int = 1) -> bytes:
+    return fullbox(b"stts", 0, 0, u32(1) + u32(sample_count) + u32(sample_delta))
+
+
+@_cached
+def make_stsc(first_chunk: int = 1, samples_per_chunk: int = 1, sample_desc_index: int = 1) -> bytes:
+    return fullbox(b"stsc", 0, 0, u32(1) + u32(first_chunk) + u32(samples_per_chunk) + u32(sample_desc_index))
+
+
+@_cached
+def make_stsz(sample_size: int) -> bytes:
+    # no default size, one entry
+    return fullbox(b"stsz", 0, 0, u32(0) + u32(1) + u32(sample_size))
+
+
+_CACHED_BUILDERS = (make_ftyp, make_mvhd, make_tkhd, make_mdhd, make_hdlr, make_vmhd,
+                    make_nmhd, make_dinf, make_stts, make_stsc, make_stsz)
+
+
+def cache_info() -> dict:
+    return {f.__name__: f.cache_info() for f in _CACHED_BUILDERS}
+
+
+def cache_clear() -> None:
+    for f in _CACHED_BUILDERS:
+        f.cache_clear()
@@ -0,0 +1,396 @@
+# JPEG 2000 codestream helpers.
+#
+# index_codestream() walks the main header once and records every marker
+# segment (offset of the marker code, Lxxx); load_codestream() caches that
+# per input file. Patched codestreams are then assembled as a list of
+# memoryview segments over the original bytes plus the few rebuilt ones,
+# and written with poclib.segments.write_segments() (os.writev where
+# available).
+import os
+import struct
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+from .segments import segments_len, write_segments  # noqa: F401  (re-exported; moved from here)
+
+SOC = 0xFF4F
+SIZ = 0xFF51
+COD = 0xFF52
+COC = 0xFF53
+TLM = 0xFF55
+PLM = 0xFF57
+PLT = 0xFF58
+QCD = 0xFF5C
+QCC = 0xFF5D
+RGN = 0xFF5E
+POC = 0xFF5F
+PPM = 0xFF60
+PPT = 0xFF61
+CRG = 0xFF63
+COM = 0xFF64
+SOT = 0xFF90
+SOP = 0xFF91
+EPH = 0xFF92
+SOD = 0xFF93
+EOC = 0xFFD9
+
+# markers without a segment length
+DELIMITERS = frozenset((SOC, SOD, EOC, EPH))
+
+
+class Marker(NamedTuple):
+    code: int
+    offset: int  # of the 0xFFxx marker code
+    length: int  # Lxxx: segment length after the marker code, 0 for delimiters
+
+    @property
+    def data_offset(self) -> int:
+        return self.offset + 2
+
+    @property
+    def end(self) -> int:
+        return self.offset + 2 + self.length
+
+
+class CodestreamIndex:
+    """Main-header markers of a codestream, in file order."""
+
+    def __init__(self, data, markers, main_header_len: int):
+        self.data = data
+        self.view = memoryview(data)
+        self.markers = markers
+        self.main_header_len = main_header_len
+        self._by_code = {}
+        for m in markers:
+            self._by_code.setdefault(m.code, []).append(m)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def find(self, code: int):
+        """All markers with `code` (empty list if none)."""
+        return self._by_code.get(code, [])
+
+    def first(self, code: int):
+        found = self._by_code.get(code)
+        return found[0] if found else None
+
+    def segment(self, marker: Marker) -> memoryview:
+        """Zero-copy view of the marker segment data (after the marker code)."""
+        return self.view[marker.data_offset:marker.end]
+
+
+def index_codestream(data) -> CodestreamIndex:
+    if data[:2] != b"\xff\x4f":
+        raise ValueError("codestream does not start with SOC")
+    markers = [Marker(SOC, 0, 0)]
+    pos = 2
+    size = len(data)
+    while pos + 2 <= size:
+        code = (data[pos] << 8) | data[pos + 1]
+        if code == SOT:
+            return CodestreamIndex(data, markers, pos)
+        # Delimiting markers without segment body. Not expected here before
+        # SOT, but keep the parser from looping forever.
+        if code in DELIMITERS:
+            markers.append(Marker(code, pos, 0))
+            pos += 2
+            continue
+        if pos + 4 > size:
+            raise ValueError("truncated marker segment while scanning main header")
+        seglen = (data[pos + 2] << 8) | data[pos + 3]
+        markers.append(Marker(code, pos, seglen))
+        pos += 2 + seglen
+    return CodestreamIndex(data, markers, size)
+
+
+@lru_cache(maxsize=32)
+def _load(path: str, mtime_ns: int, size: int) -> CodestreamIndex:
+    return index_codestream(Path(path).read_bytes())
+
+
+def load_codestream(path) -> CodestreamIndex:
+    """Read and index a .j2k once; later calls for the same unchanged file
+    return the cached index."""
+    path = os.path.realpath(path)
+    st = os.stat(path)
+    return _load(path, st.st_mtime_ns, st.st_size)
+
+
+# ---------------------------------------------------------------------------
+# Full codestream scan: SIZ/COD fields, tile-parts and packet locations.
+
+class Siz(NamedTuple):
+    rsiz: int
+    xsiz: int
+    ysiz: int
+    xosiz: int
+    yosiz: int
+    xtsiz: int
+    ytsiz: int
+    xtosiz: int
+    ytosiz: int
+    csiz: int
+
+    @property
+    def tiles_x(self) -> int:
+        return -(-(self.xsiz - self.xtosiz) // self.xtsiz)
+
+    @property
+    def tiles_y(self) -> int:
+        return -(-(self.ysiz - self.ytosiz) // self.ytsiz)
+
+    @property
+    def num_tiles(self) -> int:
+        return self.tiles_x * self.tiles_y
+
+
+def parse_siz(segment) -> Siz:
+    """SIZ fields from the segment data (starting at Lsiz)."""
+    return Siz(*struct.unpack_from(">HIIIIIIIIH", segment, 2))
+
+
+def parse_cod(segment):
+    """(Scod, progression order, layers, decomposition levels) from the COD
+    segment data (starting at Lcod)."""
+    scod, prog, layers, _mct, decomp = struct.unpack_from(">BBHBB", segment, 2)
+    return scod, prog, layers, decomp
+
+
+class TilePart(NamedTuple):
+    tile: int
+    part: int
+    offset: int       # of the SOT marker code
+    length: int       # Psot, resolved when 0 (last tile-part up to EOC)
+    header_len: int   # SOT up to and including SOD
+    markers: list     # Marker entries of the tile-part header, SOT first
+
+    @property
+    def data_offset(self) -> int:
+        return self.offset + self.header_len
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.length
+
+
+def _header_markers(data, pos: int, limit: int):
+    # markers from pos up to and including SOD; returns (markers, end)
+    markers = []
+    while pos + 2 <= limit:
+        code = (data[pos] << 8) | data[pos + 1]
+        if code == SOD:
+            markers.append(Marker(SOD, pos, 0))
+            return markers, pos + 2
+        if pos + 4 > limit:
+            break
+        seglen = (data[pos + 2] << 8) | data[pos + 3]
+        markers.append(Marker(code, pos, seglen))
+        pos += 2 + seglen
+    raise ValueError(f"tile-part header at {markers[0].offset if markers else pos} has no SOD")
+
+
+def iter_tile_parts(index: CodestreamIndex):
+    """Walk the tile-parts after the main header by their Psot lengths; only
+    the tile-part headers are touched, never the packet data."""
+    data = index.data
+    size = len(data)
+    eoc = size - 2 if data[size - 2:size] == b"\xff\xd9" else size
+    pos = index.main_header_len
+    while pos + 12 <= eoc:
+        if (data[pos] << 8) | data[pos + 1] != SOT:
+            raise ValueError(f"expected SOT at {pos}")
+        _lsot, isot, psot, tpsot, _tnsot = struct.unpack_from(">HHIBB", data, pos + 2)
+        length = psot or (eoc - pos)
+        markers, hdr_end = _header_markers(data, pos, pos + length)
+        yield TilePart(isot, tpsot, pos, length, hdr_end - pos, markers)
+        pos += length
+
+
+def _plt_lengths(index: CodestreamIndex, tp: TilePart):
+    # Iplt: packet lengths, 7 bits per byte, MSB set on all but the last byte
+    out = []
+    view = index.view
+    for m in tp.markers:
+        if m.code != PLT:
+            continue
+        v = 0
+        for b in view[m.data_offset + 3:m.end]:
+            v = (v << 7) | (b & 0x7F)
+            if not b & 0x80:
+                out.append(v)
+                v = 0
+    return out
+
+
+def packet_ranges(index: CodestreamIndex, tp: TilePart):
+    """[(offset, length), ...] of the packets of a tile-part, from its PLT
+    markers, else from SOP markers in the data, else the whole tile-part
+    body as a single range."""
+    lengths = _plt_lengths(index, tp)
+    if lengths:
+        out = []
+        pos = tp.data_offset
+        for n in lengths:
+            out.append((pos, n))
+            pos += n
+        return out
+    data = index.data
+    starts = []
+    pos = data.find(b"\xff\x91\x00\x04", tp.data_offset, tp.end)
+    while pos >= 0:
+        starts.append(pos)
+        pos = data.find(b"\xff\x91\x00\x04", pos + 6, tp.end)
+    if starts:
+        starts.append(tp.end)
+        return [(a, b - a) for a, b in zip(starts, starts[1:])]
+    return [(tp.data_offset, tp.end - tp.data_offset)]
+
+
+# progression orders (COD SGcod byte)
+LRCP, RLCP, RPCL, PCRL, CPRL = range(5)
+
+
+def packet_components(prog: int, layers: int, resolutions: int, comps: int):
+    """Component of each packet of a tile in progression order, assuming one
+    precinct per resolution level (default precincts)."""
+    if prog == LRCP:
+        return [c for _l in range(layers) for _r in range(resolutions) for c in range(comps)]
+    if prog == RLCP:
+        return [c for _r in range(resolutions) for _l in range(layers) for c in range(comps)]
+    if prog == RPCL:
+        return [c for _r in range(resolutions) for c in range(comps) for _l in range(layers)]
+    if prog == PCRL:
+        return [c for c in range(comps) for _r in range(resolutions) for _l in range(layers)]
+    return [c for c in range(comps) for _r in range(resolutions) for _l in range(layers)]
+
+
+def open_codestream(path):
+    """Index a codestream of any size through a read-only mmap; the caller
+    keeps the returned index (and so the mapping) alive while using it."""
+    import mmap
+
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return index_codestream(mm)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic codestreams: SOC/SIZ/COD/QCD and tile-parts of empty packets
+# (a single zero header byte each), one packet per layer, resolution and
+# component as with default precincts.
+# Nothing depends on the image content, so one tile-part body is built per
+# tile-part index and reused for every tile; only SOT changes.
+
+MAX_TILES = 65535  # Isot is 16 bits
+
+
+def segment(code: int, payload: bytes) -> bytes:
+    if len(payload) + 2 > 0xFFFF:
+        raise ValueError(f"marker {code:#06x} segment too long ({len(payload)} bytes)")
+    return struct.pack(">HH", code, len(payload) + 2) + payload
+
+
+def siz_segment(width: int, height: int, tile_w: int, tile_h: int, comps: int = 1, precision: int = 8,
+                signed: bool = False) -> bytes:
+    if not 1 <= comps <= 16384:
+        raise ValueError("Csiz must be 1..16384")
+    if not 1 <= precision <= 38:
+        raise ValueError("precision must be 1..38 bits")
+    ssiz = (precision - 1) | (0x80 if signed else 0)
+    return segment(SIZ, struct.pack(">HIIIIIIIIH", 0, width, height, 0, 0, tile_w, tile_h, 0, 0, comps) +
+                   bytes((ssiz, 1, 1)) * comps)
+
+
+def cod_segment(prog: int = LRCP, layers: int = 1, decomp: int = 5, mct: int = 0, sop: bool = False) -> bytes:
+    # 64x64 code-blocks, no code-block style flags, reversible 5/3
+    return segment(COD, struct.pack(">BBHBBBBBB", 0x02 if sop else 0, prog, layers, mct, decomp, 4, 4, 0, 1))
+
+
+def qcd_segment(precision: int = 8, decomp: int = 5) -> bytes:
+    # no quantization, 2 guard bits; exponent = precision + subband gain
+    exps = [precision] + [precision + g for _ in range(decomp) for g in (1, 1, 2)]
+    return segment(QCD, bytes([2 << 5]) + bytes((e & 0x1F) << 3 for e in exps))
+
+
+def plt_segments(lengths) -> bytes:
+    """PLT marker segments listing `lengths`, split to fit Lplt."""
+    out = []
+    iplt = bytearray()
+    for n in lengths:
+        enc = [n & 0x7F]
+        n >>= 7
+        while n:
+            enc.append(0x80 | (n & 0x7F))
+            n >>= 7
+        if len(iplt) + len(enc) > 0xFFFF - 3:
+            out.append(segment(PLT, bytes([len(out) & 0xFF]) + iplt))
+            iplt = bytearray()
+        iplt += bytes(reversed(enc))
+    if iplt:
+        out.append(segment(PLT, bytes([len(out) & 0xFF]) + iplt))
+    return b"".join(out)
+
+
+def default_decomp(tile_w: int, tile_h: int) -> int:
+    """Largest decomposition count (up to the usual 5) the tile size allows."""
+    return max(0, min(5, min(tile_w, tile_h).bit_length() - 1))
+
+
+def iter_synth(width: int, height: int, tile_w: int = None, tile_h: int = None, comps: int = 1,
+               precision: int = 8, layers: int = 1, decomp: int = None, prog: int = LRCP, tile_parts: int = 1,
+               sop: bool = False, plt: bool = False, eoc: bool = True):
+    """Chunks of a synthetic codestream, main header first, then the
+    tile-parts tile by tile; each tile's packets are split over
+    `tile_parts` tile-parts."""
+    tile_w = tile_w or width
+    tile_h = tile_h or height
+    if decomp is None:
+        decomp = default_decomp(tile_w, tile_h)
+    tiles = -(-width // tile_w) * -(-height // tile_h)
+    if tiles > MAX_TILES:
+        raise ValueError(f"{tiles} tiles, at most {MAX_TILES} fit in Isot")
+    if not 1 <= tile_parts <= 255:
+        raise ValueError("tile_parts must be 1..255")
+
+    yield (b"\xff\x4f" + siz_segment(width, height, tile_w, tile_h, comps, precision) +
+           cod_segment(prog, layers, decomp, 1 if comps >= 3 else 0, sop) + qcd_segment(precision, decomp))
+
+    npackets = layers * (decomp + 1) * comps
+    parts = []  # (header markers after SOT, body) per tile-part index
+    start = 0
+    for i in range(tile_parts):
+        end = start + npackets // tile_parts + (1 if i < npackets % tile_parts else 0)
+        if sop:
+            packets = [struct.pack(">HHH", SOP, 4, k & 0xFFFF) + b"\x00" for k in range(start, end)]
+        else:
+            packets = [b"\x00"] * (end - start)
+        extra = plt_segments(len(p) for p in packets) if plt else b""
+        parts.append((extra + b"\xff\x93", b"".join(packets)))
+        start = end
+
+    for t in range(tiles):
+        for i, (hdr, body) in enumerate(parts):
+            yield struct.pack(">HHHIBB", SOT, 10, t, 12 + len(hdr) + len(body), i, tile_parts)
+            yield hdr
+            yield body
+    if eoc:
+        yield b"\xff\xd9"
+
+
+def synth_codestream(**params) -> bytes:
+    return b"".join(iter_synth(**params))
+
+
+def write_synth(out, **params) -> int:
+    """Stream a synthetic codestream (see iter_synth) to a path or a binary
+    file object; returns its length."""
+    if isinstance(out, (str, Path)):
+        with open(out, "wb") as f:
+            return write_synth(f, **params)
+    total = 0
+    for chunk in iter_synth(**params):
+        out.write(chunk)
+        total += len(chunk)
+    return total
@@ -0,0 +1,123 @@
+# JPIP index (ISO/IEC 15444-9 Annex I) for a JPEG 2000 codestream.
+#
+# JpipIndex scans the codestream once (main header, tile-part headers,
+# packet locations; see poclib.j2k) and returns the top-level boxes of a
+# JP2-like file as read by openjpip's index_manager.c:
+#
+#   jP signature, iptr, fidx(prxy), cidx(cptr, manf, mhix, tpix, thix, ppix), jp2c
+#
+# Every box size is known from its contents, and the boxes that point at
+# other boxes (iptr, prxy, cptr) are DeferredBox nodes, so one layout()
+# pass settles all cross-references before anything is written.
+import struct
+import sys
+from array import array
+
+from .isobmff import Box, DeferredBox, u16, u32, u64, write_boxes
+from .j2k import COD, DELIMITERS, SIZ, iter_tile_parts, packet_components, packet_ranges, parse_cod, parse_siz
+
+SIG_BOX = u32(12) + b"jP  " + b"\r\n\x87\n"
+
+_MARKER_ENTRY = struct.Struct(">HHQH")  # code, NumRemainings, offset, length
+
+
+def _be_array(typecode: str, values) -> bytes:
+    a = array(typecode, values)
+    if sys.byteorder == "little":
+        a.byteswap()
+    return a.tobytes()
+
+
+def faix(rows, nmax: int = None) -> Box:
+    """faix box: one row of (offset, length) pairs per tile (or precinct
+    row), zero-padded to NMAX entries. Version 1 (64-bit fields) is used
+    only when some value does not fit in 32 bits."""
+    rows = [list(r) for r in rows]
+    if nmax is None:
+        nmax = max((len(r) for r in rows), default=0)
+    flat = []
+    for r in rows:
+        for off, length in r:
+            flat += (off, length)
+        flat.extend((0, 0) * (nmax - len(r)))
+    large = max(flat, default=0) > 0xFFFFFFFF or nmax > 0xFFFFFFFF or len(rows) > 0xFFFFFFFF
+    pack = u64 if large else u32
+    return Box(b"faix", bytes([1 if large else 0]) + pack(nmax) + pack(len(rows)),
+               _be_array("Q" if large else "I", flat))
+
+
+def mhix(tlen: int, markers) -> Box:
+    """Header index: TLEN then one entry per marker segment (delimiters
+    skipped), each pointing at the segment's Lxxx field with length Lxxx,
+    the convention index_manager.c checks in set_SIZmkrdata()."""
+    markers = [m for m in markers if m.code not in DELIMITERS]
+    remaining = {}
+    for m in markers:
+        remaining[m.code] = remaining.get(m.code, 0) + 1
+    entries = []
+    for m in markers:
+        remaining[m.code] -= 1
+        entries.append(_MARKER_ENTRY.pack(m.code, remaining[m.code], m.data_offset, m.length))
+    return Box(b"mhix", u64(tlen), *entries)
+
+
+def manf(boxes) -> Box:
+    """Manifest listing the headers (size + type) of `boxes`."""
+    return Box(b"manf", *[u32(b.size) + b.typ for b in boxes])
+
+
+class JpipIndex:
+    """Scan result and index boxes for one codestream."""
+
+    def __init__(self, index, tpix: bool = True, thix: bool = True, ppix: bool = True):
+        self.index = index
+        self.siz = parse_siz(index.segment(index.first(SIZ)))
+        scod, prog, layers, decomp = parse_cod(index.segment(index.first(COD)))
+        tiles = self.siz.num_tiles
+
+        by_tile = [[] for _ in range(tiles)]
+        self.tile_parts = 0
+        for tp in iter_tile_parts(index):
+            if tp.tile >= tiles:
+                raise ValueError(f"tile-part for tile {tp.tile} but SIZ defines {tiles} tiles")
+            by_tile[tp.tile].append(tp)
+            self.tile_parts += 1
+
+        self.main_mhix = mhix(index.main_header_len, index.markers)
+        children = [self.main_mhix]
+        if tpix:
+            children.append(Box(b"tpix", faix([(tp.offset, tp.length) for tp in parts] for parts in by_tile)))
+        if thix:
+            heads = [mhix(parts[0].header_len, parts[0].markers) if parts else mhix(0, ()) for parts in by_tile]
+            children.append(Box(b"thix", manf(heads), *heads))
+        self.packets = 0
+        if ppix:
+            comps = self.siz.csiz
+            order = packet_components(prog, layers, decomp + 1, comps)
+            rows = [[[] for _ in range(tiles)] for _ in range(comps)]
+            for t, parts in enumerate(by_tile):
+                k = 0
+                for tp in parts:
+                    for pkt in packet_ranges(index, tp):
+                        rows[order[k % len(order)]][t].append(pkt)
+                        k += 1
+                self.packets += k
+            faixes = [faix(r) for r in rows]
+            children.append(Box(b"ppix", manf(faixes), *faixes))
+
+        cs_len = len(index)
+        if cs_len + 8 > 0xFFFFFFFF:
+            raise ValueError("codestream too large for a 32-bit jp2c box")
+        self.jp2c = Box(b"jp2c", index.view)
+        cptr = DeferredBox(b"cptr", 20, lambda: u16(0) + u16(0) + u64(self.jp2c.data_offset) + u64(cs_len))
+        self.cidx = Box(b"cidx", cptr, manf(children), *children)
+        prxy = DeferredBox(b"prxy", 8 + 8 + 1 + 8 + 8, lambda: (
+            u64(self.jp2c.offset) + u32(self.jp2c.size) + b"jp2c" + b"\x01" +
+            u64(self.cidx.offset) + u32(self.cidx.size) + b"cidx"))
+        self.fidx = Box(b"fidx", prxy)
+        iptr = DeferredBox(b"iptr", 16, lambda: u64(self.fidx.offset) + u64(self.fidx.size))
+        self.boxes = [SIG_BOX, iptr, self.fidx, self.cidx, self.jp2c]
+
+    def write(self, out) -> int:
+        """Lay out and write the file; returns its size."""
+        return write_boxes(out, *self.boxes)
@@ -0,0 +1,308 @@
+# Streaming Ogg page writer.
+#
+# Packets of any size go in, finished pages come out one at a time. A packet
+# may be a bytes-like object or an iterable of chunks, so huge packets
+# (e.g. OpusTags with millions of comments) never need to exist in memory:
+# the only buffer is the page currently being filled (<= 255*255 bytes).
+#
+# OggMuxer interleaves any number of logical streams by page time (granule
+# / rate), pulling each stream's packets lazily with one page of lookahead,
+# so hours of multiplexed media are written in memory bounded by the
+# number of streams.
+import heapq
+import struct
+from array import array
+from pathlib import Path
+
+from .oggcrc import ogg_crc
+
+FLAG_CONT = 0x01
+FLAG_BOS = 0x02
+FLAG_EOS = 0x04
+
+MAX_SEGMENTS = 255
+NO_GRANULE = 0xFFFFFFFFFFFFFFFF  # page on which no packet finishes
+
+_PAGE_HDR = struct.Struct("<4sBBQIIIB")
+
+
+def lacing_values(size: int) -> bytes:
+    """Lacing values for a single packet of `size` bytes."""
+    return b"\xff" * (size // 255) + bytes([size % 255])
+
+
+def build_page(*, header_type: int, granule: int, serial: int, seq: int, lacing: bytes, payload: bytes) -> bytes:
+    page = bytearray(_PAGE_HDR.pack(b"OggS", 0, header_type, granule & NO_GRANULE, serial, seq, 0, len(lacing)))
+    page += lacing
+    page += payload
+    struct.pack_into("<I", page, 22, ogg_crc(page))
+    return bytes(page)
+
+
+class OggPaginator:
+    """Split one logical stream's packets into Ogg pages.
+
+    packet() and flush() are generators yielding finished pages; nothing is
+    written until they are iterated.
+    """
+
+    def __init__(self, serial: int, seq: int = 0, max_segments: int = MAX_SEGMENTS):
+        if not (1 <= max_segments <= MAX_SEGMENTS):
+            raise ValueError("max_segments must be 1..255")
+        self.serial = serial & 0xFFFFFFFF
+        self.seq = seq
+        self.max_segments = max_segments
+        self.pages = 0
+        self._segs = bytearray()
+        self._body = bytearray()
+        self._partial = 0        # bytes of the open packet not yet laced
+        self._granule = NO_GRANULE
+        self._cont = False       # current page starts mid-packet
+        self._in_packet = False
+
+    def _emit(self, eos: bool = False) -> bytes:
+        flags = (FLAG_CONT if self._cont else 0) | (FLAG_BOS if self.pages == 0 else 0) | (FLAG_EOS if eos else 0)
+        page = build_page(header_type=flags, granule=self._granule, serial=self.serial,
+                          seq=self.seq, lacing=self._segs, payload=self._body)
+        self.seq += 1
+        self.pages += 1
+        self._segs.clear()
+        self._body.clear()
+        self._granule = NO_GRANULE
+        self._cont = self._in_packet
+        return page
+
+    def _feed(self, data):
+        mv = memoryview(data).cast("B")
+        while len(mv):
+            room = (self.max_segments - len(self._segs)) * 255 - self._partial
+            take = mv[:room]
+            self._body += take
+            full, self._partial = divmod(self._partial + len(take), 255)
+            self._segs += b"\xff" * full
+            mv = mv[len(take):]
+            if len(self._segs) == self.max_segments:
+                yield self._emit()
+
+    def packet(self, data, granule: int = 0, *, eos: bool = False, flush: bool = False):
+        """Append one packet; `data` is bytes-like or an iterable of chunks."""
+        self._in_packet = True
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            yield from self._feed(data)
+        else:
+            for chunk in data:
+                yield from self._feed(chunk)
+        self._in_packet = False
+        self._segs.append(self._partial)
+        self._partial = 0
+        self._granule = granule
+        if eos or flush or len(self._segs) == self.max_segments:
+            yield self._emit(eos)
+
+    def flush(self, eos: bool = False):
+        """Close the current page, if any data is pending."""
+        if self._segs or eos:
+            yield self._emit(eos)
+
+
+def paginate(packets, serial: int, seq: int = 0, max_segments: int = MAX_SEGMENTS):
+    """Yield pages for an iterable of (data, granule[, flush]) tuples.
+
+    The last packet gets the EOS flag.
+    """
+    pager = OggPaginator(serial, seq, max_segments)
+    it = iter(packets)
+    nxt = next(it, None)
+    while nxt is not None:
+        cur, nxt = nxt, next(it, None)
+        data, granule, *rest = cur
+        yield from pager.packet(data, granule, eos=nxt is None, flush=bool(rest and rest[0]))
+
+
+class OggWriter:
+    """OggPaginator bound to an output file; pages are written as they fill."""
+
+    def __init__(self, out, serial: int, seq: int = 0, max_segments: int = MAX_SEGMENTS):
+        if isinstance(out, (str, Path)):
+            self._fp = open(out, "wb")
+            self._owned = True
+        else:
+            self._fp = out
+            self._owned = False
+        self.pager = OggPaginator(serial, seq, max_segments)
+        self.bytes_written = 0
+
+    def _write(self, pages) -> None:
+        for page in pages:
+            self._fp.write(page)
+            self.bytes_written += len(page)
+
+    def packet(self, data, granule: int = 0, *, eos: bool = False, flush: bool = False) -> None:
+        self._write(self.pager.packet(data, granule, eos=eos, flush=flush))
+
+    def close(self, eos: bool = False) -> None:
+        self._write(self.pager.flush(eos))
+        if self._owned:
+            self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class OggStreamStats:
+    """Per-serial counters and seek table (time, file offset of the page),
+    one point per seek_interval of media."""
+
+    def __init__(self, serial: int, rate: int, name: str = ""):
+        self.serial = serial
+        self.rate = rate
+        self.name = name
+        self.pages = 0
+        self.packets = 0
+        self.bytes = 0
+        self.last_granule = 0
+        self.max_page_gap = 0    # largest file distance between two of its pages
+        self._last_offset = None
+        self.seek_times = array("d")
+        self.seek_offsets = array("Q")
+
+    def as_dict(self) -> dict:
+        return {
+            "serial": self.serial, "name": self.name, "rate": self.rate, "pages": self.pages,
+            "packets": self.packets, "bytes": self.bytes, "duration": self.last_granule / self.rate,
+            "max_page_gap": self.max_page_gap, "seek_points": len(self.seek_times),
+        }
+
+
+class _MuxStream:
+    def __init__(self, serial, headers, packets, rate, name, max_segments):
+        self.pager = OggPaginator(serial, 0, max_segments)
+        self.headers = list(headers)
+        self.packets = packets
+        self.stats = OggStreamStats(self.pager.serial, rate, name)
+        self.time = 0.0
+        self.next_seek = 0.0
+
+
+class OggMuxer:
+    """Interleave logical streams into one physical Ogg stream.
+
+    Every stream's first header page (BOS) is written first, then the
+    remaining header pages, then data pages in order of their end time.
+    A data page is closed once it spans page_duration seconds (or fills
+    up); streams' packet iterables yield (data, granule) and are consumed
+    lazily. Per-serial statistics and seek tables are kept in `stats`.
+    """
+
+    def __init__(self, out, page_duration: float = 1.0, seek_interval: float = 1.0,
+                 max_segments: int = MAX_SEGMENTS):
+        if isinstance(out, (str, Path)):
+            self._fp = open(out, "wb")
+            self._owned = True
+        else:
+            self._fp = out
+            self._owned = False
+        self.page_duration = page_duration
+        self.seek_interval = seek_interval
+        self.max_segments = max_segments
+        self._streams = []
+        self.bytes_written = 0
+        self.pages = 0
+
+    def add_stream(self, serial: int, headers, packets, rate: int, name: str = "") -> OggStreamStats:
+        st = _MuxStream(serial, headers, packets, rate, name, self.max_segments)
+        # the first header goes on the BOS page, which must precede every
+        # other stream's data pages
+        if not st.headers:
+            raise ValueError(f"stream {serial:#x} needs at least one header packet for its BOS page")
+        self._streams.append(st)
+        return st.stats
+
+    @property
+    def stats(self):
+        return [st.stats for st in self._streams]
+
+    def _write(self, st: _MuxStream, page: bytes) -> None:
+        s = st.stats
+        if s._last_offset is not None:
+            s.max_page_gap = max(s.max_page_gap, self.bytes_written - s._last_offset)
+        s._last_offset = self.bytes_written
+        granule = struct.unpack_from("<Q", page, 6)[0]
+        if granule != NO_GRANULE:
+            s.last_granule = granule
+            st.time = granule / s.rate
+        if st.time >= st.next_seek:
+            s.seek_times.append(st.time)
+            s.seek_offsets.append(self.bytes_written)
+            st.next_seek = st.time + self.seek_interval
+        s.pages += 1
+        s.bytes += len(page)
+        self._fp.write(page)
+        self.bytes_written += len(page)
+        self.pages += 1
+
+    def _data_pages(self, st: _MuxStream):
+        span = max(1, int(self.page_duration * st.stats.rate))
+        pager = st.pager
+        start = None
+        it = iter(st.packets)
+        nxt = next(it, None)
+        if nxt is None:
+            yield from pager.flush(eos=True)
+            return
+        while nxt is not None:
+            (data, granule), nxt = nxt, next(it, None)
+            if start is None:
+                start = granule
+            st.stats.packets += 1
+            for page in pager.packet(data, granule, eos=nxt is None, flush=granule - start >= span):
+                start = None
+                yield page
+
+    def run(self) -> int:
+        """Write everything; returns the number of bytes written."""
+        for st in self._streams:
+            for page in st.pager.packet(st.headers[0], 0, flush=True):
+                self._write(st, page)
+            st.stats.packets += 1
+        for st in self._streams:
+            for h in st.headers[1:]:
+                for page in st.pager.packet(h, 0):
+                    self._write(st, page)
+                st.stats.packets += 1
+            for page in st.pager.flush():
+                self._write(st, page)
+
+        heap = []
+        gens = [self._data_pages(st) for st in self._streams]
+
+        def push(i):
+            page = next(gens[i], None)
+            if page is not None:
+                granule = struct.unpack_from("<Q", page, 6)[0]
+                st = self._streams[i]
+                t = st.time if granule == NO_GRANULE else granule / st.stats.rate
+                heapq.heappush(heap, (t, i, page))
+
+        for i in range(len(self._streams)):
+            push(i)
+        while heap:
+            _, i, page = heapq.heappop(heap)
+            self._write(self._streams[i], page)
+            push(i)
+        return self.bytes_written
+
+    def close(self) -> None:
+        if self._owned:
+            self._fp.close()
+        else:
+            self._fp.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
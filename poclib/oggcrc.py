@@ -0,0 +1,103 @@
+# Ogg page CRC (poly 0x04C11DB7, init 0, no reflection, no final xor).
+#
+# Three interchangeable implementations, all bit-exact with the old
+# per-bit loops in dmx_ogg/poc_offbyone.py and gpac_dec_vorbis/gen_poc_vorbis.py:
+#   ogg_crc_table   - classic 256-entry table, one lookup per byte
+#   ogg_crc_slice8  - slice-by-8, eight lookups per 8 input bytes
+#   ogg_crc         - zlib.crc32 on bit-reversed input (runs in C, default)
+import struct
+import zlib
+
+POLY = 0x04C11DB7
+
+
+def _make_table(poly: int = POLY) -> list:
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFFFFFFFF if (crc & 0x80000000) else ((crc << 1) & 0xFFFFFFFF)
+        table.append(crc)
+    return table
+
+
+CRC_TABLE = _make_table()
+
+# SLICE_TABLES[k][b] == CRC of byte b followed by k zero bytes.
+SLICE_TABLES = [CRC_TABLE]
+for _k in range(1, 8):
+    _prev = SLICE_TABLES[-1]
+    SLICE_TABLES.append([((c << 8) & 0xFFFFFFFF) ^ CRC_TABLE[c >> 24] for c in _prev])
+del _k, _prev
+
+# Bit-reversal of every byte value, and of a full 32-bit word.
+_REV8 = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+
+def _rev32(x: int) -> int:
+    return int.from_bytes(x.to_bytes(4, "little").translate(_REV8), "big")
+
+
+def ogg_crc_table(data: bytes, crc: int = 0) -> int:
+    t = CRC_TABLE
+    for b in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ t[(crc >> 24) ^ b]
+    return crc
+
+
+_U32BE = struct.Struct(">II")
+
+
+def ogg_crc_slice8(data: bytes, crc: int = 0) -> int:
+    t0, t1, t2, t3, t4, t5, t6, t7 = SLICE_TABLES
+    n = len(data)
+    end8 = n - (n % 8)
+    unpack = _U32BE.unpack_from
+    for off in range(0, end8, 8):
+        hi, lo = unpack(data, off)
+        hi ^= crc
+        crc = (t7[hi >> 24] ^ t6[(hi >> 16) & 0xFF] ^ t5[(hi >> 8) & 0xFF] ^ t4[hi & 0xFF] ^
+               t3[lo >> 24] ^ t2[(lo >> 16) & 0xFF] ^ t1[(lo >> 8) & 0xFF] ^ t0[lo & 0xFF])
+    return ogg_crc_table(data[end8:], crc)
+
+
+def ogg_crc(data: bytes, crc: int = 0) -> int:
+    # The Ogg CRC is the bit-mirror image of the reflected CRC-32 zlib
+    # computes: reverse every input byte, run zlib with a zero register
+    # (value=~0 undoes zlib's pre-inversion, ^~0 its post-inversion), then
+    # reverse the 32-bit result.
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    reg = zlib.crc32(data.translate(_REV8), _rev32(crc) ^ 0xFFFFFFFF) ^ 0xFFFFFFFF
+    return _rev32(reg)
+
+
+def ogg_crc_many(pages) -> list:
+    """Return the CRC of every page in an iterable of byte strings
+    (convenience wrapper; same cost as calling ogg_crc() per page)."""
+    return [ogg_crc(p) for p in pages]
+
+
+def ogg_crc_concat(blob: bytes, lengths) -> list:
+    """CRC of each page in a buffer holding pages of the given lengths
+    back to back."""
+    if isinstance(blob, memoryview):
+        blob = blob.tobytes()
+    out = []
+    off = 0
+    for n in lengths:
+        out.append(ogg_crc(blob[off:off + n]))
+        off += n
+    return out
+
+
+def seal_page(page: bytearray) -> bytearray:
+    """Write the CRC of an Ogg page (CRC field zeroed) into bytes 22..25."""
+    page[22:26] = b"\x00\x00\x00\x00"
+    page[22:26] = struct.pack("<I", ogg_crc(page))
+    return page
+
+
+def seal_pages(pages) -> list:
+    """seal_page() for many pages in one call; returns the same objects."""
+    return [seal_page(p) for p in pages]
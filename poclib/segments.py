@@ -0,0 +1,43 @@
+# Output assembled from segments: bytes objects and memoryviews over
+# indexed input files, written without joining them into one buffer.
+import os
+from pathlib import Path
+
+IOV_MAX = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") and "SC_IOV_MAX" in os.sysconf_names else 1024
+
+
+def segments_len(segments) -> int:
+    return sum(len(s) for s in segments)
+
+
+def write_segments(out, segments) -> int:
+    """Write a list of bytes/memoryview segments without joining them.
+
+    out: path (written with os.writev, IOV_MAX segments per call), raw file
+    descriptor, or file object (segments written one by one)."""
+    views = [memoryview(s).cast("B") for s in segments if len(s)]
+    if isinstance(out, (str, Path)):
+        fd = os.open(out, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            return write_segments(fd, views)
+        finally:
+            os.close(fd)
+    if not isinstance(out, int):
+        for v in views:
+            out.write(v)
+        return segments_len(views)
+    if not hasattr(os, "writev"):
+        return sum(os.write(out, v) for v in views)
+
+    total = 0
+    i = 0
+    while i < len(views):
+        n = os.writev(out, views[i:i + IOV_MAX])
+        total += n
+        # drop what was written; a short write leaves a partial segment
+        while i < len(views) and n >= len(views[i]):
+            n -= len(views[i])
+            i += 1
+        if n:
+            views[i] = views[i][n:]
+    return total
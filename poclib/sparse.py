@@ -0,0 +1,236 @@
+# Sparse output for generators that need huge zero regions (e.g. the CAF
+# INT_MAX info chunk).
+#
+# Generators write against a tiny sink interface - write(data), skip(n),
+# tell() - and pick the backend:
+#   SparseFile   - real file; skip() leaves a hole, verified afterwards with
+#                  SEEK_DATA/SEEK_HOLE
+#   SparseBuffer - in-memory, hole-aware, readable like a file; only the
+#                  written extents are stored
+import bisect
+import errno
+import io
+import os
+import tempfile
+import warnings
+from functools import lru_cache
+
+SEEK_DATA = getattr(os, "SEEK_DATA", None)
+SEEK_HOLE = getattr(os, "SEEK_HOLE", None)
+
+
+def data_extents(path):
+    """[(start, end), ...] of the allocated regions of `path` according to
+    SEEK_DATA/SEEK_HOLE, or None if the platform/filesystem can't tell."""
+    if SEEK_DATA is None:
+        return None
+    size = os.path.getsize(path)
+    out = []
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        pos = 0
+        while pos < size:
+            try:
+                start = os.lseek(fd, pos, SEEK_DATA)
+            except OSError as e:
+                if e.errno == errno.ENXIO:  # no data past pos
+                    break
+                return None
+            end = os.lseek(fd, start, SEEK_HOLE)
+            out.append((start, end))
+            pos = end
+    finally:
+        os.close(fd)
+    return out
+
+
+@lru_cache(maxsize=64)
+def holes_supported(directory: str = ".", probe_size: int = 1 << 20) -> bool:
+    """Check that a file in `directory` actually gets a hole when seeking
+    past data, by both SEEK_HOLE and st_blocks. Cached per directory."""
+    fd, path = tempfile.mkstemp(prefix=".sparse-probe-", dir=directory)
+    try:
+        os.lseek(fd, probe_size, os.SEEK_SET)
+        os.write(fd, b"\x01")
+        os.fsync(fd)
+        ext = data_extents(path)
+        if ext is not None:
+            return ext[0][0] > 0
+        return os.stat(path).st_blocks * 512 < probe_size
+    finally:
+        os.close(fd)
+        os.unlink(path)
+
+
+class SparseFile:
+    """File sink whose skip() regions become holes.
+
+    On a filesystem without hole support it warns and the skipped regions
+    are written densely (as zeros); with strict=True the constructor raises
+    RuntimeError instead, for callers that need real holes.
+    """
+
+    def __init__(self, path, strict: bool = False):
+        self.path = os.fspath(path)
+        self.holes_ok = holes_supported(os.path.dirname(os.path.abspath(self.path)))
+        if not self.holes_ok:
+            msg = f"filesystem holding {self.path} does not support sparse files"
+            if strict:
+                raise RuntimeError(msg)
+            warnings.warn(msg + "; skipped regions will be allocated")
+        self._f = open(self.path, "wb")
+        self.skipped = []
+
+    def write(self, data) -> int:
+        return self._f.write(data)
+
+    def skip(self, n: int) -> None:
+        pos = self._f.tell()
+        self._f.seek(n, os.SEEK_CUR)
+        self.skipped.append((pos, pos + n))
+
+    def tell(self) -> int:
+        return self._f.tell()
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        # a trailing skip leaves the file short; extend it without writing
+        self._f.truncate(self._f.tell())
+        self._f.close()
+
+    def verify(self) -> dict:
+        """Report which skipped ranges really are holes on disk."""
+        self.close()
+        st = os.stat(self.path)
+        ext = data_extents(self.path)
+        blk = st.st_blksize or 4096
+        missing = []
+        for start, end in self.skipped:
+            # only whole blocks inside the range can be holes
+            lo = -(-start // blk) * blk
+            hi = end // blk * blk
+            if hi <= lo:
+                continue
+            if ext is None or any(s < hi and e > lo for s, e in ext):
+                missing.append((start, end))
+        return {
+            "size": st.st_size,
+            "allocated": st.st_blocks * 512,
+            "extents": ext,
+            "holes_verified": ext is not None and not missing,
+            "dense_ranges": missing,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SparseBuffer(io.RawIOBase):
+    """In-memory sparse file. Written extents are kept as bytes; everything
+    else reads back as zeros. Supports the sink interface for generators and
+    read/seek/tell for in-process consumers."""
+
+    def __init__(self):
+        super().__init__()
+        self._starts = []
+        self._chunks = []
+        self._pos = 0
+        self.size = 0
+
+    # -- sink side ---------------------------------------------------------
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if len(data):
+            lo, hi = self._pos, self._pos + len(data)
+            i = bisect.bisect_left(self._starts, lo)
+            if (i < len(self._starts) and self._starts[i] < hi) or \
+               (i > 0 and self._starts[i - 1] + len(self._chunks[i - 1]) > lo):
+                raise ValueError("SparseBuffer does not support overwriting extents")
+            if i > 0 and self._starts[i - 1] + len(self._chunks[i - 1]) == lo:
+                self._chunks[i - 1] += data  # coalesce with the previous extent
+            else:
+                self._starts.insert(i, lo)
+                self._chunks.insert(i, bytearray(data))
+            self._pos = hi
+            self.size = max(self.size, hi)
+        return len(data)
+
+    def skip(self, n: int) -> None:
+        self._pos += n
+        self.size = max(self.size, self._pos)
+
+    @property
+    def extents(self):
+        return [(s, s + len(c)) for s, c in zip(self._starts, self._chunks)]
+
+    # -- file side ---------------------------------------------------------
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            pos += self._pos
+        elif whence == io.SEEK_END:
+            pos += self.size
+        elif SEEK_DATA is not None and whence in (SEEK_DATA, SEEK_HOLE):
+            return self._seek_data_hole(pos, whence)
+        self._pos = max(0, pos)
+        return self._pos
+
+    def _seek_data_hole(self, pos: int, whence: int) -> int:
+        if pos >= self.size:
+            raise OSError(errno.ENXIO, os.strerror(errno.ENXIO))
+        for s, e in self.extents:
+            if whence == SEEK_DATA and e > pos:
+                self._pos = max(s, pos)
+                return self._pos
+            if whence == SEEK_HOLE and s <= pos < e:
+                pos = e
+        if whence == SEEK_DATA:
+            raise OSError(errno.ENXIO, os.strerror(errno.ENXIO))
+        self._pos = pos
+        return pos
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), self.size - self._pos))
+        if not n:
+            return 0
+        mv = memoryview(b)[:n]
+        mv[:] = bytes(n)
+        lo, hi = self._pos, self._pos + n
+        i = max(0, bisect.bisect_right(self._starts, lo) - 1)
+        while i < len(self._starts) and self._starts[i] < hi:
+            s = self._starts[i]
+            c = self._chunks[i]
+            a, z = max(lo, s), min(hi, s + len(c))
+            if a < z:
+                mv[a - lo:z - lo] = c[a - s:z - s]
+            i += 1
+        self._pos = hi
+        return n
+
+    def to_file(self, path, strict: bool = False) -> SparseFile:
+        """Materialize as a sparse file on disk."""
+        out = SparseFile(path, strict)
+        pos = 0
+        for s, c in zip(self._starts, self._chunks):
+            if s > pos:
+                out.skip(s - pos)
+            out.write(c)
+            pos = s + len(c)
+        if self.size > pos:
+            out.skip(self.size - pos)
+        out.close()
+        return out
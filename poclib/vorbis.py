@@ -0,0 +1,581 @@
+# Vorbis I header and packet encoder.
+#
+# The three header packets (identification, comment, setup) are built from
+# a parameter model (Vorbis I spec, sections 3-5): NamedTuple codebooks,
+# floors, residues, mappings and modes collected in a Setup. Everything is
+# packed LSB-first by BitWriter, which appends to a preallocated buffer in
+# whole-word steps; a component can be written as one (value, nbits) pair,
+# so codebooks - by far the largest part of a real setup header - are
+# encoded once (lru_cache) and spliced into every variant that uses them.
+# parse_setup() reads a setup packet back into the model.
+#
+# audio_packets() emits matching audio packets: every channel's floor is
+# flagged unused, so the decoder runs the full synthesis path for the
+# stream's channel count and block sizes and outputs silence.
+import math
+import struct
+from functools import lru_cache
+from typing import NamedTuple
+
+VORBIS = b"vorbis"
+PACKET_ID = 1
+PACKET_COMMENT = 3
+PACKET_SETUP = 5
+CODEBOOK_SYNC = 0x564342
+
+
+def ilog(x: int) -> int:
+    """Vorbis ilog(): bits needed to store x (0 for x <= 0)."""
+    return x.bit_length() if x > 0 else 0
+
+
+def lookup1_values(entries: int, dimensions: int) -> int:
+    """Largest r with r ** dimensions <= entries."""
+    r = int(entries ** (1.0 / dimensions))
+    while (r + 1) ** dimensions <= entries:
+        r += 1
+    while r ** dimensions > entries:
+        r -= 1
+    return r
+
+
+def float32_pack(x: float) -> int:
+    """Vorbis float32: sign, 10-bit exponent biased by 788, 21-bit mantissa."""
+    if x == 0:
+        return 0
+    m, e = math.frexp(abs(x))
+    mant = round(m * (1 << 21))
+    if mant == 1 << 21:
+        mant >>= 1
+        e += 1
+    return (0x80000000 if x < 0 else 0) | ((e - 21 + 788) & 0x3FF) << 21 | mant
+
+
+def float32_unpack(v: int) -> float:
+    x = math.ldexp(v & 0x1FFFFF, ((v >> 21) & 0x3FF) - 788)
+    return -x if v & 0x80000000 else x
+
+
+class BitWriter:
+    """LSB-first bit packer (the order of libogg's oggpack_write) over a
+    preallocated bytearray that doubles when full. Pending bits are kept in
+    an int and moved to the buffer in whole words, so one write() of a
+    multi-thousand-bit value is as cheap as a handful of small ones."""
+
+    def __init__(self, size: int = 4096):
+        self._buf = bytearray(size)
+        self._pos = 0
+        self._acc = 0
+        self._nbits = 0
+
+    def write(self, value: int, bits: int) -> None:
+        if bits <= 0:
+            return
+        self._acc |= (value & ((1 << bits) - 1)) << self._nbits
+        self._nbits += bits
+        if self._nbits >= 64:
+            self._drain()
+
+    def _drain(self) -> None:
+        n = self._nbits >> 3
+        end = self._pos + n
+        if end > len(self._buf):
+            self._buf.extend(bytes(max(end, 2 * len(self._buf)) - len(self._buf)))
+        self._buf[self._pos:end] = (self._acc & ((1 << (8 * n)) - 1)).to_bytes(n, "little")
+        self._pos = end
+        self._acc >>= 8 * n
+        self._nbits -= 8 * n
+
+    def write_bool(self, flag) -> None:
+        self.write(1 if flag else 0, 1)
+
+    def write_bytes(self, data: bytes) -> None:
+        self.write(int.from_bytes(data, "little"), 8 * len(data))
+
+    def write_bits(self, pair) -> None:
+        """Write a (value, nbits) pair as produced by a cached encoder."""
+        self.write(*pair)
+
+    @property
+    def bit_length(self) -> int:
+        return 8 * self._pos + self._nbits
+
+    def getvalue(self) -> bytes:
+        """Contents so far, the last partial byte zero-padded."""
+        tail = (self._nbits + 7) >> 3
+        return bytes(self._buf[:self._pos]) + self._acc.to_bytes(tail, "little")
+
+
+def _bits(encode):
+    """Run encode(BitWriter) and return what it wrote as (value, nbits)."""
+    w = BitWriter(256)
+    encode(w)
+    n = w.bit_length
+    return int.from_bytes(w.getvalue(), "little"), n
+
+
+# ---------------------------------------------------------------------------
+# Setup model (spec section 3.2.1 and 4.2.4)
+
+class Codebook(NamedTuple):
+    dimensions: int
+    lengths: tuple                # codeword length per entry, 0 = unused (sparse)
+    lookup_type: int = 0
+    minimum: float = 0.0
+    delta: float = 0.0
+    value_bits: int = 0
+    sequence_p: bool = False
+    multiplicands: tuple = ()
+    ordered: bool = False         # encode lengths as runs (needs nondecreasing, all used)
+    sparse: bool = None           # default: only when some entry is unused
+
+    @property
+    def entries(self) -> int:
+        return len(self.lengths)
+
+
+class FloorClass(NamedTuple):
+    dimensions: int
+    subclass_bits: int = 0
+    masterbook: int = 0
+    subbooks: tuple = (-1,)       # 1 << subclass_bits entries, -1 = none
+
+
+class Floor1(NamedTuple):
+    partition_classes: tuple = ()
+    classes: tuple = ()
+    multiplier: int = 1
+    rangebits: int = 8
+    xlist: tuple = ()             # X values after the implicit 0 and 1 << rangebits
+
+    floor_type = 1
+
+
+class Floor0(NamedTuple):
+    order: int = 1
+    rate: int = 48000
+    bark_map_size: int = 256
+    amplitude_bits: int = 8
+    amplitude_offset: int = 0
+    books: tuple = (0,)
+
+    floor_type = 0
+
+
+class Residue(NamedTuple):
+    residue_type: int = 2
+    begin: int = 0
+    end: int = 0
+    partition_size: int = 32
+    classbook: int = 0
+    books: tuple = ((None,) * 8,)  # per classification: 8 passes, None = no book
+
+    @property
+    def classifications(self) -> int:
+        return len(self.books)
+
+
+class Mapping(NamedTuple):
+    submap_floors: tuple = (0,)
+    submap_residues: tuple = (0,)
+    coupling: tuple = ()           # (magnitude, angle) channel pairs
+    mux: tuple = ()                # submap per channel, only with several submaps
+
+
+class Mode(NamedTuple):
+    blockflag: bool = False
+    mapping: int = 0
+
+
+class Setup(NamedTuple):
+    codebooks: tuple
+    floors: tuple
+    residues: tuple
+    mappings: tuple
+    modes: tuple
+
+
+# ---------------------------------------------------------------------------
+# Encoders
+
+@lru_cache(maxsize=1024)
+def codebook_bits(cb: Codebook):
+    def encode(w):
+        entries = cb.entries
+        w.write(CODEBOOK_SYNC, 24)
+        w.write(cb.dimensions, 16)
+        w.write(entries, 24)
+        w.write_bool(cb.ordered)
+        if cb.ordered:
+            length = cb.lengths[0] if entries else 1
+            w.write(length - 1, 5)
+            i = 0
+            while i < entries:
+                n = 0
+                while i + n < entries and cb.lengths[i + n] == length:
+                    n += 1
+                w.write(n, ilog(entries - i))
+                i += n
+                length += 1
+        else:
+            sparse = (0 in cb.lengths) if cb.sparse is None else cb.sparse
+            w.write_bool(sparse)
+            for length in cb.lengths:
+                if sparse:
+                    w.write_bool(length)
+                    if length:
+                        w.write(length - 1, 5)
+                else:
+                    w.write(length - 1, 5)
+        w.write(cb.lookup_type, 4)
+        if cb.lookup_type in (1, 2):
+            w.write(float32_pack(cb.minimum), 32)
+            w.write(float32_pack(cb.delta), 32)
+            w.write(cb.value_bits - 1, 4)
+            w.write_bool(cb.sequence_p)
+            for v in cb.multiplicands:
+                w.write(v, cb.value_bits)
+    return _bits(encode)
+
+
+def quantvals(cb: Codebook) -> int:
+    """Number of multiplicands a codebook's lookup table needs."""
+    if cb.lookup_type == 1:
+        return lookup1_values(cb.entries, cb.dimensions)
+    if cb.lookup_type == 2:
+        return cb.entries * cb.dimensions
+    return 0
+
+
+def _floor(w: BitWriter, f) -> None:
+    w.write(f.floor_type, 16)
+    if f.floor_type == 0:
+        w.write(f.order, 8)
+        w.write(f.rate, 16)
+        w.write(f.bark_map_size, 16)
+        w.write(f.amplitude_bits, 6)
+        w.write(f.amplitude_offset, 8)
+        w.write(len(f.books) - 1, 4)
+        for b in f.books:
+            w.write(b, 8)
+        return
+    w.write(len(f.partition_classes), 5)
+    for c in f.partition_classes:
+        w.write(c, 4)
+    for c in f.classes:
+        w.write(c.dimensions - 1, 3)
+        w.write(c.subclass_bits, 2)
+        if c.subclass_bits:
+            w.write(c.masterbook, 8)
+        for b in c.subbooks:
+            w.write(b + 1, 8)
+    w.write(f.multiplier - 1, 2)
+    w.write(f.rangebits, 4)
+    for x in f.xlist:
+        w.write(x, f.rangebits)
+
+
+def _residue(w: BitWriter, r: Residue) -> None:
+    w.write(r.residue_type, 16)
+    w.write(r.begin, 24)
+    w.write(r.end, 24)
+    w.write(r.partition_size - 1, 24)
+    w.write(r.classifications - 1, 6)
+    w.write(r.classbook, 8)
+    cascades = [sum(1 << j for j, b in enumerate(books) if b is not None) for books in r.books]
+    for c in cascades:
+        w.write(c & 7, 3)
+        w.write_bool(c >> 3)
+        if c >> 3:
+            w.write(c >> 3, 5)
+    for books in r.books:
+        for b in books:
+            if b is not None:
+                w.write(b, 8)
+
+
+def _mapping(w: BitWriter, m: Mapping, channels: int) -> None:
+    w.write(0, 16)
+    submaps = len(m.submap_floors)
+    w.write_bool(submaps > 1)
+    if submaps > 1:
+        w.write(submaps - 1, 4)
+    w.write_bool(m.coupling)
+    if m.coupling:
+        w.write(len(m.coupling) - 1, 8)
+        bits = ilog(channels - 1)
+        for mag, ang in m.coupling:
+            w.write(mag, bits)
+            w.write(ang, bits)
+    w.write(0, 2)
+    if submaps > 1:
+        for s in m.mux:
+            w.write(s, 4)
+    for floor, residue in zip(m.submap_floors, m.submap_residues):
+        w.write(0, 8)
+        w.write(floor, 8)
+        w.write(residue, 8)
+
+
+def setup_packet(setup: Setup, channels: int) -> bytes:
+    w = BitWriter(sum(codebook_bits(cb)[1] for cb in setup.codebooks) // 8 + 1024)
+    w.write(PACKET_SETUP, 8)
+    w.write_bytes(VORBIS)
+    w.write(len(setup.codebooks) - 1, 8)
+    for cb in setup.codebooks:
+        w.write_bits(codebook_bits(cb))
+    w.write(0, 6)   # one time domain transform, type 0
+    w.write(0, 16)
+    w.write(len(setup.floors) - 1, 6)
+    for f in setup.floors:
+        _floor(w, f)
+    w.write(len(setup.residues) - 1, 6)
+    for r in setup.residues:
+        _residue(w, r)
+    w.write(len(setup.mappings) - 1, 6)
+    for m in setup.mappings:
+        _mapping(w, m, channels)
+    w.write(len(setup.modes) - 1, 6)
+    for m in setup.modes:
+        w.write_bool(m.blockflag)
+        w.write(0, 16)
+        w.write(0, 16)
+        w.write(m.mapping, 8)
+    w.write(1, 1)   # framing
+    return w.getvalue()
+
+
+def id_packet(channels: int, rate: int, blocksizes=(256, 2048), bitrate_max: int = 0, bitrate_nominal: int = 0,
+              bitrate_min: int = 0) -> bytes:
+    bs0, bs1 = (ilog(b) - 1 for b in blocksizes)
+    return (bytes([PACKET_ID]) + VORBIS + struct.pack("<IBIiii", 0, channels, rate, bitrate_max, bitrate_nominal,
+                                                      bitrate_min) + bytes([bs1 << 4 | bs0, 1]))
+
+
+def comment_packet(vendor: str = "", comments=()) -> bytes:
+    v = vendor.encode("utf-8")
+    out = [bytes([PACKET_COMMENT]), VORBIS, struct.pack("<I", len(v)), v, struct.pack("<I", len(comments))]
+    for c in comments:
+        c = c.encode("utf-8") if isinstance(c, str) else c
+        out += [struct.pack("<I", len(c)), c]
+    out.append(b"\x01")
+    return b"".join(out)
+
+
+# ---------------------------------------------------------------------------
+# Decoder: setup packet -> Setup, so captured real-world headers can be
+# edited as models; setup_packet(parse_setup(p, ch), ch) == p.
+
+class _BitReader:
+    def __init__(self, data: bytes):
+        self._v = int.from_bytes(data, "little")
+        self._n = 8 * len(data)
+        self.pos = 0
+
+    def read(self, bits: int) -> int:
+        if self.pos + bits > self._n:
+            raise ValueError("setup packet truncated")
+        x = (self._v >> self.pos) & ((1 << bits) - 1)
+        self.pos += bits
+        return x
+
+
+def _read_codebook(r: _BitReader) -> Codebook:
+    if r.read(24) != CODEBOOK_SYNC:
+        raise ValueError("bad codebook sync pattern")
+    dimensions = r.read(16)
+    entries = r.read(24)
+    ordered = bool(r.read(1))
+    sparse = None
+    lengths = []
+    if ordered:
+        length = r.read(5) + 1
+        while len(lengths) < entries:
+            lengths += [length] * r.read(ilog(entries - len(lengths)))
+            length += 1
+        if len(lengths) > entries:
+            raise ValueError("ordered codebook lengths overrun its entries")
+    else:
+        sparse = bool(r.read(1))
+        for _ in range(entries):
+            lengths.append((r.read(5) + 1 if r.read(1) else 0) if sparse else r.read(5) + 1)
+    lookup_type = r.read(4)
+    if lookup_type not in (1, 2):
+        return Codebook(dimensions, tuple(lengths), lookup_type, ordered=ordered, sparse=sparse)
+    minimum = float32_unpack(r.read(32))
+    delta = float32_unpack(r.read(32))
+    value_bits = r.read(4) + 1
+    sequence_p = bool(r.read(1))
+    cb = Codebook(dimensions, tuple(lengths), lookup_type, minimum, delta, value_bits, sequence_p, (), ordered, sparse)
+    return cb._replace(multiplicands=tuple(r.read(value_bits) for _ in range(quantvals(cb))))
+
+
+def _read_floor(r: _BitReader):
+    floor_type = r.read(16)
+    if floor_type == 0:
+        order, rate, bark_map_size, amplitude_bits, amplitude_offset = (r.read(n) for n in (8, 16, 16, 6, 8))
+        return Floor0(order, rate, bark_map_size, amplitude_bits, amplitude_offset,
+                      tuple(r.read(8) for _ in range(r.read(4) + 1)))
+    if floor_type != 1:
+        raise ValueError(f"unknown floor type {floor_type}")
+    partition_classes = tuple(r.read(4) for _ in range(r.read(5)))
+    classes = []
+    for _ in range(max(partition_classes, default=-1) + 1):
+        dimensions = r.read(3) + 1
+        subclass_bits = r.read(2)
+        masterbook = r.read(8) if subclass_bits else 0
+        classes.append(FloorClass(dimensions, subclass_bits, masterbook,
+                                  tuple(r.read(8) - 1 for _ in range(1 << subclass_bits))))
+    multiplier = r.read(2) + 1
+    rangebits = r.read(4)
+    n = sum(classes[c].dimensions for c in partition_classes)
+    return Floor1(partition_classes, tuple(classes), multiplier, rangebits, tuple(r.read(rangebits) for _ in range(n)))
+
+
+def _read_residue(r: _BitReader) -> Residue:
+    residue_type, begin, end = r.read(16), r.read(24), r.read(24)
+    partition_size = r.read(24) + 1
+    classifications = r.read(6) + 1
+    classbook = r.read(8)
+    cascades = []
+    for _ in range(classifications):
+        low = r.read(3)
+        cascades.append((r.read(5) if r.read(1) else 0) << 3 | low)
+    books = tuple(tuple(r.read(8) if c >> j & 1 else None for j in range(8)) for c in cascades)
+    return Residue(residue_type, begin, end, partition_size, classbook, books)
+
+
+def _read_mapping(r: _BitReader, channels: int) -> Mapping:
+    if r.read(16) != 0:
+        raise ValueError("unknown mapping type")
+    submaps = r.read(4) + 1 if r.read(1) else 1
+    coupling = ()
+    if r.read(1):
+        bits = ilog(channels - 1)
+        coupling = tuple((r.read(bits), r.read(bits)) for _ in range(r.read(8) + 1))
+    if r.read(2):
+        raise ValueError("mapping reserved field is non-zero")
+    mux = tuple(r.read(4) for _ in range(channels)) if submaps > 1 else ()
+    floors, residues = [], []
+    for _ in range(submaps):
+        r.read(8)   # unused time configuration
+        floors.append(r.read(8))
+        residues.append(r.read(8))
+    return Mapping(tuple(floors), tuple(residues), coupling, mux)
+
+
+def parse_setup(packet: bytes, channels: int) -> Setup:
+    """Setup model of a setup header packet for a stream of `channels`
+    channels (coupling and mux fields depend on it)."""
+    r = _BitReader(packet)
+    if r.read(8) != PACKET_SETUP or r.read(48) != int.from_bytes(VORBIS, "little"):
+        raise ValueError("not a Vorbis setup header")
+    codebooks = tuple(_read_codebook(r) for _ in range(r.read(8) + 1))
+    if r.read(6) or r.read(16):
+        raise ValueError("expected one time domain transform of type 0")
+    floors = tuple(_read_floor(r) for _ in range(r.read(6) + 1))
+    residues = tuple(_read_residue(r) for _ in range(r.read(6) + 1))
+    mappings = tuple(_read_mapping(r, channels) for _ in range(r.read(6) + 1))
+    modes = []
+    for _ in range(r.read(6) + 1):
+        blockflag = bool(r.read(1))
+        if r.read(16) or r.read(16):
+            raise ValueError("unknown window or transform type")
+        modes.append(Mode(blockflag, r.read(8)))
+    if not r.read(1):
+        raise ValueError("setup header framing bit not set")
+    return Setup(codebooks, floors, residues, mappings, tuple(modes))
+
+
+# ---------------------------------------------------------------------------
+# Minimal models
+
+@lru_cache(maxsize=256)
+def minimal_setup(channels: int, coupled: bool = False, submaps: int = 1, floor_type: int = 1,
+                  residue_type: int = 2) -> Setup:
+    """Smallest valid setup: one 2-entry codebook (plus a lookup book for
+    floor 0), one floor with no partitions, a residue with no books, and a
+    short and a long mode sharing one mapping. Adjacent channels are
+    coupled when asked; with several submaps channels are dealt round-robin."""
+    coupling = tuple((i, i + 1) for i in range(0, channels - 1, 2)) if coupled else ()
+    books = (Codebook(1, (1, 1)),)
+    if floor_type == 0:
+        books += (Codebook(1, (1, 1), 1, 0.0, 1.0, 1, False, (0, 1)),)
+        floor = Floor0(books=(1,))
+    else:
+        floor = Floor1()
+    return Setup(
+        codebooks=books,
+        floors=(floor,),
+        residues=(Residue(residue_type, 0, 0, 32, 0),),
+        mappings=(Mapping((0,) * submaps, (0,) * submaps, coupling,
+                          tuple(ch % submaps for ch in range(channels)) if submaps > 1 else ()),),
+        modes=(Mode(False, 0), Mode(True, 0)),
+    )
+
+
+class VorbisStream(NamedTuple):
+    channels: int
+    rate: int = 48000
+    blocksizes: tuple = (256, 2048)
+    setup: Setup = None
+    vendor: str = ""
+    comments: tuple = ()
+    bitrate_max: int = 0
+    bitrate_nominal: int = 0
+    bitrate_min: int = 0
+
+    def headers(self):
+        """(identification, comment, setup) packets."""
+        setup = self.setup or minimal_setup(self.channels)
+        return (id_packet(self.channels, self.rate, self.blocksizes, self.bitrate_max, self.bitrate_nominal,
+                          self.bitrate_min),
+                comment_packet(self.vendor, self.comments),
+                setup_packet(setup, self.channels))
+
+    def audio_packets(self, modes, last_next: bool = None):
+        """Silent audio packets for a sequence (or any iterable, consumed
+        lazily) of mode numbers; yields (packet, granule) with the granule
+        position after each packet. last_next: next-window flag of the last
+        packet (default: its own block size, as for a stream cut mid-flow)."""
+        setup = self.setup or minimal_setup(self.channels)
+        mode_bits = ilog(len(setup.modes) - 1)
+        floors = [_channel_floors(setup, m.mapping, self.channels) for m in setup.modes]
+        cache = {}
+        granule = 0
+        prev = None
+        prev_long = False
+        it = iter(modes)
+        m = next(it, None)
+        while m is not None:
+            nxt = next(it, None)
+            long_block = setup.modes[m].blockflag
+            if nxt is not None:
+                next_long = setup.modes[nxt].blockflag
+            else:
+                next_long = long_block if last_next is None else last_next
+            key = (m, prev_long, next_long) if long_block else (m,)
+            packet = cache.get(key)
+            if packet is None:
+                w = BitWriter(16)
+                w.write(0, 1)
+                w.write(m, mode_bits)
+                if long_block:
+                    w.write_bool(prev_long)
+                    w.write_bool(next_long)
+                for f in floors[m]:
+                    w.write(0, f.amplitude_bits if f.floor_type == 0 else 1)
+                packet = cache[key] = w.getvalue()
+            size = self.blocksizes[1 if long_block else 0]
+            if prev is not None:
+                granule += prev // 4 + size // 4
+            prev = size
+            prev_long = long_block
+            m = nxt
+            yield packet, granule
+
+
+def _channel_floors(setup: Setup, mapping: int, channels: int):
+    m = setup.mappings[mapping]
+    mux = m.mux or (0,) * channels
+    return [setup.floors[m.submap_floors[mux[ch]]] for ch in range(channels)]